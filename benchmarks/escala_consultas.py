@@ -0,0 +1,214 @@
+import argparse
+import inspect
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import gerador_dados
+
+# 📈 Benchmark de escala das consultas do functions/setup.py
+# Para cada escala (10k, 1m, 10m, 50m vendas), gera (uma vez) um banco sintético com
+# benchmarks/gerador_dados.py e mede cada função pública de consulta do setup.py:
+#   - frio: primeira chamada numa conexão recém-aberta, com o cache de resultados vazio;
+#   - quente: chamadas seguintes na mesma conexão (páginas do SQLite já em memória),
+#     limpando o cache de resultados antes de cada uma, para medir a consulta de verdade;
+#   - pico de memória (RSS) do processo.
+# Cada função roda num processo Python próprio, para que o pico de RSS seja só dela.
+# O arquivo do banco continua no cache de disco do sistema operacional entre as medições.
+#
+# O resultado vai para um JSON (padrão: benchmarks/resultados/escala-<commit>-<backend>.json);
+# com --comparar, cada p50 é comparado com o de um JSON anterior.
+#
+# Uso (na raiz do repositório):
+#     python -m benchmarks.escala_consultas --escalas 10k,1m --repeticoes 5
+#     python -m benchmarks.escala_consultas --escalas 1m --comparar benchmarks/resultados/escala-abc1234-sql.json
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_DADOS = os.path.join(RAIZ, "benchmarks", "dados")
+DIRETORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+ESCALAS_PADRAO = "10k,1m"
+LIMITE_REGRESSAO = 1.2  # p50 20% mais lento que a referência conta como regressão
+
+# Funções do setup.py que não são consultas
+IGNORADAS = {"get_connection", "get_write_connection", "get_delta_style"}
+
+
+def funcoes_consulta():
+    """Nomes das funções públicas de consulta do setup.py (get_*, calcular_*, obter_*, total_*)."""
+    from functions import setup
+    return sorted(
+        nome for nome, objeto in vars(setup).items()
+        if inspect.isfunction(objeto) and objeto.__module__ == setup.__name__
+        and nome.startswith(("get_", "calcular_", "obter_", "total_")) and nome not in IGNORADAS
+    )
+
+
+def _rss_mib():
+    """Pico de RSS do processo, em MiB (ru_maxrss é KiB no Linux e bytes no macOS)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def medir_funcao(banco, nome, repeticoes, backend="sql"):
+    """Roda no processo filho: mede uma função e retorna frio, quentes e memória."""
+    from functions import setup
+    from functions.cache import invalidar_cache
+
+    setup.init_db(banco)
+    if backend == "colunar":
+        setup.usar_motor_colunar()
+    rss_base = _rss_mib()
+
+    funcao = getattr(setup, nome)
+    conn = setup.get_connection()
+    primeiro = next(iter(inspect.signature(funcao).parameters))
+    alvo = conn.cursor() if primeiro.startswith("cursor") else conn
+
+    invalidar_cache()
+    inicio = time.perf_counter()
+    funcao(alvo)
+    frio = time.perf_counter() - inicio
+
+    quentes = []
+    for _ in range(repeticoes):
+        invalidar_cache()
+        inicio = time.perf_counter()
+        funcao(alvo)
+        quentes.append(time.perf_counter() - inicio)
+
+    return {
+        "frio_ms": frio * 1000,
+        "quentes_ms": [t * 1000 for t in quentes],
+        "rss_base_mib": rss_base,
+        "rss_pico_mib": _rss_mib(),
+    }
+
+
+def _percentil(valores, p):
+    """Percentil pelo método do posto mais próximo (sem interpolar)."""
+    ordenados = sorted(valores)
+    posto = max(1, -(-len(ordenados) * p // 100))
+    return ordenados[int(posto) - 1]
+
+
+def _medir_em_processo(banco, nome, repeticoes, backend):
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.escala_consultas", "--medir", nome, "--banco", banco,
+         "--repeticoes", str(repeticoes), "--backend", backend],
+        cwd=RAIZ, env=dict(os.environ, PYTHONPATH=RAIZ), check=True, capture_output=True, text=True,
+    )
+    medicao = json.loads(saida.stdout.strip().splitlines()[-1])
+    quentes = medicao.pop("quentes_ms")
+    return {
+        **medicao,
+        "p50_ms": _percentil(quentes, 50),
+        "p95_ms": _percentil(quentes, 95),
+    }
+
+
+def preparar_banco(rotulo, semente, regerar=False):
+    """Retorna (caminho, segundos de geração ou None se o banco já existia)."""
+    caminho = os.path.join(DIRETORIO_DADOS, f"vendas_{rotulo}_s{semente}.db")
+    if os.path.exists(caminho) and not regerar:
+        return caminho, None
+    print(f"Gerando {caminho}...", file=sys.stderr)
+    resultado = gerador_dados.gerar_banco(caminho, gerador_dados.quantidade_vendas(rotulo), semente=semente)
+    return caminho, resultado["segundos"]
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def comparar(atual, referencia):
+    """Imprime a razão dos p50 (atual / referência) e retorna a lista de regressões."""
+    regressoes = []
+    for rotulo, escala in atual["escalas"].items():
+        anteriores = referencia.get("escalas", {}).get(rotulo, {}).get("funcoes", {})
+        for nome, medicao in escala["funcoes"].items():
+            if nome not in anteriores or not anteriores[nome]["p50_ms"]:
+                continue
+            razao = medicao["p50_ms"] / anteriores[nome]["p50_ms"]
+            marca = "  <- regressão" if razao > LIMITE_REGRESSAO else ""
+            print(f"{rotulo:>5} {nome:40} {anteriores[nome]['p50_ms']:10.2f} -> {medicao['p50_ms']:10.2f} ms "
+                  f"({razao:.2f}x){marca}")
+            if marca:
+                regressoes.append((rotulo, nome, razao))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede as consultas do setup.py em bancos sintéticos de vários tamanhos.")
+    parser.add_argument("--escalas", default=ESCALAS_PADRAO, help="Ex.: 10k,1m,10m,50m")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Chamadas quentes por função")
+    parser.add_argument("--semente", type=int, default=gerador_dados.SEMENTE_PADRAO)
+    parser.add_argument("--backend", choices=["sql", "colunar"], default="sql")
+    parser.add_argument("--funcoes", help="Só estas funções (separadas por vírgula)")
+    parser.add_argument("--regerar", action="store_true", help="Gera os bancos de novo mesmo se já existirem")
+    parser.add_argument("--saida", help="Arquivo JSON de resultado")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar os p50")
+    # Uso interno: medição de uma única função no processo filho
+    parser.add_argument("--medir", help=argparse.SUPPRESS)
+    parser.add_argument("--banco", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.medir:
+        print(json.dumps(medir_funcao(args.banco, args.medir, args.repeticoes, args.backend)))
+        return
+
+    nomes = args.funcoes.split(",") if args.funcoes else funcoes_consulta()
+    commit = _commit_atual()
+    resultado = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "semente": args.semente,
+        "repeticoes": args.repeticoes,
+        "escalas": {},
+    }
+
+    for rotulo in args.escalas.split(","):
+        banco, segundos_geracao = preparar_banco(rotulo, args.semente, args.regerar)
+        with sqlite3.connect(banco) as conn:
+            vendas = conn.execute("SELECT COUNT(*) FROM vendas;").fetchone()[0]
+        escala = resultado["escalas"][rotulo] = {
+            "vendas": vendas,
+            "arquivo_mib": os.path.getsize(banco) / (1024 * 1024),
+            "geracao_s": segundos_geracao,
+            "funcoes": {},
+        }
+        print(f"\n{rotulo} ({vendas:,} vendas)")
+        print(f"{'função':40} {'frio':>10} {'p50':>10} {'p95':>10} {'RSS pico':>10}")
+        for nome in nomes:
+            medicao = escala["funcoes"][nome] = _medir_em_processo(banco, nome, args.repeticoes, args.backend)
+            print(f"{nome:40} {medicao['frio_ms']:8.1f}ms {medicao['p50_ms']:8.1f}ms "
+                  f"{medicao['p95_ms']:8.1f}ms {medicao['rss_pico_mib']:7.0f}MiB")
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"escala-{commit}-{args.backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            referencia = json.load(arquivo)
+        print(f"\nComparação com {args.comparar} (commit {referencia.get('commit')}):")
+        if comparar(resultado, referencia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+from functions import conexao
+from functions import ingestao
+from functions import migracoes
+
+# 🎲 Gerador de bancos sintéticos (com semente) para os benchmarks
+# O acai.db distribuído tem só 5.000 vendas e 7 produtos, pouco para saber como as
+# consultas do setup.py se comportam com volume de produção. Este gerador cria um banco
+# com o MESMO esquema (via migrações) e N vendas com distribuições realistas:
+#   - transações de 1 a 4 itens, algumas pagas com duas formas de pagamento;
+#   - poucos clientes fiéis concentram muitas compras (cauda longa, lognormal);
+#   - produtos com popularidade decrescente (Zipf) e categorias do cardápio;
+#   - picos no almoço e à noite, fins de semana mais fortes, verão mais forte
+#     e crescimento ao longo do período.
+# A mesma semente e o mesmo número de vendas geram sempre o mesmo banco.
+#
+# Uso (na raiz do repositório):
+#     python -m benchmarks.gerador_dados benchmarks/dados/vendas_1m.db --vendas 1m
+
+ESCALAS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000, "50m": 50_000_000}
+
+SEMENTE_PADRAO = 42
+DIAS_PADRAO = 730
+INICIO_PADRAO = date(2023, 1, 1)
+TAMANHO_LOTE = 200_000
+VENDAS_POR_CLIENTE = 25
+
+# (produto, categoria, preço)
+CARDAPIO = [
+    ("Açaí 300ml", "Açaí", 14.0),
+    ("Açaí 500ml", "Açaí", 20.0),
+    ("Açaí 700ml", "Açaí", 26.0),
+    ("Açaí Bowl", "Açaí", 29.0),
+    ("Açaí 1L", "Açaí", 36.0),
+    ("Açaí Zero 500ml", "Açaí", 22.0),
+    ("Cupuaçu 500ml", "Cremes", 21.0),
+    ("Creme de Ninho 500ml", "Cremes", 22.0),
+    ("Creme de Morango 500ml", "Cremes", 22.0),
+    ("Picolé de Açaí", "Sorvetes", 7.0),
+    ("Sorvete 2 bolas", "Sorvetes", 12.0),
+    ("Milkshake de Açaí", "Bebidas", 18.0),
+    ("Suco de Cupuaçu", "Bebidas", 10.0),
+    ("Água de Coco", "Bebidas", 7.0),
+    ("Refrigerante Lata", "Bebidas", 6.0),
+    ("Adicional Granola", "Complementos", 3.0),
+    ("Adicional Leite Ninho", "Complementos", 4.0),
+    ("Adicional Nutella", "Complementos", 6.0),
+    ("Adicional Paçoca", "Complementos", 3.0),
+    ("Tapioca", "Lanches", 12.0),
+]
+
+FORMAS_PAGAMENTO = [("Pix", 0.38), ("Cartão Crédito", 0.27), ("Cartão Débito", 0.22), ("Dinheiro", 0.13)]
+
+# Loja aberta das 10h às 22h: pico no almoço e à noite
+PESO_HORAS = np.array([0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+                       3, 5, 9, 9, 6, 6, 7, 8, 10, 11, 10, 7, 3, 0], dtype=float)
+# 0=Domingo ... 6=Sábado
+PESO_DIAS_SEMANA = np.array([1.5, 0.8, 0.85, 0.9, 1.0, 1.3, 1.6])
+
+ITENS_POR_TRANSACAO = ([1, 2, 3, 4], [0.55, 0.28, 0.12, 0.05])
+QUANTIDADES = ([1, 2, 3], [0.72, 0.2, 0.08])
+FRACAO_PAGAMENTO_DIVIDIDO = 0.02
+
+
+def _acumulada(pesos):
+    """Distribuição acumulada normalizada, para sortear com np.searchsorted (rápido para n grande)."""
+    acumulada = np.cumsum(np.asarray(pesos, dtype=float))
+    return acumulada / acumulada[-1]
+
+
+def _sortear(rng, acumulada, quantidade):
+    return np.searchsorted(acumulada, rng.random(quantidade), side="right")
+
+
+def _pesos_dias(inicio, dias):
+    """Peso de cada dia: dia da semana x verão (dez-fev) x crescimento ao longo do período."""
+    datas = np.datetime64(inicio) + np.arange(dias)
+    dia_semana = (datas.astype("datetime64[D]").astype(np.int64) + 4) % 7
+    dia_do_ano = (datas - datas.astype("datetime64[Y]")).astype(np.int64)
+    sazonal = 1 + 0.25 * np.cos(2 * np.pi * (dia_do_ano - 15) / 365)
+    crescimento = 1 + 0.8 * np.arange(dias) / max(dias - 1, 1)
+    return PESO_DIAS_SEMANA[dia_semana] * sazonal * crescimento
+
+
+def _cadastrar(cursor, n_clientes):
+    """Insere as dimensões e retorna (ids dos produtos, preços, ids das formas de pagamento)."""
+    categorias = {}
+    for _, categoria, _ in CARDAPIO:
+        if categoria not in categorias:
+            cursor.execute("INSERT INTO categorias (nome_categoria) VALUES (?);", (categoria,))
+            categorias[categoria] = cursor.lastrowid
+    produtos, precos = [], []
+    for nome, categoria, preco in CARDAPIO:
+        cursor.execute("INSERT INTO produtos (nome, preco_unitario, categoria_id) VALUES (?, ?, ?);",
+                       (nome, preco, categorias[categoria]))
+        produtos.append(cursor.lastrowid)
+        precos.append(preco)
+    formas = []
+    for descricao, _ in FORMAS_PAGAMENTO:
+        cursor.execute("INSERT INTO formas_pagamento (descricao) VALUES (?);", (descricao,))
+        formas.append(cursor.lastrowid)
+    cursor.executemany("INSERT INTO clientes (nome) VALUES (?);",
+                       ((f"Cliente {i}",) for i in range(1, n_clientes + 1)))
+    return np.array(produtos), np.array(precos), np.array(formas)
+
+
+def _lote(rng, n_itens, primeira_transacao, distribuicoes, inicio):
+    """Gera ~n_itens vendas (transações inteiras) e retorna (tuplas para executemany, nº de transações)."""
+    cdf_clientes, cdf_dias, cdf_horas, cdf_produtos, cdf_formas, produtos, precos, formas = distribuicoes
+    valores_itens, pesos_itens = ITENS_POR_TRANSACAO
+    n_transacoes = max(1, math.ceil(n_itens / np.dot(valores_itens, pesos_itens)))
+
+    itens = rng.choice(valores_itens, size=n_transacoes, p=pesos_itens)
+    clientes = _sortear(rng, cdf_clientes, n_transacoes) + 1
+    segundos = (_sortear(rng, cdf_dias, n_transacoes) * 86_400
+                + _sortear(rng, cdf_horas, n_transacoes) * 3_600
+                + rng.integers(0, 3_600, n_transacoes))
+    forma = _sortear(rng, cdf_formas, n_transacoes)
+    dividido = rng.random(n_transacoes) < FRACAO_PAGAMENTO_DIVIDIDO
+
+    # Uma linha por item: repete os dados da transação
+    transacao = np.repeat(np.arange(primeira_transacao, primeira_transacao + n_transacoes), itens)
+    posicao = np.arange(len(transacao)) - np.repeat(np.cumsum(itens) - itens, itens)
+    forma_item = np.repeat(forma, itens)
+    # Pagamento dividido: os itens de posição ímpar vão para a forma seguinte
+    forma_item = np.where(np.repeat(dividido, itens) & (posicao % 2 == 1), (forma_item + 1) % len(formas), forma_item)
+    produto = _sortear(rng, cdf_produtos, len(transacao))
+    quantidade = rng.choice(QUANTIDADES[0], size=len(transacao), p=QUANTIDADES[1])
+    preco = precos[produto]
+    # Os itens da mesma transação são registrados com alguns segundos de diferença
+    datas = np.datetime64(inicio, "s") + (np.repeat(segundos, itens) + 7 * posicao).astype("timedelta64[s]")
+    texto_datas = np.char.replace(np.datetime_as_string(datas, unit="s"), "T", " ")
+
+    linhas = list(zip(
+        produtos[produto].tolist(),
+        quantidade.tolist(),
+        preco.tolist(),
+        (quantidade * preco).tolist(),
+        texto_datas.tolist(),
+        np.repeat(clientes, itens).tolist(),
+        formas[forma_item].tolist(),
+        transacao.tolist(),
+    ))
+    return linhas[:n_itens], n_transacoes
+
+
+def gerar_banco(caminho, vendas, semente=SEMENTE_PADRAO, dias=DIAS_PADRAO, inicio=INICIO_PADRAO,
+                tamanho_lote=TAMANHO_LOTE, verbose=False):
+    """
+    Cria (ou substitui) o banco 'caminho' com 'vendas' vendas sintéticas.
+    Retorna um dicionário com vendas inseridas, clientes, transações e segundos gastos.
+    """
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+
+    rng = np.random.default_rng(semente)
+    n_clientes = max(50, vendas // VENDAS_POR_CLIENTE)
+    inicio_tempo = time.perf_counter()
+
+    gerenciador = conexao.GerenciadorConexoes(caminho)
+    try:
+        conn = gerenciador.conexao_escrita()
+        migracoes.aplicar_migracoes(conn)
+        cursor = conn.cursor()
+        # Banco descartável: sem fsync a cada commit e com cache grande para a carga
+        cursor.execute("PRAGMA synchronous = OFF;")
+        cursor.execute("PRAGMA cache_size = -1048576;")
+        # Os índices secundários são recriados no final: ordenar tudo de uma vez no
+        # CREATE INDEX é bem mais rápido que mantê-los linha a linha durante a carga.
+        indices = cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vendas' AND sql IS NOT NULL;"
+        ).fetchall()
+        for nome, _ in indices:
+            cursor.execute(f"DROP INDEX {nome};")
+        # Banco novo, que ninguém está lendo: os gatilhos ficam desligados durante toda a
+        # geração e as tabelas derivadas são recalculadas uma vez só, no final.
+        ingestao._suspender_gatilhos(cursor)
+        produtos, precos, formas = _cadastrar(cursor, n_clientes)
+        conn.commit()
+
+        distribuicoes = (
+            _acumulada(rng.lognormal(0, 1.3, n_clientes)),        # clientes fiéis x ocasionais
+            _acumulada(_pesos_dias(inicio, dias)),
+            _acumulada(PESO_HORAS),
+            _acumulada(1 / np.arange(1, len(produtos) + 1) ** 0.9),  # popularidade (Zipf)
+            _acumulada([peso for _, peso in FORMAS_PAGAMENTO]),
+            produtos, precos, formas,
+        )
+
+        inseridas, transacoes = 0, 0
+        while inseridas < vendas:
+            linhas, n_transacoes = _lote(rng, min(tamanho_lote, vendas - inseridas), transacoes + 1,
+                                         distribuicoes, inicio)
+            cursor.executemany(ingestao.SQL_INSERIR_VENDA, linhas)
+            conn.commit()
+            # Linhas repetidas (mesmo cliente, produto e segundo) são descartadas pelo UNIQUE
+            inseridas += max(cursor.rowcount, 0)
+            transacoes += n_transacoes
+            if verbose:
+                print(f"{inseridas:>12,} vendas geradas", file=sys.stderr)
+
+        todos_os_dias = {str(dia) for dia in np.datetime64(inicio) + np.arange(dias)}
+        cursor.execute("BEGIN;")
+        for _, ddl in indices:
+            cursor.execute(ddl)
+        ingestao._restaurar_gatilhos(cursor, todos_os_dias)
+        cursor.execute("ANALYZE;")
+        conn.commit()
+    finally:
+        gerenciador.fechar()
+
+    return {
+        "vendas": inseridas,
+        "clientes": n_clientes,
+        "transacoes": transacoes,
+        "segundos": time.perf_counter() - inicio_tempo,
+    }
+
+
+def quantidade_vendas(texto):
+    """'10k', '1m', '250000' -> número de vendas."""
+    texto = str(texto).lower().replace("_", "")
+    if texto in ESCALAS:
+        return ESCALAS[texto]
+    multiplicador = {"k": 1_000, "m": 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip("km")) * multiplicador)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um banco SQLite sintético com o esquema do dashboard.")
+    parser.add_argument("banco", help="Arquivo .db a criar (é substituído se existir)")
+    parser.add_argument("--vendas", default="10k", help="Número de vendas: 10k, 1m, 10m, 50m ou um número")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--dias", type=int, default=DIAS_PADRAO, help="Dias de histórico a partir de 2023-01-01")
+    args = parser.parse_args(argv)
+
+    resultado = gerar_banco(args.banco, quantidade_vendas(args.vendas), semente=args.semente, dias=args.dias,
+                            verbose=True)
+    print(
+        f"{args.banco}: {resultado['vendas']:,} vendas, {resultado['transacoes']:,} transações, "
+        f"{resultado['clientes']:,} clientes em {resultado['segundos']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ⏱️ Benchmark de partida a frio (cold start) do processo do dashboard
+# Cada medição roda um interpretador Python NOVO, então nada fica em cache de módulos.
+# Compara as importações que o dashboard.py fazia antes (seaborn, matplotlib e plotly
+# carregados logo na abertura) com as de agora (plotly só nas páginas que o usam),
+# e confere que importar functions.setup não cria nem abre o banco.
+#
+# Uso (na raiz do repositório):
+#     python -m benchmarks.tempo_importacao --repeticoes 10
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# O functions.setup antigo não pode ser reimportado (ele abria o banco e rodava DDL),
+# então o lado "antes" mede só as bibliotecas: a comparação é conservadora.
+IMPORTACOES_ANTES = [
+    "pandas",
+    "streamlit",
+    "streamlit_pills",
+    "seaborn",
+    "matplotlib.pyplot",
+    "sqlite3",
+    "plotly.express",
+    "plotly.graph_objects",
+]
+
+IMPORTACOES_DEPOIS = [
+    "streamlit",
+    "streamlit_pills",
+    "functions.setup",
+]
+
+
+def _medir_importacao(modulos, diretorio):
+    """Mede, em segundos, o tempo de um processo Python novo que só importa 'modulos'."""
+    codigo = "; ".join(f"import {m}" for m in modulos)
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ)
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "-c", codigo], cwd=diretorio, env=ambiente, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - inicio
+
+
+def _resumo(tempos):
+    return {
+        "mediana": statistics.median(tempos),
+        "minimo": min(tempos),
+        "maximo": max(tempos),
+    }
+
+
+def importacao_sem_efeitos(diretorio):
+    """Importa functions.setup num diretório vazio e confere que nenhum banco foi criado."""
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ)
+    subprocess.run([sys.executable, "-c", "import functions.setup"], cwd=diretorio, env=ambiente,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return not os.path.exists(os.path.join(diretorio, "acai.db"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara o tempo de partida a frio do dashboard.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        sem_efeitos = importacao_sem_efeitos(diretorio)
+        print(f"Importar functions.setup sem abrir o banco: {'OK' if sem_efeitos else 'FALHOU'}")
+
+        # Aquece o cache de disco do sistema operacional antes de medir
+        _medir_importacao(IMPORTACOES_ANTES, diretorio)
+
+        antes, depois = [], []
+        for _ in range(args.repeticoes):
+            # Alterna as medições para que variações da máquina afetem os dois lados igualmente
+            antes.append(_medir_importacao(IMPORTACOES_ANTES, diretorio))
+            depois.append(_medir_importacao(IMPORTACOES_DEPOIS, diretorio))
+
+    r_antes, r_depois = _resumo(antes), _resumo(depois)
+    print(f"{'':10} {'mediana':>9} {'mínimo':>9} {'máximo':>9}")
+    for nome, r in (("antes", r_antes), ("depois", r_depois)):
+        print(f"{nome:10} {r['mediana']:8.3f}s {r['minimo']:8.3f}s {r['maximo']:8.3f}s")
+    ganho = r_antes["mediana"] - r_depois["mediana"]
+    print(f"Partida a frio {ganho:.3f}s mais rápida ({ganho / r_antes['mediana']:.0%}).")
+
+    if not sem_efeitos or ganho <= 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
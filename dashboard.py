@@ -1,12 +1,16 @@
-import pandas as pd
+import time
 import streamlit as st
-import streamlit-pills as stp
-import seaborn as sns
-import matplotlib.pyplot as plt
+import streamlit_pills as stp
+from datetime import date, datetime, timedelta
+from functions import ao_vivo
+from functions import carregador
+from functions import diagnostico
+from functions import lojas
+from functions import paginas
 from functions import setup
-import sqlite3
-import plotly.express as px
-import plotly.graph_objects as go
+from functions import snapshots
+# O plotly só é importado dentro das páginas que desenham gráficos com ele
+# (Formas de Pagamento e Clientes), para não pesar na abertura do dashboard.
 
 
 # --- Configuração da Página (DEVE SER A PRIMEIRA CHAMADA DO STREAMLIT) ---
@@ -86,14 +90,134 @@ st.markdown("""
     visibility: visible;
     opacity: 1;
 }
+
+/* --- MARGEM DE ERRO (MODO APROXIMADO) --- */
+.kpi-card .margem-erro { margin: 0; font-size: 0.9em; color: #666666; }
 </style>
 """, unsafe_allow_html=True)
 
 
+# Tempo de renderização da página e consultas feitas nela (vistos na página "Diagnóstico")
+inicio_render = time.perf_counter()
+consultas_antes = diagnostico.total_registradas()
+
 st.title("DASHBOARD")
+
+# --- LOJAS ---
+# Com um cadastro de lojas (lojas.json, veja functions/lojas.py), a barra lateral ganha um
+# seletor de loja; "Todas as lojas" junta os números de todas (functions/federacao.py).
+# Sem cadastro, tudo vem do banco padrão (acai.db), como antes.
+cadastro_lojas = lojas.carregar_lojas()
+if cadastro_lojas:
+    nomes_lojas = [lojas.TODAS] + [loja.nome for loja in cadastro_lojas]
+    escolha_loja = st.sidebar.selectbox("Loja", nomes_lojas, key="filtro_loja")
+    lojas_selecionadas = cadastro_lojas if escolha_loja == lojas.TODAS else [
+        loja for loja in cadastro_lojas if loja.nome == escolha_loja
+    ]
+else:
+    lojas_selecionadas = None
+    # Abre o banco padrão (aplica migrações pendentes só na primeira vez)
+    setup.init_db()
+
+# --- FILTRO GLOBAL DE PERÍODO ---
+# Todas as consultas recebem 'inicio'/'fim', que viram filtros de faixa no SQL:
+# "Últimos 7 dias" lê só as vendas da última semana.
+opcoes_periodo = paginas.PERIODOS
+hoje = date.today()
+escolha_periodo = st.sidebar.selectbox("Período", list(opcoes_periodo), key="filtro_periodo")
+dias_periodo = opcoes_periodo[escolha_periodo]
+
+if dias_periodo == "personalizado":
+    intervalo = st.sidebar.date_input("Intervalo", value=(hoje - timedelta(days=30), hoje), format="DD/MM/YYYY")
+    # Enquanto o usuário escolhe só a primeira data, o intervalo vem com um único elemento
+    inicio_periodo = intervalo[0] if intervalo else None
+    fim_periodo = intervalo[1] if len(intervalo) > 1 else inicio_periodo
+    periodo = {"inicio": inicio_periodo, "fim": fim_periodo}
+else:
+    periodo = paginas.periodo_predefinido(dias_periodo, hoje)
+
+if periodo["inicio"] is not None:
+    st.sidebar.caption(f"De {periodo['inicio']:%d/%m/%Y} até {periodo['fim']:%d/%m/%Y}")
+
+# --- MODO APROXIMADO ---
+# Para históricos muito grandes: clientes e rankings de produtos/categorias saem dos esboços
+# por dia e da amostra das vendas (functions/aproximacao.py), com a margem de erro nos cards.
+modo_aproximado = st.sidebar.toggle(
+    "Modo aproximado", key="modo_aproximado",
+    help="Estima clientes e rankings sem varrer todas as vendas do período. Mais rápido, com margem de erro.",
+)
+
+# --- MODO AO VIVO ---
+# Para quem deixa o dashboard aberto durante o expediente: os números de "Todo o período" saem
+# de agregados em memória que só somam as vendas novas (functions/ao_vivo.py), e a página se
+# redesenha sozinha quando chega venda.
+ao_vivo_disponivel = ao_vivo.disponivel(lojas_selecionadas, **periodo)
+ao_vivo_ligado = st.sidebar.toggle(
+    "Ao vivo", key="ao_vivo", disabled=not ao_vivo_disponivel,
+    help=f"Confere a cada {ao_vivo.INTERVALO_SEGUNDOS}s se chegaram vendas e atualiza a página sozinho. "
+         "Vale para 'Todo o período' e uma loja.",
+) and ao_vivo_disponivel
+
+if ao_vivo_ligado:
+    # Versão dos dados que esta execução vai mostrar
+    st.session_state["ao_vivo_versao"] = ao_vivo.atualizar(lojas_selecionadas)
+
+    @st.fragment(run_every=ao_vivo.INTERVALO_SEGUNDOS)
+    def verificar_vendas_novas():
+        # Só a verificação roda a cada intervalo; a página inteira, só quando os dados mudaram
+        if ao_vivo.atualizar(lojas_selecionadas) != st.session_state.get("ao_vivo_versao"):
+            st.rerun()
+        st.caption(f"🔴 Ao vivo: conferido às {datetime.now():%H:%M:%S}.")
+
+    with st.sidebar:
+        verificar_vendas_novas()
+
+# --- SNAPSHOTS ---
+# Com o trabalhador de snapshots rodando (python -m functions.snapshots), as páginas saem do
+# snapshot mais recente, pré-calculado, e não de consultas feitas nesta execução do script.
+snapshots.usar_snapshots()
+gerado_em = snapshots.gerado_em()
+if gerado_em is not None and dias_periodo != "personalizado":
+    st.sidebar.caption(f"Números pré-calculados em {gerado_em:%d/%m/%Y %H:%M}.")
+
+# --- LISTAS COMPLETAS PAGINADAS ---
+# As tabelas "Ver lista completa" mostram uma página por vez (setup.get_pagina_*): cada clique em
+# "Próxima"/"Anterior" busca, e envia ao navegador, só as linhas daquela página.
+def lista_paginada(nome, rotulo):
+    """Busca por nome, tabela da página atual e navegação da lista 'nome' (paginas.LISTAS)."""
+    busca = st.text_input(f"Buscar {rotulo}", key=f"lista_{nome}_busca").strip()
+    # Chave de início de cada página já visitada ([None] = primeira); recomeça quando a busca ou os filtros mudam
+    contexto = (
+        paginas.pagina_lista(nome, periodo, modo_aproximado, busca=busca),
+        tuple(loja.nome for loja in lojas_selecionadas or []),
+    )
+    if st.session_state.get(f"lista_{nome}_contexto") != contexto:
+        st.session_state[f"lista_{nome}_contexto"] = contexto
+        st.session_state[f"lista_{nome}_chaves"] = [None]
+    chaves = st.session_state[f"lista_{nome}_chaves"]
+
+    chamada = paginas.pagina_lista(nome, periodo, modo_aproximado, apos=chaves[-1], busca=busca)
+    df = carregador.carregar({nome: chamada}, lojas=lojas_selecionadas, ao_vivo=ao_vivo_ligado)[nome]
+    proxima = df.attrs.get("proxima")
+    if df.empty:
+        st.info(f"Nenhum {rotulo} encontrado.")
+    else:
+        st.dataframe(df, hide_index=True, use_container_width=True)
+
+    anterior, numero, seguinte = st.columns([1, 2, 1])
+    anterior.button("◀ Anterior", key=f"lista_{nome}_anterior", disabled=len(chaves) == 1, on_click=chaves.pop)
+    numero.caption(f"Página {len(chaves)}" + ("" if proxima else " (última)"))
+    seguinte.button("Próxima ▶", key=f"lista_{nome}_proxima", disabled=proxima is None,
+                    on_click=chaves.append, args=(proxima,))
+
 opcoes_menu = ["Visão Geral", "Análise de Vendas", "Análise de Produtos & Categorias", "Análises de Formas de Pagamento", "Análises de Clientes"]
 icones_menu = ["💡", "💰", "🗃️", "📈", "👥"] # Ícones são usados apenas para display nos pills
 
+# Página escondida: só aparece no menu abrindo o dashboard com ?diagnostico=1 na URL
+if st.query_params.get("diagnostico"):
+    opcoes_menu.append("Diagnóstico")
+    icones_menu.append("🩺")
+
 # Inicializa 'pagina_selecionada' no session_state se ainda não existir
 if 'pagina_selecionada' not in st.session_state:
     if opcoes_menu: # Garante que há opções
@@ -147,29 +271,23 @@ if pagina_atual == "Visão Geral":
     st.markdown("---")
     
     # --- BUSCA DE TODOS OS DADOS NECESSÁRIOS ---
-    cursor = setup.cursor
-    conn = setup.conn
-    
-    # Dados para os cards
-    total_vendas_valor = setup.calcular_valor_total_vendas(cursor)
-    qtd_vendas = setup.calcular_quantidade_vendas(cursor)
-    ticket_medio = setup.calcular_ticket_medio(cursor)
-    num_clientes = setup.total_clientes(cursor)
-
-    df_produtos = setup.get_vendas_por_produto(conn)
-    df_pagamentos = setup.get_vendas_por_forma_pagamento(conn)
-    df_dias = setup.get_vendas_por_dia_da_semana(conn)
-    df_horas = setup.get_vendas_por_hora_do_dia(conn)
-    df_categorias = setup.get_top_categorias(setup.conn)
+    # Um único snapshot com todos os números dos cards (uma varredura de 'vendas')
+    kpis = carregador.carregar(
+        paginas.chamadas_pagina(pagina_atual, periodo), lojas=lojas_selecionadas, ao_vivo=ao_vivo_ligado
+    )["kpis"]
 
-    # 2. Pegue o NOME da primeira da lista (a mais vendida)
+    # Dados para os cards
+    total_vendas_valor = kpis.receita_total
+    qtd_vendas = kpis.quantidade_vendas
+    ticket_medio = kpis.ticket_medio
+    num_clientes = kpis.total_clientes
 
     # Encontra os valores de destaque
-    produto_top = df_produtos.iloc[0]["Produto"] if not df_produtos.empty else "N/D"
-    pagamento_top = df_pagamentos.iloc[0]["Forma de Pagamento"] if not df_pagamentos.empty else "N/D"
-    dia_pico = df_dias.sort_values(by="Total Vendido", ascending=False).iloc[0]["Dia da Semana"] if not df_dias.empty else "N/D"
-    hora_pico = df_horas.sort_values(by="Total Vendido", ascending=False).iloc[0]["Hora"] if not df_horas.empty else "N/D"
-    categoria_top = df_categorias.iloc[0]["Categoria"] if not df_categorias.empty else "N/D"
+    produto_top = kpis.produto_campeao
+    pagamento_top = kpis.pagamento_preferido
+    dia_pico = kpis.dia_pico
+    hora_pico = kpis.hora_pico
+    categoria_top = kpis.categoria_campea
 
 
     # --- FILEIRA 1: CARDS NUMÉRICOS ---
@@ -247,17 +365,24 @@ if pagina_atual == "Visão Geral":
 elif pagina_atual == "Análise de Vendas": # <--- CORRIGIDO
     st.header(f"Análise de Vendas {icones_menu[opcoes_menu.index(pagina_atual)]}")
     st.write("Desempenho das vendas e sua peridiocidade")
-    cursor = setup.cursor
-    conn = setup.conn
-
-    df_dias = setup.get_vendas_por_dia_da_semana(conn)
-    df_horas = setup.get_vendas_por_hora_do_dia(conn)
-    df_pico_horarios = setup.get_vendas_por_hora_do_dia(setup.conn)
-    total_vendas_valor = setup.calcular_valor_total_vendas(cursor)
-    qtd_vendas = setup.calcular_quantidade_vendas(cursor)
-    ticket_medio = setup.calcular_ticket_medio(cursor)
-    dia_pico = df_dias.sort_values(by="Total Vendido", ascending=False).iloc[0]["Dia da Semana"] if not df_dias.empty else "N/D"
-    hora_pico = df_horas.sort_values(by="Total Vendido", ascending=False).iloc[0]["Hora"] if not df_horas.empty else "N/D"
+
+    # Todas as consultas da página de uma vez, em paralelo (veja functions/carregador.py)
+    dados = carregador.carregar(
+        paginas.chamadas_pagina(pagina_atual, periodo, picos=st.session_state.get("evolucao_picos", False)),
+        lojas=lojas_selecionadas, ao_vivo=ao_vivo_ligado,
+    )
+
+    # Cards: mesmo snapshot de KPIs da Visão Geral
+    kpis = dados["kpis"]
+    total_vendas_valor = kpis.receita_total
+    qtd_vendas = kpis.quantidade_vendas
+    ticket_medio = kpis.ticket_medio
+    dia_pico = kpis.dia_pico
+    hora_pico = kpis.hora_pico
+
+    # Gráficos: cada série é buscada uma única vez
+    df_dia_semana = dados["dia_semana"]
+    df_pico_horarios = dados["pico_horarios"]
     
     col1, col2, col3, col4, col5= st.columns(5)
     with col1:
@@ -307,7 +432,6 @@ elif pagina_atual == "Análise de Vendas": # <--- CORRIGIDO
     # --- GRÁFICO 1: DIAS DA SEMANA (na primeira coluna) ---
     with col3:
         st.subheader("Vendas por Dia da Semana")
-        df_dia_semana = setup.get_vendas_por_dia_da_semana(setup.conn)
                 # Plota o gráfico de barras
         st.bar_chart(df_dia_semana.set_index("Dia da Semana"))
 
@@ -329,19 +453,35 @@ elif pagina_atual == "Análise de Vendas": # <--- CORRIGIDO
 
     st.subheader("Evolução Histórica das Vendas 📈")
     st.caption("Use o scroll do mouse para dar zoom e navegar pela linha do tempo.")
-    df_evolucao = setup.obter_dados_vendas(setup.conn)
+    st.toggle(
+        "Preservar picos diários", key="evolucao_picos",
+        help="Mostra valores de dias (os que desenham os picos e vales) em vez de somas por semana/mês.",
+    )
+    df_evolucao = dados["evolucao"]
+
+    # A primeira coluna diz a resolução escolhida: "Dia", "Semana" ou "Mês"
+    coluna_tempo = df_evolucao.columns[0]
+    if coluna_tempo != "Dia":
+        st.caption(f"Total por {coluna_tempo.lower()} ({len(df_evolucao)} pontos).")
 
     # Criar gráfico de evolução de vendas)
-    st.line_chart(df_evolucao.set_index("Dia"))
+    st.line_chart(df_evolucao.set_index(coluna_tempo))
 
 elif pagina_atual == "Análise de Produtos & Categorias":
     st.header(f"Análise de Produtos & Categorias 🗃️")
     st.markdown("---")
 
-    df_produtos = setup.get_vendas_por_produto(setup.conn)
+    # No modo aproximado, os rankings são estimados pela amostra das vendas
+    dados = carregador.carregar(
+        paginas.chamadas_pagina(pagina_atual, periodo, modo_aproximado), lojas=lojas_selecionadas, ao_vivo=ao_vivo_ligado
+    )
+    if modo_aproximado:
+        st.caption(f"≈ Valores estimados a partir de uma amostra de {dados['amostra'][0]} vendas do período.")
+
+    df_produtos = dados["produtos"]
     # Encontra os valores de destaque
     produto_top = df_produtos.iloc[0]["Produto"] if not df_produtos.empty else "N/D"
-    df_categorias = setup.get_top_categorias(setup.conn)
+    df_categorias = dados["categorias"]
 
     # 2. Pegue o NOME da primeira da lista (a mais vendida)
     categoria_top = df_categorias.iloc[0]["Categoria"] if not df_categorias.empty else "N/D"
@@ -370,23 +510,14 @@ elif pagina_atual == "Análise de Produtos & Categorias":
     with col3:
         st.subheader("🏆 Produtos Mais Rentáveis")
         try:
-            # 1. Busca a LISTA COMPLETA de todos os produtos
-            df_todos_produtos = setup.get_top_produtos(setup.conn, limite=None)
-
-            if not df_todos_produtos.empty:
-                # 2. Cria uma "fatia" menor, apenas com o Top 3, para o GRÁFICO
-                df_grafico = df_todos_produtos.head(3)
-                
-                # 3. Usa a fatia menor (Top 3) no gráfico
-                st.bar_chart(df_grafico.set_index("Produto"))
+            # 1. O topo (paginas.TOP_GRAFICO produtos) já veio com a página: é o que o gráfico mostra
+            if not df_produtos.empty:
+                # 2. Usa o topo no gráfico
+                st.bar_chart(df_produtos.set_index("Produto"))
 
-                # 4. Usa a lista COMPLETA na tabela dentro do expander
+                # 3. A lista COMPLETA vem uma página por vez
                 with st.expander("Ver lista completa de produtos"):
-                    st.dataframe(
-                        df_todos_produtos, 
-                        hide_index=True, 
-                        use_container_width=True
-                    )
+                    lista_paginada("produtos", "produto")
             else:
                 st.warning("Não há dados de produtos para exibir.")
         except Exception as e:
@@ -394,38 +525,34 @@ elif pagina_atual == "Análise de Produtos & Categorias":
 
     with col4:
         st.subheader("🏆 Categorias Mais Rentáveis")
-        
-            # Lógica idêntica para as categorias
-        df_todas_categorias = setup.get_top_categorias(setup.conn, limite=None)
 
-            
-        df_grafico_cat = df_todas_categorias.head(3)
-                
-        st.bar_chart(df_grafico_cat.set_index("Categoria"))
+        # Lógica idêntica para as categorias
+        st.bar_chart(df_categorias.set_index("Categoria"))
 
         with st.expander("Ver lista completa de categorias"):
-                    st.dataframe(
-                        df_todas_categorias, 
-                        hide_index=True, 
-                        use_container_width=True
-                    )
-        
+            lista_paginada("categorias", "categoria")
+
 # Em dashboard.py
 elif pagina_atual == "Análises de Formas de Pagamento":
+    import plotly.express as px
     st.header(f"Análises de Formas de Pagamento 📈")
     st.markdown("---")
     
-    df_analise_pag = setup.get_analise_formas_pagamento(setup.conn)
     # --- Carrega os dados uma única vez ---
-    df_pagamentos = setup.get_vendas_por_forma_pagamento(setup.conn)
-    # 1. Busca os dados ordenados por frequência
-    df_frequente = setup.get_frequencia_forma_pagamento(setup.conn)
+    # As chamadas repetidas viram uma consulta só, e as diferentes rodam em paralelo
+    dados = carregador.carregar(
+        paginas.chamadas_pagina(pagina_atual, periodo), lojas=lojas_selecionadas, ao_vivo=ao_vivo_ligado
+    )
+    df_analise_pag = dados["analise_pag"]
+    df_pagamentos = dados["pagamentos"]
+    # 1. Dados ordenados por frequência
+    df_frequente = dados["frequente"]
 
-    df_pag_qtd = setup.get_frequencia_forma_pagamento(setup.conn)
+    df_pag_qtd = dados["pag_qtd"]
     # 2. Pega o nome do primeiro da lista
     pagamento_frequente = df_frequente.iloc[0]["Forma de Pagamento"] if not df_frequente.empty else "N/D"
-    # 1. Busca os dados ordenados por valor
-    df_rentavel = setup.get_vendas_por_forma_pagamento(setup.conn)
+    # 1. Dados ordenados por valor
+    df_rentavel = dados["rentavel"]
     # 2. Pega o nome do primeiro da lista
     pagamento_rentavel = df_rentavel.iloc[0]["Forma de Pagamento"] if not df_rentavel.empty else "N/D"
 
@@ -491,7 +618,7 @@ elif pagina_atual == "Análises de Formas de Pagamento":
     with col4:
                 # --- Gráfico 2: Comparativo de Ticket Médio (Bar Chart) ---
                 st.subheader("Ticket Médio por Pagamento")
-                df_ticket = setup.get_analise_formas_pagamento(setup.conn)
+                df_ticket = dados["ticket"]
 
        
                 fig_ticket = px.bar(
@@ -558,21 +685,32 @@ elif pagina_atual == "Análises de Formas de Pagamento":
             }
         )
 elif pagina_atual == "Análises de Clientes":
+    import plotly.express as px
     st.header(f"Análises de Clientes 👥")
     st.markdown("---")
 
     # --- CARDS DE KPI PARA CLIENTES ---
-    # Busca os dados usando as funções que existem no seu setup.py
-    total_de_clientes = setup.total_clientes(setup.cursor)
-    
-    # AQUI ESTÁ A CORREÇÃO: Chamando a nova função pelo nome correto
-    receita_media_cliente = setup.calcular_receita_media_por_cliente(setup.cursor)
+    # Busca os dados usando as funções que existem no seu setup.py (em paralelo)
+    # No modo aproximado, os dois cards recebem uma Estimativa (valor + erro relativo)
+    dados = carregador.carregar(
+        paginas.chamadas_pagina(pagina_atual, periodo, modo_aproximado), lojas=lojas_selecionadas, ao_vivo=ao_vivo_ligado
+    )
+    total_de_clientes = dados["total_clientes"]
+    receita_media_cliente = dados["receita_media"]
+    prefixo, margem = "", ""
+    if modo_aproximado:
+        erro = total_de_clientes.erro_relativo
+        if erro:
+            prefixo = "≈ "
+            margem = f'<p class="margem-erro">± {erro:.1%} (estimativa, ~95% de confiança)</p>'
+        total_de_clientes = round(total_de_clientes.valor)
+        receita_media_cliente = receita_media_cliente.valor
     
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown(f'<div class="kpi-card color-4"><h3>Total de Clientes</h3><h2>{total_de_clientes}</h2></div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="kpi-card color-4"><h3>Total de Clientes</h3><h2>{prefixo}{total_de_clientes}</h2>{margem}</div>', unsafe_allow_html=True)
     with col2:
-        st.markdown(f'<div class="kpi-card color-8"><h3>Receita Média / Cliente</h3><h2>R$ {receita_media_cliente:,.2f}</h2></div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="kpi-card color-8"><h3>Receita Média / Cliente</h3><h2>{prefixo}R$ {receita_media_cliente:,.2f}</h2>{margem}</div>', unsafe_allow_html=True)
         
     st.markdown("---")
 
@@ -580,7 +718,7 @@ elif pagina_atual == "Análises de Clientes":
     st.subheader("Top 5 Clientes por Valor Gasto")
     
     # A função get_top_clientes já existe e está correta
-    df_clientes = setup.get_top_clientes(setup.conn, limite=5)
+    df_clientes = dados["top_clientes"]
     
     if not df_clientes.empty:
         fig_clientes = px.bar(
@@ -600,9 +738,48 @@ elif pagina_atual == "Análises de Clientes":
             title_text=''
         )
         st.plotly_chart(fig_clientes, use_container_width=True)
+
+        with st.expander("Ver lista completa de clientes"):
+            lista_paginada("clientes", "cliente")
     else:
         st.warning("Não há dados de clientes para exibir.")
 
+elif pagina_atual == "Diagnóstico":
+    st.header("Diagnóstico 🩺")
+    st.caption("Consultas SQL executadas por este processo (as respondidas pelo cache não chegam ao banco).")
+    st.markdown("---")
+
+    cache = setup.estatisticas_cache()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Consultas registradas", diagnostico.total_registradas())
+    col2.metric("Acertos do cache", cache["hits"])
+    col3.metric("Falhas do cache", cache["misses"])
+    col4.metric("Taxa de acerto", f"{cache['taxa_acerto']:.0%}")
+
+    st.subheader("Tempo de renderização por página")
+    st.dataframe(diagnostico.tempos_paginas(), hide_index=True, use_container_width=True)
+
+    st.subheader("Tempo por função")
+    st.dataframe(diagnostico.resumo_por_funcao(), hide_index=True, use_container_width=True)
+
+    lentas = diagnostico.consultas_mais_lentas(20)
+    varreduras = lentas[lentas["Varredura completa"]]
+    if not varreduras.empty:
+        st.warning(
+            "Consultas que leem uma tabela inteira sem índice: "
+            + ", ".join(sorted(set(varreduras["Função"])))
+        )
+
+    st.subheader("Consultas mais lentas")
+    st.dataframe(lentas, hide_index=True, use_container_width=True)
+
+    if st.button("Limpar registros"):
+        diagnostico.limpar()
+        st.rerun()
+
 else:
     if opcoes_menu:
         st.warning("Página não encontrada. Por favor, selecione uma opção válida no menu.")
+
+diagnostico.registrar_pagina(pagina_atual, time.perf_counter() - inicio_render,
+                             diagnostico.total_registradas() - consultas_antes)
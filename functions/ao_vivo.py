@@ -0,0 +1,300 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from functions import lojas as cadastro_lojas
+from functions import quadros
+from functions import series
+from functions import setup
+from functions.cache import token_dados
+from functions.motor_colunar import (
+    DIMENSOES, LINHAS_POR_BLOCO, NOMES_DIAS_SEMANA, SEGUNDOS_DIA, SQL_VENDAS,
+    Dimensao, anexar_dimensoes, blocos_arquivados, datas_dias, somar_por_nome,
+)
+
+# 🔴 Modo ao vivo: agregados em memória atualizados só com as vendas novas
+# Com o dashboard aberto o dia inteiro, cada atualização refazia as somas de TODO o histórico,
+# embora só algumas vendas tivessem chegado desde a anterior. Aqui, cada banco tem um
+# AgregadosAoVivo (um por processo, compartilhado entre as sessões) que guarda:
+#
+#   - a marca d'água: o maior vendas.id já somado;
+#   - os totais correntes: receita, itens e as transações (ticket médio);
+#   - a receita e as linhas por produto, forma de pagamento, hora, dia da semana, dia e cliente,
+#     em arrays indexados pelo id (ou pela posição).
+#
+# atualizar() lê só as linhas com id acima da marca d'água (e os cadastros novos) e soma
+# cada bloco nos arrays; as respostas custam O(número de produtos/clientes/dias), e não
+# O(número de vendas). A primeira chamada carrega o histórico inteiro, com os meses arquivados.
+#
+# Só responde as funções do setup.py listadas em RESPOSTAS, e só para "Todo o período" (sem
+# inicio/fim) e uma loja: o resto segue pelo caminho normal. Como no motor colunar, exclusões e
+# alterações feitas direto no banco não são vistas: depois delas, chame recarregar().
+#
+# No dashboard, o interruptor "Ao vivo" passa ao_vivo=True ao carregador e confere, a cada
+# INTERVALO_SEGUNDOS, se chegou venda nova (st.fragment); só então a página é redesenhada.
+
+INTERVALO_SEGUNDOS = 5
+
+RESPOSTAS = (
+    "get_kpi_snapshot",
+    "calcular_valor_total_vendas",
+    "calcular_quantidade_vendas",
+    "calcular_ticket_medio",
+    "total_clientes",
+    "calcular_receita_media_por_cliente",
+    "get_top_clientes",
+    "get_top_produtos",
+    "get_top_categorias",
+    "get_vendas_por_produto",
+    "get_vendas_por_forma_pagamento",
+    "get_vendas_por_hora_do_dia",
+    "get_vendas_por_dia_da_semana",
+    "get_evolucao_vendas_diaria",
+    "obter_dados_vendas",
+)
+
+
+def _acumular(acumulado, chaves, pesos=None):
+    """acumulado[chave] += peso (ou += 1, sem pesos), aumentando o array se aparecer chave nova."""
+    somas = np.bincount(chaves, weights=pesos, minlength=len(acumulado)).astype(acumulado.dtype)
+    somas[:len(acumulado)] += acumulado
+    return somas
+
+
+class _Soma:
+    """Receita e número de linhas por chave (id, hora, dia, ...)."""
+
+    def __init__(self, tamanho=0):
+        self.receita = np.zeros(tamanho, dtype=np.float64)
+        self.linhas = np.zeros(tamanho, dtype=np.int64)
+
+    def somar(self, chaves, valores):
+        self.receita = _acumular(self.receita, chaves, valores)
+        self.linhas = _acumular(self.linhas, chaves)
+
+    def com_venda(self):
+        """Chaves com pelo menos uma linha e a receita de cada uma."""
+        chaves = np.flatnonzero(self.linhas)
+        return chaves, self.receita[chaves]
+
+
+class AgregadosAoVivo:
+    """Somas correntes de 'vendas' (todo o período), atualizadas pela marca d'água de id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recarregar()
+
+    def recarregar(self):
+        """Zera os agregados; a próxima atualização soma o banco inteiro de novo."""
+        with self._lock:
+            self.ultimo_id = 0
+            self.versao = None
+            self.receita = 0.0
+            self.itens = 0
+            self.receita_transacoes = 0.0
+            self.transacoes = np.empty(0, dtype=np.int64)  # ids distintos, em ordem
+            self.por_produto = _Soma()
+            self.por_pagamento = _Soma()
+            self.por_cliente = _Soma()
+            self.por_dia = _Soma()        # dias desde 1970-01-01
+            self.por_hora = _Soma(24)
+            self.por_dia_semana = _Soma(7)
+            self._dimensoes = {tabela: Dimensao() for tabela in DIMENSOES}
+
+    # --- ATUALIZAÇÃO -----------------------------------------------------------------------
+
+    def _somar_bloco(self, df):
+        valores = df["valor_total_item"].to_numpy(dtype=np.float64)
+        epoch = df["epoch"].to_numpy(dtype=np.int64)
+        dia = epoch // SEGUNDOS_DIA
+        self.receita += float(valores.sum())
+        self.itens += int(df["quantidade"].sum())
+        self.por_produto.somar(df["produto_id"].to_numpy(dtype=np.int64), valores)
+        self.por_pagamento.somar(df["formas_pagamento_id"].to_numpy(dtype=np.int64), valores)
+        self.por_cliente.somar(df["cliente_id"].to_numpy(dtype=np.int64), valores)
+        self.por_dia.somar(dia, valores)
+        self.por_hora.somar((epoch % SEGUNDOS_DIA) // 3600, valores)
+        # 1970-01-01 foi uma quinta-feira (%w = 4)
+        self.por_dia_semana.somar((dia + 4) % 7, valores)
+
+        transacoes = df["transacao_id"].to_numpy(dtype=np.float64)  # NULL chega como NaN
+        com_transacao = ~np.isnan(transacoes)
+        self.receita_transacoes += float(valores[com_transacao].sum())
+        novas = np.unique(transacoes[com_transacao].astype(np.int64))
+        posicoes = np.searchsorted(self.transacoes, novas)
+        ja_vistas = posicoes < len(self.transacoes)
+        ja_vistas[ja_vistas] = self.transacoes[posicoes[ja_vistas]] == novas[ja_vistas]
+        self.transacoes = np.insert(self.transacoes, posicoes[~ja_vistas], novas[~ja_vistas])
+        self.ultimo_id = max(self.ultimo_id, int(df["id"].max()))
+
+    def atualizar(self, conn):
+        """
+        Soma as vendas com id acima da marca d'água e anexa os cadastros novos.
+        Retorna a versão dos dados somados (muda sempre que entra venda ou cadastro).
+        """
+        versao = token_dados(conn)
+        with self._lock:
+            if versao == self.versao:
+                return versao
+            primeira_carga = self.versao is None
+            self._dimensoes = anexar_dimensoes(conn, self._dimensoes)
+            blocos = pd.read_sql_query(SQL_VENDAS, conn, params=(self.ultimo_id,), chunksize=LINHAS_POR_BLOCO)
+            if primeira_carga:
+                # Os meses movidos para o arquivo em Parquet também entram, uma vez
+                blocos = blocos_arquivados(conn) + list(blocos)
+            for df in blocos:
+                if len(df):
+                    self._somar_bloco(df)
+            self.versao = versao
+            return versao
+
+    # --- CONSULTAS (mesmos nomes e retornos das funções do setup.py, sem período) ----------
+
+    def _por_nome(self, soma, tabela, coluna_nome):
+        chaves, receitas = soma.com_venda()
+        return somar_por_nome(chaves, receitas, self._dimensoes[tabela], coluna_nome, "Total Vendido")
+
+    def calcular_valor_total_vendas(self):
+        return self.receita
+
+    def calcular_quantidade_vendas(self):
+        return self.itens
+
+    def calcular_ticket_medio(self):
+        return self.receita_transacoes / len(self.transacoes) if len(self.transacoes) else 0
+
+    def total_clientes(self):
+        return int(np.count_nonzero(self._dimensoes["clientes"].nomes != None))  # noqa: E711
+
+    def calcular_receita_media_por_cliente(self):
+        compradores = np.count_nonzero(self.por_cliente.linhas)
+        return self.receita / compradores if compradores else 0
+
+    def get_top_clientes(self, limite=10):
+        ids, receitas = self.por_cliente.com_venda()
+        nomes = self._dimensoes["clientes"].nomes_ate(len(self.por_cliente.linhas))
+        com_nome = nomes[ids] != None  # noqa: E711
+        ids, receitas = ids[com_nome], receitas[com_nome]
+        # ORDER BY total DESC, c.id ASC
+        ordem = np.argsort(-receitas, kind="stable")
+        if limite is not None and limite >= 0:
+            ordem = ordem[:limite]
+        return pd.DataFrame({"Cliente": nomes[ids[ordem]], "Total Gasto": receitas[ordem]})
+
+    def get_vendas_por_produto(self):
+        return self._por_nome(self.por_produto, "produtos", "Produto")
+
+    def get_top_produtos(self, limite=None):
+        df = self.get_vendas_por_produto()
+        return df if limite is None else df.head(limite)
+
+    def get_top_categorias(self, limite=None):
+        produtos, receitas = self.por_produto.com_venda()
+        cadastro = self._dimensoes["produtos"]
+        # Categoria de cada produto vendido (-1 quando o produto não existe: o JOIN descartaria a linha)
+        categoria_do_produto = np.full(len(self.por_produto.linhas), -1, dtype=np.int64)
+        conhecidos = min(len(cadastro.extra), len(categoria_do_produto))
+        categoria_do_produto[:conhecidos] = np.where(
+            cadastro.nomes[:conhecidos] != None, cadastro.extra[:conhecidos], -1  # noqa: E711
+        )
+        df = somar_por_nome(
+            categoria_do_produto[produtos], receitas, self._dimensoes["categorias"], "Categoria", "Total Vendido",
+        )
+        return df if limite is None else df.head(limite)
+
+    def get_vendas_por_forma_pagamento(self):
+        return self._por_nome(self.por_pagamento, "formas_pagamento", "Forma de Pagamento")
+
+    def get_vendas_por_hora_do_dia(self):
+        horas, receitas = self.por_hora.com_venda()
+        return pd.DataFrame({"Hora": [f"{hora:02d}h" for hora in horas], "Total Vendido": receitas})
+
+    def get_vendas_por_dia_da_semana(self):
+        dias, receitas = self.por_dia_semana.com_venda()
+        return pd.DataFrame({"Dia da Semana": [NOMES_DIAS_SEMANA[d] for d in dias], "Total Vendido": receitas})
+
+    def get_evolucao_vendas_diaria(self):
+        dias, receitas = self.por_dia.com_venda()
+        return pd.DataFrame({"Dia": datas_dias(dias), "Total Vendido": receitas})
+
+    def obter_dados_vendas(self, pontos=None, lttb=False):
+        df = self.get_evolucao_vendas_diaria()
+        return series.reduzir_serie(df, pontos, lttb)
+
+    def get_kpi_snapshot(self):
+        from functions.setup import KpiSnapshot, _campeao
+
+        def _totais(df, coluna_nome, coluna_total="Total Vendido"):
+            return dict(zip(df[coluna_nome], df[coluna_total]))
+
+        return KpiSnapshot(
+            receita_total=self.receita,
+            quantidade_vendas=self.itens,
+            ticket_medio=self.calcular_ticket_medio(),
+            total_clientes=self.total_clientes(),
+            produto_campeao=_campeao(_totais(self.get_vendas_por_produto(), "Produto")),
+            categoria_campea=_campeao(_totais(self.get_top_categorias(), "Categoria")),
+            pagamento_preferido=_campeao(_totais(self.get_vendas_por_forma_pagamento(), "Forma de Pagamento")),
+            dia_pico=_campeao(_totais(self.get_vendas_por_dia_da_semana(), "Dia da Semana")),
+            hora_pico=_campeao(_totais(self.get_vendas_por_hora_do_dia(), "Hora")),
+        )
+
+    def responder(self, nome, argumentos):
+        """Resultado da função 'nome' do setup.py com os argumentos (sem inicio/fim), nos tipos compactos."""
+        with self._lock:
+            resultado = getattr(self, nome)(**argumentos)
+        return quadros.compactar(resultado) if isinstance(resultado, pd.DataFrame) else resultado
+
+
+_agregados = {}
+_lock_agregados = threading.Lock()
+
+
+def _banco(lojas=None):
+    """(caminho absoluto, conexão de leitura da thread atual) do banco da loja ou do padrão."""
+    if lojas:
+        return os.path.abspath(lojas[0].banco), cadastro_lojas.conexao_leitura(lojas[0].banco)
+    return os.path.abspath(setup.init_db().caminho), setup.get_connection()
+
+
+def agregados(lojas=None):
+    """AgregadosAoVivo do banco (um por processo), já atualizado com as vendas novas."""
+    caminho, conn = _banco(lojas)
+    with _lock_agregados:
+        if caminho not in _agregados:
+            _agregados[caminho] = AgregadosAoVivo()
+        escolhido = _agregados[caminho]
+    escolhido.atualizar(conn)
+    return escolhido
+
+
+def atualizar(lojas=None):
+    """Soma as vendas novas do banco da loja (ou do padrão) e retorna a versão dos dados."""
+    return agregados(lojas).versao
+
+
+def disponivel(lojas=None, inicio=None, fim=None):
+    """O modo ao vivo vale para todo o período e uma loja só (ou o banco padrão)."""
+    return inicio is None and fim is None and (lojas is None or len(lojas) == 1)
+
+
+def buscar(chamadas, lojas=None):
+    """
+    {chamada: resultado} das chamadas (carregador.Chamada) que os agregados sabem responder:
+    funções de RESPOSTAS do setup.py, sem período. DataFrames saem novos a cada chamada.
+    """
+    if not disponivel(lojas):
+        return {}
+    respondidas = {}
+    escolhido = None
+    for c in chamadas:
+        argumentos = dict(c.argumentos)
+        if (c.funcao.__module__ != setup.__name__ or c.funcao.__name__ not in RESPOSTAS
+                or argumentos.pop("inicio", None) is not None or argumentos.pop("fim", None) is not None):
+            continue
+        escolhido = escolhido or agregados(lojas)
+        respondidas[c] = escolhido.responder(c.funcao.__name__, argumentos)
+    return respondidas
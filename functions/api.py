@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from functions import carregador
+from functions import lojas as cadastro_lojas
+from functions import setup
+from functions import snapshots
+from functions.cache import CacheConsultas
+
+# 🌐 API JSON das métricas, ao lado do dashboard
+# Tela do caixa, TV da loja e scripts de parceiros liam os números raspando o Streamlit, que
+# executa o dashboard.py inteiro a cada acesso. Este servidor (asyncio puro, sem dependências):
+#
+#     python -m functions.api --porta 8502
+#
+# expõe as funções do setup.py como JSON (veja ROTAS), com os mesmos filtros do dashboard:
+#
+#     GET /kpis?inicio=2024-01-01&fim=2024-01-31
+#     GET /produtos?limite=5&loja=Centro
+#
+#   - respostas num cache compartilhado (LRU), identificadas por rota + parâmetros + versão dos
+#     dados (cache.token_dados de cada banco, conferida no máximo a cada VALIDADE_VERSAO s);
+#   - ETag = hash do corpo; se o If-None-Match trouxer esse ETag (numa lista separada por
+#     vírgulas, também como W/"...") ou '*', a resposta é 304 sem corpo;
+#   - as consultas (bloqueantes, SQLite) rodam num pool limitado a MAX_THREADS threads, e
+#     pedidos iguais ao mesmo tempo esperam a mesma consulta. Centenas de clientes consultando
+#     os mesmos números custam uma consulta por versão dos dados;
+#   - com cadastro de lojas, 'loja' escolhe uma delas; sem o parâmetro, todas juntas
+#     (functions/federacao.py), como "Todas as lojas" no dashboard. Snapshots
+#     (functions/snapshots.py) também valem aqui.
+
+PORTA = 8502
+MAX_THREADS = 4
+MAX_ENTRADAS = 256
+VALIDADE_VERSAO = 1.0
+TEMPO_OCIOSO = 30  # segundos de uma conexão keep-alive sem pedido
+
+# Rota -> (função do setup.py, parâmetros próprios além de inicio/fim)
+ROTAS = {
+    "/kpis": (setup.get_kpi_snapshot, ()),
+    "/produtos": (setup.get_top_produtos, ("limite",)),
+    "/categorias": (setup.get_top_categorias, ("limite",)),
+    "/clientes": (setup.get_top_clientes, ("limite",)),
+    "/vendas/hora": (setup.get_vendas_por_hora_do_dia, ()),
+    "/vendas/dia-semana": (setup.get_vendas_por_dia_da_semana, ()),
+    "/vendas/diarias": (setup.obter_dados_vendas, ("pontos", "lttb")),
+    "/pagamentos": (setup.get_analise_formas_pagamento, ()),
+}
+
+
+def _booleano(texto):
+    if texto.lower() in ("1", "true", "sim"):
+        return True
+    if texto.lower() in ("0", "false", "nao", "não"):
+        return False
+    raise ValueError(f"valor booleano inválido: {texto}")
+
+
+def _positivo(texto):
+    # limite=-1 viraria LIMIT -1 (sem limite) no SQLite, e pontos <= 0 mudaria a resolução
+    numero = int(texto)
+    if numero <= 0:
+        raise ValueError(f"precisa ser maior que zero: {numero}")
+    return numero
+
+
+CONVERSORES = {
+    "inicio": date.fromisoformat,
+    "fim": date.fromisoformat,
+    "limite": _positivo,
+    "pontos": _positivo,
+    "lttb": _booleano,
+}
+
+
+def confere_etag(etag, if_none_match):
+    """O cabeçalho If-None-Match (lista de ETags, fracas com W/, ou '*') inclui o 'etag'?"""
+    for item in if_none_match.split(","):
+        item = item.strip()
+        if item == "*" or item.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ErroPedido(Exception):
+    """Pedido inválido: vira uma resposta 4xx com a mensagem."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _json_padrao(valor):
+    """Tipos que o json não conhece: datas, escalares do NumPy e dataclasses (KpiSnapshot)."""
+    if isinstance(valor, pd.Timestamp):
+        return valor.date().isoformat() if valor == valor.normalize() else valor.isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if hasattr(valor, "item"):
+        return valor.item()
+    if dataclasses.is_dataclass(valor):
+        return dataclasses.asdict(valor)
+    raise TypeError(f"{type(valor).__name__} não é serializável em JSON")
+
+
+def serializar(resultado):
+    """Resultado de uma função do setup.py -> corpo JSON (DataFrames viram listas de objetos)."""
+    if isinstance(resultado, pd.DataFrame):
+        resultado = resultado.to_dict(orient="records")
+    return json.dumps(resultado, default=_json_padrao, ensure_ascii=False).encode("utf-8")
+
+
+class ServidorApi:
+    """Estado do servidor: pool de consultas, cache de respostas e versões dos dados."""
+
+    def __init__(self, cadastro=None, max_threads=MAX_THREADS, max_entradas=MAX_ENTRADAS):
+        self.cadastro = cadastro or []
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="api")
+        self.cache = CacheConsultas(max_entradas)
+        self._versoes = {}  # bancos -> (instante da conferência, versão)
+
+    # --- PEDIDO -> CHAMADA -------------------------------------------------------------------
+
+    def _lojas(self, nome):
+        if not self.cadastro:
+            if nome is not None:
+                raise ErroPedido(HTTPStatus.BAD_REQUEST, "não há cadastro de lojas")
+            return None
+        if nome is None or nome == cadastro_lojas.TODAS:
+            return self.cadastro
+        escolhidas = [loja for loja in self.cadastro if loja.nome == nome]
+        if not escolhidas:
+            raise ErroPedido(HTTPStatus.NOT_FOUND, f"loja desconhecida: {nome}")
+        return escolhidas
+
+    def interpretar(self, alvo):
+        """Caminho + query string -> (carregador.Chamada, lojas)."""
+        partes = urlsplit(alvo)
+        if partes.path not in ROTAS:
+            raise ErroPedido(HTTPStatus.NOT_FOUND, f"rota desconhecida: {partes.path}")
+        funcao, proprios = ROTAS[partes.path]
+        argumentos = {}
+        loja = None
+        for nome, valores in parse_qs(partes.query, keep_blank_values=True).items():
+            if nome == "loja":
+                loja = valores[-1]
+                continue
+            if nome not in ("inicio", "fim") + proprios:
+                raise ErroPedido(HTTPStatus.BAD_REQUEST, f"parâmetro desconhecido em {partes.path}: {nome}")
+            try:
+                argumentos[nome] = CONVERSORES[nome](valores[-1])
+            except ValueError as e:
+                raise ErroPedido(HTTPStatus.BAD_REQUEST, f"{nome}: {e}") from None
+        return carregador.chamada(funcao, **argumentos), self._lojas(loja)
+
+    # --- VERSÃO DOS DADOS E CACHE ------------------------------------------------------------
+
+    async def _versao(self, lojas):
+        """Versão dos dados dos bancos da consulta; reaproveitada por até VALIDADE_VERSAO segundos."""
+        loop = asyncio.get_running_loop()
+        bancos = snapshots.selecao(lojas)
+        conferida = self._versoes.get(bancos)
+        if conferida is not None and loop.time() - conferida[0] < VALIDADE_VERSAO:
+            return conferida[1]
+        versao = await loop.run_in_executor(self.executor, snapshots.impressao_dados, lojas)
+        self._versoes[bancos] = (loop.time(), versao)
+        return versao
+
+    def _consultar(self, chamada, lojas):
+        """Roda numa thread do pool: executa a chamada e devolve (ETag, corpo)."""
+        corpo = serializar(carregador.carregar({"resultado": chamada}, lojas=lojas)["resultado"])
+        return f'"{hashlib.sha1(corpo).hexdigest()[:20]}"', corpo
+
+    async def resposta(self, alvo):
+        """(ETag, corpo JSON) do pedido, do cache ou de uma consulta nova."""
+        chamada, lojas = self.interpretar(alvo)
+        versao = await self._versao(lojas)
+        chave = (chamada, snapshots.selecao(lojas), versao)
+        encontrado, futuro = self.cache.obter(chave)
+        if not encontrado:
+            # Guarda a consulta em andamento: pedidos iguais que chegarem agora esperam por ela
+            futuro = asyncio.get_running_loop().run_in_executor(self.executor, self._consultar, chamada, lojas)
+            self.cache.guardar(chave, futuro)
+        try:
+            return await asyncio.shield(futuro)
+        except Exception:
+            self.cache.descartar(chave)  # não guarda o erro: o próximo pedido tenta de novo
+            raise
+
+    # --- HTTP --------------------------------------------------------------------------------
+
+    async def _ler_pedido(self, reader):
+        """(método, alvo, cabeçalhos) do próximo pedido, ou None se a conexão terminou."""
+        linha = await asyncio.wait_for(reader.readline(), TEMPO_OCIOSO)
+        if not linha:
+            return None
+        try:
+            metodo, alvo, versao_http = linha.decode("latin-1").split()
+        except ValueError:
+            raise ErroPedido(HTTPStatus.BAD_REQUEST, "linha de pedido inválida") from None
+        cabecalhos = {}
+        while True:
+            linha = await asyncio.wait_for(reader.readline(), TEMPO_OCIOSO)
+            if linha in (b"\r\n", b"\n", b""):
+                break
+            nome, _, valor = linha.decode("latin-1").partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        cabecalhos[":versao"] = versao_http
+        return metodo, alvo, cabecalhos
+
+    @staticmethod
+    def _escrever(writer, status, corpo=b"", cabecalhos=None, com_corpo=True):
+        linhas = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        cabecalhos = {"Content-Type": "application/json; charset=utf-8", **(cabecalhos or {})}
+        cabecalhos["Content-Length"] = str(len(corpo))
+        linhas += [f"{nome}: {valor}" for nome, valor in cabecalhos.items()]
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1"))
+        if com_corpo:
+            writer.write(corpo)
+
+    async def atender(self, reader, writer):
+        """Uma conexão: atende pedidos em sequência (keep-alive) até o cliente fechar."""
+        try:
+            while True:
+                try:
+                    pedido = await self._ler_pedido(reader)
+                except ErroPedido as e:
+                    self._escrever(writer, e.status, serializar({"erro": str(e)}), {"Connection": "close"})
+                    break
+                if pedido is None:
+                    break
+                metodo, alvo, cabecalhos = pedido
+                manter = cabecalhos.get("connection", "").lower() != "close" and cabecalhos[":versao"] == "HTTP/1.1"
+                extras = {"Connection": "keep-alive" if manter else "close"}
+                if metodo not in ("GET", "HEAD"):
+                    # O corpo do pedido não é lido: a conexão não pode ser reaproveitada
+                    manter = False
+                    extras = {"Connection": "close", "Allow": "GET, HEAD"}
+                    self._escrever(writer, HTTPStatus.METHOD_NOT_ALLOWED,
+                                   serializar({"erro": f"método não suportado: {metodo}"}), extras)
+                else:
+                    try:
+                        etag, corpo = await self.resposta(alvo)
+                        extras.update({"ETag": etag, "Cache-Control": "no-cache"})
+                        if confere_etag(etag, cabecalhos.get("if-none-match", "")):
+                            self._escrever(writer, HTTPStatus.NOT_MODIFIED, cabecalhos=extras, com_corpo=False)
+                        else:
+                            self._escrever(writer, HTTPStatus.OK, corpo, extras, com_corpo=metodo == "GET")
+                    except ErroPedido as e:
+                        self._escrever(writer, e.status, serializar({"erro": str(e)}), extras)
+                    except Exception as e:
+                        print(f"Erro em {alvo}: {e}")
+                        self._escrever(writer, HTTPStatus.INTERNAL_SERVER_ERROR,
+                                       serializar({"erro": "erro interno"}), extras)
+                await writer.drain()
+                if not manter:
+                    break
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass  # cliente ocioso demais, que sumiu ou com linha maior que o limite do StreamReader
+        finally:
+            writer.close()
+
+
+async def servir(host, porta, cadastro=None):
+    servidor_api = ServidorApi(cadastro)
+    servidor = await asyncio.start_server(servidor_api.atender, host, porta)
+    print(f"API em http://{host}:{porta} (rotas: {', '.join(ROTAS)})")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor HTTP com as métricas do dashboard em JSON.")
+    parser.add_argument("--banco", default=setup.CAMINHO_BANCO, help="Caminho do arquivo SQLite (padrão: acai.db)")
+    parser.add_argument("--lojas", default=cadastro_lojas.ARQUIVO_LOJAS,
+                        help="Cadastro de lojas; se existir, substitui --banco (padrão: lojas.json)")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1)")
+    parser.add_argument("--porta", type=int, default=PORTA, help=f"Porta (padrão: {PORTA})")
+    args = parser.parse_args(argv)
+
+    cadastro = cadastro_lojas.carregar_lojas(args.lojas)
+    if not cadastro:
+        setup.init_db(args.banco)
+    snapshots.usar_snapshots()
+    try:
+        asyncio.run(servir(args.host, args.porta, cadastro))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from functions import arquivo
+
+# ≈ Estruturas do modo aproximado (históricos muito grandes)
+# Com milhões de vendas, contar clientes distintos num período (COUNT(DISTINCT cliente_id))
+# e somar os rankings por produto/categoria exige varrer todas as linhas do período.
+# O modo aproximado responde essas perguntas com duas tabelas pequenas, de tamanho fixo
+# ou proporcional ao número de DIAS, e informa o erro esperado:
+#
+#   - clientes_hll_dia: um esboço HyperLogLog dos clientes de cada dia (REGISTROS bytes por
+#     dia). Esboços se juntam pegando o maior valor de cada registro, então
+#     qualquer período é respondido juntando os dias dele, sem ler 'vendas'. O erro relativo
+#     fica em torno de ERRO_RELATIVO (com ~95% de confiança), qualquer que seja o período.
+#   - vendas_amostra: amostra aleatória uniforme (reservoir sampling, "algoritmo R") de até
+#     TAMANHO_AMOSTRA vendas de todo o histórico. Os rankings do período são estimados
+#     somando a amostra e corrigindo a escala pela receita exata do resumo por dia/hora.
+#     Enquanto o histórico couber na amostra, o resultado é exato.
+#
+# As duas tabelas guardam o histórico todo, inclusive os meses já arquivados em Parquet
+# (functions/arquivo.py), e por isso não precisam carregar o arquivo.
+#
+# As tabelas e os gatilhos são criados pelas migrações (functions/migracoes.py, passo 8).
+# Elas são mantidas por gatilhos AFTER INSERT em 'vendas'; a carga em massa
+# (functions/ingestao.py) desliga os gatilhos e chama os recalcular_*() no final.
+# As consultas ficam em functions/setup.py (seção "MODO APROXIMADO").
+
+PRECISAO = 12                       # bits do hash que escolhem o registro
+REGISTROS = 1 << PRECISAO           # 4096 registros por esboço
+ERRO_RELATIVO = 2 * 1.04 / math.sqrt(REGISTROS)  # ~3,25%: dois desvios-padrão do HyperLogLog
+
+TAMANHO_AMOSTRA = 50_000
+
+
+@dataclass(frozen=True)
+class Estimativa:
+    """Valor aproximado e o erro relativo esperado (0.033 = ±3,3%). Erro 0 = valor exato."""
+    valor: float
+    erro_relativo: float
+
+
+# --- ESBOÇOS HYPERLOGLOG DOS CLIENTES POR DIA ---------------------------------------------------
+
+# Uma linha por dia: os REGISTROS registros do esboço num BLOB, um byte por registro
+# (o "rho" do HyperLogLog: posição do primeiro bit 1 do hash; 0 = registro vazio).
+DDL_ESBOCOS_CLIENTES = f'''
+CREATE TABLE IF NOT EXISTS clientes_hll_dia (
+    dia TEXT PRIMARY KEY,               -- Formato 'YYYY-MM-DD'
+    registros BLOB NOT NULL             -- {REGISTROS} bytes
+)
+'''
+
+# Hash de 32 bits do cliente_id, só com operações inteiras do SQLite (que não tem XOR:
+# a ^ b = (a | b) - (a & b)). Os PRECISAO bits baixos escolhem o registro; o rho vem do
+# bit 1 mais baixo do resto do hash, contado com comparações (sem log2, que nem todo SQLite
+# tem). Os LIMIT -1 impedem o SQLite de copiar as expressões de uma subconsulta para a de
+# fora (o hash seria recalculado várias vezes por linha).
+_MISTURA = "(((x >> 16) | x) - ((x >> 16) & x)) * 73244475 & 4294967295"
+_BIT = f"CASE WHEN h >> {PRECISAO} = 0 THEN {1 << (32 - PRECISAO)} ELSE (h >> {PRECISAO}) & -(h >> {PRECISAO}) END"
+_RHO = "1 + " + " + ".join(f"(bit >= {1 << i})" for i in range(1, 33 - PRECISAO))
+
+# (dia, registro, rho) de cada venda de {origem}, que precisa ter as colunas dia e cliente_id
+SQL_REGISTROS_CLIENTES = f'''
+SELECT dia, registro, {_RHO} AS rho FROM (
+    SELECT dia, h & {REGISTROS - 1} AS registro, {_BIT} AS bit FROM (
+        SELECT dia, ((x >> 16) | x) - ((x >> 16) & x) AS h FROM (
+            SELECT dia, {_MISTURA} AS x FROM (
+                SELECT dia, {_MISTURA} AS x FROM (
+                    SELECT dia, cliente_id & 4294967295 AS x FROM ({{origem}}) LIMIT -1
+                ) LIMIT -1
+            ) LIMIT -1
+        ) LIMIT -1
+    ) LIMIT -1
+)
+'''
+
+_ORIGEM_NOVA_VENDA = "SELECT DATE(NEW.data_venda) AS dia, NEW.cliente_id AS cliente_id"
+_ORIGEM_VENDAS = "SELECT DATE(data_venda) AS dia, cliente_id FROM {tabela} WHERE cliente_id IS NOT NULL {filtro}"
+
+# O gatilho troca só o byte do registro, e só quando o rho novo é maior (comparando em
+# hexadecimal, '0A' < '0B'). char(rho) vira um byte só, pois rho < 128.
+DDL_GATILHO_ESBOCOS = f'''
+CREATE TRIGGER IF NOT EXISTS trg_vendas_clientes_hll
+AFTER INSERT ON vendas
+WHEN NEW.cliente_id IS NOT NULL
+BEGIN
+    INSERT INTO clientes_hll_dia (dia, registros) VALUES (DATE(NEW.data_venda), zeroblob({REGISTROS}))
+    ON CONFLICT (dia) DO NOTHING;
+    UPDATE clientes_hll_dia SET registros = CAST(
+        substr(registros, 1, n.registro) || CAST(char(n.rho) AS BLOB) || substr(registros, n.registro + 2)
+    AS BLOB)
+    FROM ({SQL_REGISTROS_CLIENTES.format(origem=_ORIGEM_NOVA_VENDA)}) AS n
+    WHERE clientes_hll_dia.dia = n.dia
+      AND hex(substr(clientes_hll_dia.registros, n.registro + 1, 1)) < printf('%02X', n.rho);
+END
+'''
+
+SQL_LIMPAR_ESBOCOS = "DELETE FROM clientes_hll_dia;"
+
+# {tabela}: de onde vêm as vendas ('vendas' ou uma tabela TEMP com o histórico arquivado)
+# {filtro}: condição extra (começando com AND), ou vazio para todas as linhas
+SQL_RECALCULAR_ESBOCOS = f'''
+SELECT dia, registro, MAX(rho)
+FROM ({SQL_REGISTROS_CLIENTES.format(origem=_ORIGEM_VENDAS)})
+GROUP BY dia, registro;
+'''
+
+
+def _gravar_esbocos(cursor, tabela="vendas", filtro="", params=()):
+    """Monta os BLOBs dos dias a partir do maior rho de cada registro e grava (substituindo)."""
+    por_dia = {}
+    for dia, registro, rho in cursor.execute(SQL_RECALCULAR_ESBOCOS.format(tabela=tabela, filtro=filtro), params).fetchall():
+        por_dia.setdefault(dia, np.zeros(REGISTROS, dtype=np.uint8))[registro] = rho
+    cursor.executemany(
+        "INSERT OR REPLACE INTO clientes_hll_dia (dia, registros) VALUES (?, ?);",
+        [(dia, registros.tobytes()) for dia, registros in por_dia.items()],
+    )
+
+
+def reconstruir_esbocos(conn):
+    """
+    Recalcula os esboços de todos os dias a partir de 'vendas' e dos meses já arquivados
+    (functions/arquivo.py).
+    """
+    cursor = conn.cursor()
+    historico = arquivo.carregar_historico(cursor, ["data_venda", "cliente_id"], "esbocos_historico")
+    cursor.execute(SQL_LIMPAR_ESBOCOS)
+    _gravar_esbocos(cursor, tabela=historico)
+    cursor.execute(f"DROP TABLE {historico};")
+    conn.commit()
+
+
+def recalcular_esbocos(cursor, dias):
+    """
+    Recalcula os esboços dos dias informados ('YYYY-MM-DD'). Usado pela carga em massa,
+    que grava com o gatilho desligado. Não faz commit.
+    """
+    for dia in sorted(dias):
+        cursor.execute("DELETE FROM clientes_hll_dia WHERE dia = ?;", (dia,))
+        _gravar_esbocos(cursor, filtro="AND data_venda >= ? AND data_venda < DATE(?, '+1 day')", params=(dia, dia))
+
+
+def juntar_esbocos(esbocos):
+    """Junta os BLOBs de vários dias (o maior rho de cada registro) num array de REGISTROS bytes."""
+    juntos = np.zeros(REGISTROS, dtype=np.uint8)
+    for registros in esbocos:
+        np.maximum(juntos, np.frombuffer(registros, dtype=np.uint8), out=juntos)
+    return juntos
+
+
+def estimar_distintos(registros):
+    """
+    Estimativa do HyperLogLog para um esboço (array com o rho de cada registro, como o de
+    juntar_esbocos). Retorna o número aproximado de clientes distintos.
+    """
+    rho = registros.astype(np.int64)
+    alfa = 0.7213 / (1 + 1.079 / REGISTROS)
+    estimativa = alfa * REGISTROS * REGISTROS / np.sum(np.ldexp(1.0, -rho))
+    vazios = int(np.count_nonzero(rho == 0))
+    if estimativa <= 2.5 * REGISTROS and vazios:
+        # Poucos clientes: contagem linear pelos registros vazios (bem mais precisa)
+        estimativa = REGISTROS * math.log(REGISTROS / vazios)
+    elif estimativa > 2 ** 32 / 30:
+        # Perto do limite do hash de 32 bits: correção de colisões
+        estimativa = -(2 ** 32) * math.log(1 - estimativa / 2 ** 32)
+    return float(estimativa)
+
+
+# --- AMOSTRA ALEATÓRIA DAS VENDAS ---------------------------------------------------------------
+
+DDL_AMOSTRA = '''
+CREATE TABLE IF NOT EXISTS vendas_amostra (
+    posicao INTEGER PRIMARY KEY,        -- 0 a TAMANHO_AMOSTRA - 1
+    venda_id INTEGER NOT NULL,          -- vendas.id
+    data_venda TEXT NOT NULL,
+    produto_id INTEGER,
+    valor_total_item REAL NOT NULL
+)
+'''
+
+# Uma linha só: quantas vendas a amostra já viu e o maior id visto
+DDL_AMOSTRA_ESTADO = '''
+CREATE TABLE IF NOT EXISTS vendas_amostra_estado (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    vistas INTEGER NOT NULL DEFAULT 0,
+    ultimo_id INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+SQL_INICIAR_AMOSTRA = "INSERT OR IGNORE INTO vendas_amostra_estado (id, vistas, ultimo_id) VALUES (1, 0, 0);"
+
+# Algoritmo R: a venda número i (a partir de 0) entra na posição i enquanto a amostra não
+# está cheia; depois, sorteia j entre 0 e i e, se j < TAMANHO_AMOSTRA, substitui a posição j.
+# O LIMIT 1 garante que random() seja sorteado uma vez só (a subconsulta não é achatada).
+DDL_GATILHO_AMOSTRA = f'''
+CREATE TRIGGER IF NOT EXISTS trg_vendas_amostra
+AFTER INSERT ON vendas
+BEGIN
+    INSERT OR REPLACE INTO vendas_amostra (posicao, venda_id, data_venda, produto_id, valor_total_item)
+    SELECT posicao, NEW.id, NEW.data_venda, NEW.produto_id, NEW.valor_total_item
+    FROM (
+        SELECT CASE WHEN vistas < {TAMANHO_AMOSTRA} THEN vistas
+                    ELSE abs(random() % (vistas + 1)) END AS posicao
+        FROM vendas_amostra_estado LIMIT 1
+    )
+    WHERE posicao < {TAMANHO_AMOSTRA};
+    UPDATE vendas_amostra_estado SET vistas = vistas + 1, ultimo_id = MAX(ultimo_id, NEW.id);
+END
+'''
+
+SQL_LIMPAR_AMOSTRA = "DELETE FROM vendas_amostra;"
+SQL_ZERAR_AMOSTRA_ESTADO = "UPDATE vendas_amostra_estado SET vistas = 0, ultimo_id = 0;"
+
+
+def recalcular_amostra(cursor, dias=None, tabela="vendas"):
+    """
+    Passa pela amostra as vendas gravadas depois da última vista (id > ultimo_id), em ordem
+    de id, como o gatilho faria uma a uma. Usado pela carga em massa ('dias' é ignorado:
+    a amostra segue o id, não a data) e pela migração. Não faz commit.
+    """
+    cursor.execute("DROP TABLE IF EXISTS temp.amostra_novas;")
+    # Sorteio gravado numa tabela temporária: cada venda sorteia uma vez só
+    cursor.execute(f'''
+    CREATE TEMP TABLE amostra_novas AS
+    SELECT
+        i, id, data_venda, produto_id, valor_total_item,
+        CASE WHEN i < {TAMANHO_AMOSTRA} THEN i ELSE abs(random() % (i + 1)) END AS posicao
+    FROM (
+        SELECT v.id, v.data_venda, v.produto_id, v.valor_total_item,
+               e.vistas + ROW_NUMBER() OVER (ORDER BY v.id) - 1 AS i
+        FROM {tabela} v, vendas_amostra_estado e
+        WHERE v.id > e.ultimo_id
+    );
+    ''')
+    # Várias vendas novas podem sortear a mesma posição: fica a última (maior i)
+    cursor.execute(f'''
+    INSERT OR REPLACE INTO vendas_amostra (posicao, venda_id, data_venda, produto_id, valor_total_item)
+    SELECT posicao, id, data_venda, produto_id, valor_total_item FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY posicao ORDER BY i DESC) AS ordem
+        FROM amostra_novas WHERE posicao < {TAMANHO_AMOSTRA}
+    ) WHERE ordem = 1;
+    ''')
+    cursor.execute('''
+    UPDATE vendas_amostra_estado SET
+        vistas = vistas + (SELECT COUNT(*) FROM amostra_novas),
+        ultimo_id = MAX(ultimo_id, COALESCE((SELECT MAX(id) FROM amostra_novas), 0));
+    ''')
+    cursor.execute("DROP TABLE temp.amostra_novas;")
+
+
+def reconstruir_amostra(conn):
+    """
+    Sorteia a amostra de novo a partir de 'vendas' e dos meses já arquivados
+    (functions/arquivo.py), em ordem de id.
+    """
+    cursor = conn.cursor()
+    historico = arquivo.carregar_historico(
+        cursor, ["id", "data_venda", "produto_id", "valor_total_item"], "amostra_historico"
+    )
+    cursor.execute(SQL_LIMPAR_AMOSTRA)
+    cursor.execute(SQL_ZERAR_AMOSTRA_ESTADO)
+    recalcular_amostra(cursor, tabela=historico)
+    cursor.execute(f"DROP TABLE {historico};")
+    conn.commit()
+
+
+def preencher_historico(cursor):
+    """
+    Preenche os esboços e a amostra com o histórico inteiro: 'vendas' mais os meses já
+    arquivados (functions/arquivo.py), numa passada só em ordem de id. Usado pela migração.
+    Não faz commit.
+    """
+    historico = arquivo.carregar_historico(cursor, ["id", "data_venda", "cliente_id", "produto_id", "valor_total_item"])
+    cursor.execute(SQL_LIMPAR_ESBOCOS)
+    _gravar_esbocos(cursor, tabela=historico)
+    cursor.execute(SQL_LIMPAR_AMOSTRA)
+    cursor.execute(SQL_ZERAR_AMOSTRA_ESTADO)
+    recalcular_amostra(cursor, tabela=historico)
+    cursor.execute(f"DROP TABLE {historico};")
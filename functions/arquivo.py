@@ -0,0 +1,460 @@
+import argparse
+import functools
+import inspect
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from functions import metricas_clientes
+
+# 🗄️ Arquivo histórico em Parquet
+# 'vendas' cresce sem limite e toda agregação sobre o histórico inteiro varre o banco todo.
+# O comando deste módulo move os meses FECHADOS de 'vendas' para arquivos Parquet
+# comprimidos (zstd), um diretório por mês:
+#
+#     arquivo/ano_mes=2024-01/vendas.<versão>.parquet   linhas originais (sem as colunas geradas)
+#     arquivo/ano_mes=2024-01/resumo.<versão>.parquet   SUM por dia x produto x forma de pagamento
+#
+# e registra cada partição no catálogo 'arquivo_particoes' (passo 7 das migrações), com
+# linhas, receita, itens e primeira/última venda do mês. O banco fica só com a "cauda"
+# recente, pequena, e o cache de páginas dela continua quente. Os arquivos de uma versão
+# nova são gravados antes de o catálogo apontar para eles: quem lê nunca vê uma partição
+# pela metade.
+#
+# As tabelas derivadas (vendas_resumo_hora, clientes_metricas, transacoes e as do modo
+# aproximado, functions/aproximacao.py) NÃO perdem os meses arquivados: elas continuam com
+# o histórico inteiro, e as funções que leem só delas não mudam. Para o recálculo das
+# métricas de clientes, a parte arquivada de cada cliente vai para 'clientes_metricas_arquivo'
+# (functions/metricas_clientes.py); os demais reconstruir_*() leem o histórico inteiro
+# (carregar_historico: 'vendas' mais as partições). Vendas de meses já arquivados são
+# rejeitadas pela carga (functions/ingestao.py).
+#
+# 🔀 Consultas híbridas: as funções do setup.py que leem 'vendas' são marcadas com
+# @com_arquivo. Antes da consulta, as partições do período pedido (as demais são puladas
+# pelo catálogo) são carregadas numa tabela TEMP da conexão de leitura, e uma VIEW TEMP
+# chamada 'vendas' junta main.vendas com ela. O SQLite procura primeiro no esquema temp,
+# então o SQL das funções continua o mesmo. Funções que só somam por dia/produto/forma de
+# pagamento carregam o resumo da partição (bem menor); as que contam clientes ou
+# transações carregam as linhas. As partições ficam carregadas enquanto a conexão viver.
+# Por isso, quem junta o arquivo por conta própria (o motor colunar, o modo ao vivo) ou
+# grava/apaga vendas lê e escreve em main.vendas, nunca em 'vendas': numa conexão com a
+# VIEW carregada, as linhas arquivadas seriam contadas duas vezes.
+#
+# O Parquet usa o pyarrow, importado só quando alguma partição é gravada ou lida:
+# bancos sem arquivo funcionam sem ele.
+#
+# Uso:
+#     python -m functions.arquivo --banco acai.db                 # arquiva até o mês passado
+#     python -m functions.arquivo --banco acai.db --ate 2024-03 --vacuum
+
+DIRETORIO_PADRAO = "arquivo"
+COMPRESSAO = "zstd"
+
+DDL_PARTICOES = '''
+CREATE TABLE IF NOT EXISTS arquivo_particoes (
+    ano_mes INTEGER PRIMARY KEY,        -- ex.: 202401
+    caminho TEXT NOT NULL,              -- diretório da partição (relativo à pasta do banco)
+    linhas INTEGER NOT NULL,
+    receita REAL NOT NULL,
+    itens INTEGER NOT NULL,
+    data_min TEXT NOT NULL,             -- primeira e última data_venda do mês
+    data_max TEXT NOT NULL,
+    versao TEXT NOT NULL                -- quando a partição foi (re)gravada; faz parte do nome dos arquivos
+)
+'''
+
+# Colunas reais de 'vendas' guardadas no Parquet (as colunas geradas são recalculadas na leitura)
+COLUNAS_LINHAS = [
+    "id", "produto_id", "quantidade", "preco_unitario_venda", "valor_total_item",
+    "data_venda", "cliente_id", "formas_pagamento_id", "transacao_id",
+]
+COLUNAS_RESUMO = ["dia", "produto_id", "formas_pagamento_id", "receita", "itens", "linhas"]
+
+# Níveis de carga de uma partição na conexão de leitura ("linhas" também serve para "resumo")
+RESUMO = "resumo"
+LINHAS = "linhas"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("O arquivo histórico em Parquet precisa do pyarrow (pip install pyarrow).") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _conexao_de(conn_ou_cursor):
+    return getattr(conn_ou_cursor, "connection", conn_ou_cursor)
+
+
+def _pasta_banco(conn):
+    arquivo = conn.execute("SELECT file FROM pragma_database_list WHERE name = 'main';").fetchone()[0]
+    return os.path.dirname(arquivo) if arquivo else os.getcwd()
+
+
+def _ano_mes(valor):
+    """date / 'YYYY-MM-DD' / 'YYYY-MM' -> inteiro AAAAMM."""
+    if isinstance(valor, (date, datetime)):
+        return valor.year * 100 + valor.month
+    texto = str(valor)
+    return int(texto[:4]) * 100 + int(texto[5:7])
+
+
+def _texto_mes(ano_mes):
+    return f"{ano_mes // 100:04d}-{ano_mes % 100:02d}"
+
+
+def _arquivo_parquet(pasta, nome, versao):
+    return os.path.join(pasta, f"{nome}.{versao}.parquet")
+
+
+def _gravar_parquet(df, caminho):
+    pa, pq = _pyarrow()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), caminho, compression=COMPRESSAO)
+
+
+def _resumir(linhas):
+    """SUM por dia x produto x forma de pagamento das linhas de uma partição (COLUNAS_RESUMO)."""
+    return (
+        linhas.assign(dia=linhas["data_venda"].str[:10], linhas=1)
+        .groupby(["dia", "produto_id", "formas_pagamento_id"], as_index=False)
+        .agg(receita=("valor_total_item", "sum"), itens=("quantidade", "sum"), linhas=("linhas", "sum"))
+    )[COLUNAS_RESUMO]
+
+
+def _gravar_versao(pasta, linhas, novos):
+    """Grava as linhas e o resumo delas como uma versão nova da partição. Retorna a versão."""
+    versao = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    for nome, df in (("vendas", linhas), ("resumo", _resumir(linhas))):
+        novos.append(_arquivo_parquet(pasta, nome, versao))
+        _gravar_parquet(df, novos[-1])
+    return versao
+
+
+# --- GRAVAÇÃO (comando de arquivamento) ------------------------------------------------------
+
+def meses_arquivados(conn):
+    """Conjunto dos meses (AAAAMM) que já estão no arquivo (vazio em bancos sem o passo 7)."""
+    try:
+        return {linha[0] for linha in conn.execute("SELECT ano_mes FROM arquivo_particoes;")}
+    except sqlite3.OperationalError:
+        return set()
+
+
+def meses_para_arquivar(conn, ate=None):
+    """
+    Meses com vendas em 'vendas' até 'ate' (inclusivo). Sem 'ate', até o mês passado:
+    o mês corrente nunca está fechado.
+    """
+    if ate is None:
+        ate = date.today().replace(day=1) - timedelta(days=1)
+    limite = _ano_mes(ate)
+    return [linha[0] for linha in conn.execute(
+        "SELECT DISTINCT ano_mes FROM main.vendas WHERE ano_mes <= ? ORDER BY ano_mes;", (limite,)
+    )]
+
+
+def arquivar_mes(conn, ano_mes, diretorio=DIRETORIO_PADRAO):
+    """
+    Move as vendas de um mês para a partição Parquet dele e apaga-as de 'vendas', numa
+    transação. Se a partição já existir, as linhas novas são juntadas às que já estavam lá.
+    Retorna quantas linhas saíram do banco.
+    """
+    cursor = conn.cursor()
+    # IMMEDIATE: ninguém grava no mês entre a leitura das linhas e o DELETE
+    cursor.execute("BEGIN IMMEDIATE;")
+    novos = []
+    try:
+        linhas = pd.read_sql_query(
+            f"SELECT {', '.join(COLUNAS_LINHAS)} FROM main.vendas WHERE ano_mes = ? ORDER BY id;", conn, params=(ano_mes,)
+        )
+        if linhas.empty:
+            conn.rollback()
+            return 0
+        linhas["transacao_id"] = linhas["transacao_id"].astype("Int64")
+
+        anterior = cursor.execute(
+            "SELECT caminho, versao FROM arquivo_particoes WHERE ano_mes = ?;", (ano_mes,)
+        ).fetchone()
+        pasta_relativa = anterior[0] if anterior else os.path.join(diretorio, f"ano_mes={_texto_mes(ano_mes)}")
+        pasta = os.path.join(_pasta_banco(conn), pasta_relativa)
+        os.makedirs(pasta, exist_ok=True)
+        todas = linhas
+        if anterior:
+            todas = pd.concat([ler_linhas(pasta, anterior[1]), linhas], ignore_index=True).sort_values("id", kind="stable")
+
+        versao = _gravar_versao(pasta, todas, novos)
+
+        cursor.execute(metricas_clientes.SQL_ARQUIVAR_MES, (ano_mes,))
+        cursor.execute('''
+        INSERT OR REPLACE INTO arquivo_particoes (ano_mes, caminho, linhas, receita, itens, data_min, data_max, versao)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        ''', (
+            ano_mes, pasta_relativa, len(todas), float(todas["valor_total_item"].sum()),
+            int(todas["quantidade"].sum()), todas["data_venda"].min(), todas["data_venda"].max(), versao,
+        ))
+        cursor.execute("DELETE FROM main.vendas WHERE ano_mes = ?;", (ano_mes,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        for caminho in novos:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        raise
+
+    # O catálogo já aponta para a versão nova; quem ainda tentar ler a antiga relê o catálogo
+    if anterior:
+        for nome in ("vendas", "resumo"):
+            antigo = _arquivo_parquet(pasta, nome, anterior[1])
+            if os.path.exists(antigo):
+                os.remove(antigo)
+    return len(linhas)
+
+
+def arquivar(conn, ate=None, diretorio=DIRETORIO_PADRAO, verbose=False):
+    """Arquiva todos os meses fechados até 'ate'. Retorna {mês 'YYYY-MM': linhas movidas}."""
+    movidas = {}
+    for ano_mes in meses_para_arquivar(conn, ate):
+        movidas[_texto_mes(ano_mes)] = arquivar_mes(conn, ano_mes, diretorio)
+        if verbose:
+            print(f"{_texto_mes(ano_mes)}: {movidas[_texto_mes(ano_mes)]:,} vendas arquivadas")
+    return movidas
+
+
+def remapear_particoes(cursor, mapas):
+    """
+    Troca ids nas linhas das partições: 'mapas' é {coluna: {id antigo: id novo}} (ex.: a
+    compactação das dimensões, functions/dimensoes.py). Só as partições com algum id antigo
+    ganham uma versão nova, com o resumo refeito, e o catálogo passa a apontar para ela.
+    Não faz commit: se a transação for desfeita, apague os arquivos da lista retornada.
+    As versões anteriores ficam na pasta até limpar_versoes_antigas().
+    """
+    novos = []
+    for ano_mes, pasta, versao in particoes(cursor.connection):
+        linhas = ler_linhas(pasta, versao)
+        trocar = {coluna: mapa for coluna, mapa in mapas.items() if mapa and linhas[coluna].isin(mapa).any()}
+        if not trocar:
+            continue
+        for coluna, mapa in trocar.items():
+            linhas[coluna] = linhas[coluna].replace(mapa)
+        cursor.execute(
+            "UPDATE arquivo_particoes SET versao = ? WHERE ano_mes = ?;", (_gravar_versao(pasta, linhas, novos), ano_mes)
+        )
+    return novos
+
+
+def limpar_versoes_antigas(conn):
+    """Apaga os arquivos das partições que não são da versão do catálogo. Retorna quantos apagou."""
+    apagados = 0
+    for _, pasta, versao in particoes(conn):
+        atuais = {os.path.basename(_arquivo_parquet(pasta, nome, versao)) for nome in ("vendas", "resumo")}
+        for nome in os.listdir(pasta):
+            if nome.endswith(".parquet") and nome not in atuais:
+                os.remove(os.path.join(pasta, nome))
+                apagados += 1
+    return apagados
+
+
+# --- LEITURA ---------------------------------------------------------------------------------
+
+def particoes(conn, inicio=None, fim=None):
+    """Partições (ano_mes, caminho absoluto, versão) que podem ter vendas entre inicio e fim."""
+    try:
+        linhas = conn.execute(
+            "SELECT ano_mes, caminho, versao FROM arquivo_particoes WHERE ano_mes BETWEEN ? AND ? ORDER BY ano_mes;",
+            (_ano_mes(inicio) if inicio is not None else 0, _ano_mes(fim) if fim is not None else 999999),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Banco em versão de esquema anterior ao catálogo: não há arquivo
+        return []
+    if not linhas:
+        return []
+    pasta = _pasta_banco(conn)
+    return [(ano_mes, os.path.join(pasta, caminho), versao) for ano_mes, caminho, versao in linhas]
+
+
+def ler_linhas(pasta, versao, colunas=None):
+    """DataFrame com as vendas de uma partição (colunas de COLUNAS_LINHAS)."""
+    _, pq = _pyarrow()
+    df = pq.read_table(_arquivo_parquet(pasta, "vendas", versao), columns=colunas).to_pandas()
+    if "transacao_id" in df:
+        df["transacao_id"] = df["transacao_id"].astype("Int64")
+    return df
+
+
+def ler_resumo(pasta, versao):
+    """DataFrame com o resumo de uma partição (colunas de COLUNAS_RESUMO)."""
+    _, pq = _pyarrow()
+    return pq.read_table(_arquivo_parquet(pasta, "resumo", versao)).to_pandas()
+
+
+def carregar_historico(cursor, colunas=COLUNAS_LINHAS, tabela="vendas_historico"):
+    """
+    Cria a tabela TEMP 'tabela' com as colunas pedidas de TODO o histórico: main.vendas mais
+    as linhas dos meses arquivados. Os reconstruir_*() das tabelas derivadas leem dela, para
+    não apagar os meses que já saíram de 'vendas'. Retorna o nome qualificado
+    ('temp.<tabela>'); quem chamou apaga a tabela no fim. Não faz commit.
+    """
+    colunas = list(colunas)
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{tabela};")
+    cursor.execute(f"CREATE TEMP TABLE {tabela} AS SELECT {', '.join(colunas)} FROM main.vendas;")
+    for _, pasta, versao in particoes(cursor.connection):
+        df = ler_linhas(pasta, versao, colunas)[colunas]
+        cursor.executemany(
+            f"INSERT INTO temp.{tabela} VALUES ({', '.join('?' * len(colunas))});",
+            df.astype(object).where(df.notna(), None).itertuples(index=False, name=None),
+        )
+    if "id" in colunas:
+        cursor.execute(f"CREATE INDEX temp.idx_{tabela}_id ON {tabela} (id);")
+    return f"temp.{tabela}"
+
+
+def _criar_sobreposicao(conn):
+    """Tabela TEMP com as partições carregadas e a VIEW TEMP 'vendas' (main.vendas + arquivo)."""
+    from functions.migracoes import COLUNAS_TEMPORAIS
+
+    geradas = ", ".join(
+        f"{nome} INTEGER GENERATED ALWAYS AS ({expressao}) VIRTUAL" for nome, expressao in COLUNAS_TEMPORAIS
+    )
+    colunas = ", ".join(COLUNAS_LINHAS + [nome for nome, _ in COLUNAS_TEMPORAIS])
+    conn.execute(f'''
+    CREATE TEMP TABLE IF NOT EXISTS vendas_arquivo (
+        id INTEGER, produto_id INTEGER, quantidade INTEGER, preco_unitario_venda REAL,
+        valor_total_item REAL, data_venda TEXT, cliente_id INTEGER, formas_pagamento_id INTEGER,
+        transacao_id INTEGER, {geradas}
+    );
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_vendas_arquivo_data ON vendas_arquivo (data_venda);")
+    conn.execute('''
+    CREATE TEMP TABLE IF NOT EXISTS arquivo_carregadas (
+        ano_mes INTEGER PRIMARY KEY, nivel TEXT NOT NULL, versao TEXT NOT NULL
+    );
+    ''')
+    conn.execute(f'''
+    CREATE TEMP VIEW IF NOT EXISTS vendas AS
+    SELECT {colunas} FROM main.vendas
+    UNION ALL
+    SELECT {colunas} FROM temp.vendas_arquivo;
+    ''')
+
+
+def _carregar(conn, ano_mes, pasta, versao, nivel):
+    """Troca as linhas do mês na tabela TEMP pelas da partição, no nível pedido."""
+    conn.execute("DELETE FROM temp.vendas_arquivo WHERE ano_mes = ?;", (ano_mes,))
+    if nivel == LINHAS:
+        df = ler_linhas(pasta, versao)
+        linhas = df[COLUNAS_LINHAS].astype(object).where(df[COLUNAS_LINHAS].notna(), None)
+    else:
+        # Uma pseudo-venda por dia x produto x forma: as somas saem iguais às das linhas
+        df = ler_resumo(pasta, versao)
+        linhas = pd.DataFrame({
+            "id": None,
+            "produto_id": df["produto_id"],
+            "quantidade": df["itens"],
+            "preco_unitario_venda": None,
+            "valor_total_item": df["receita"],
+            "data_venda": df["dia"] + " 00:00:00",
+            "cliente_id": None,
+            "formas_pagamento_id": df["formas_pagamento_id"],
+            "transacao_id": None,
+        }).astype(object)
+    conn.executemany(
+        f"INSERT INTO temp.vendas_arquivo ({', '.join(COLUNAS_LINHAS)}) VALUES ({', '.join('?' * len(COLUNAS_LINHAS))});",
+        linhas.itertuples(index=False, name=None),
+    )
+
+
+def preparar_leitura(conn, nivel, inicio=None, fim=None):
+    """
+    Garante que as partições do período estejam carregadas na conexão, no nível pedido
+    ("resumo" ou "linhas"). Partições já carregadas (e sem regravação) não são lidas de novo.
+    Retorna quantas partições foram carregadas agora.
+    """
+    for tentativa in range(2):
+        necessarias = particoes(conn, inicio, fim)
+        if not necessarias:
+            return 0
+        _criar_sobreposicao(conn)
+        carregadas = {
+            ano_mes: (nivel_atual, versao)
+            for ano_mes, nivel_atual, versao in conn.execute("SELECT ano_mes, nivel, versao FROM temp.arquivo_carregadas;")
+        }
+        lidas = 0
+        try:
+            for ano_mes, pasta, versao in necessarias:
+                nivel_atual, versao_atual = carregadas.get(ano_mes, (None, None))
+                if versao_atual == versao and (nivel_atual == LINHAS or nivel == RESUMO):
+                    continue
+                _carregar(conn, ano_mes, pasta, versao, nivel)
+                conn.execute(
+                    "INSERT OR REPLACE INTO temp.arquivo_carregadas (ano_mes, nivel, versao) VALUES (?, ?, ?);",
+                    (ano_mes, nivel, versao),
+                )
+                lidas += 1
+        except FileNotFoundError:
+            # A partição foi regravada entre a leitura do catálogo e a do arquivo: lê o catálogo de novo
+            conn.rollback()
+            if tentativa:
+                raise
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        return lidas
+
+
+def com_arquivo(sem_periodo=LINHAS, com_periodo=LINHAS):
+    """
+    Decorador para as funções de consulta do setup.py que leem 'vendas': antes de cada
+    chamada, carrega as partições arquivadas do período (inicio/fim). 'sem_periodo' e
+    'com_periodo' dizem o nível necessário em cada caso ("resumo", "linhas" ou None,
+    quando a função não lê 'vendas' naquele caso).
+    """
+    def decorador(func):
+        assinatura = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(conn_ou_cursor, *args, **kwargs):
+            argumentos = assinatura.bind(conn_ou_cursor, *args, **kwargs).arguments
+            inicio, fim = argumentos.get("inicio"), argumentos.get("fim")
+            nivel = sem_periodo if inicio is None and fim is None else com_periodo
+            if nivel is not None:
+                preparar_leitura(_conexao_de(conn_ou_cursor), nivel, inicio, fim)
+            return func(conn_ou_cursor, *args, **kwargs)
+
+        return wrapper
+
+    return decorador
+
+
+def main(argv=None):
+    from functions import conexao
+    from functions import migracoes
+
+    parser = argparse.ArgumentParser(description="Move os meses fechados de 'vendas' para o arquivo em Parquet.")
+    parser.add_argument("--banco", default="acai.db", help="Caminho do arquivo SQLite (padrão: acai.db)")
+    parser.add_argument("--ate", help="Último mês a arquivar, 'YYYY-MM' (padrão: o mês passado)")
+    parser.add_argument("--diretorio", default=DIRETORIO_PADRAO,
+                        help="Pasta das partições, relativa à pasta do banco (padrão: arquivo)")
+    parser.add_argument("--vacuum", action="store_true", help="Roda VACUUM no final para encolher o arquivo do banco")
+    args = parser.parse_args(argv)
+
+    gerenciador = conexao.GerenciadorConexoes(args.banco)
+    try:
+        conn = gerenciador.conexao_escrita()
+        migracoes.aplicar_migracoes(conn)
+        movidas = arquivar(conn, args.ate, args.diretorio, verbose=True)
+        if not movidas:
+            print("Nenhum mês fechado para arquivar.")
+        if args.vacuum:
+            antes = os.path.getsize(args.banco)
+            conn.execute("VACUUM;")
+            print(f"VACUUM: {antes / 2**20:,.1f} MiB -> {os.path.getsize(args.banco) / 2**20:,.1f} MiB")
+    finally:
+        gerenciador.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# 🧾 Cabeçalho das transações (tabela materializada)
+# 'vendas' tem uma linha por ITEM; ticket médio e as análises por forma de pagamento
+# precisavam de COUNT(DISTINCT transacao_id) sobre todas essas linhas (ordenação temporária
+# de tudo). Esta tabela guarda uma linha por transação, com total e quantidade de itens já
+# somados, e essas métricas viram COUNT(*)/SUM sobre uma tabela bem menor.
+#
+# Pagamento dividido (a mesma transação paga com duas formas) vira UMA linha por forma de
+# pagamento, para que cada forma continue contando a transação e somando só a sua parte.
+# A coluna 'principal' marca uma única linha por transação (a primeira gravada); o número
+# de transações é SUM(principal).
+#
+# Cliente e data do cabeçalho são os da primeira linha da transação: num período, a
+# transação inteira conta no dia em que começou.
+#
+# A tabela e o gatilho são criados pelas migrações (functions/migracoes.py, passo 6).
+# Ela é mantida por um gatilho AFTER INSERT em 'vendas'; a carga em massa
+# (functions/ingestao.py) desliga o gatilho e chama recalcular_dias() no final.
+# Para exclusões/alterações feitas diretamente no banco, use reconstruir_transacoes(conn).
+
+DDL_TRANSACOES = '''
+CREATE TABLE IF NOT EXISTS transacoes (
+    transacao_id INTEGER NOT NULL,           -- vendas.transacao_id
+    formas_pagamento_id INTEGER NOT NULL,
+    cliente_id INTEGER NOT NULL,             -- cliente da primeira linha
+    data TEXT NOT NULL,                      -- MIN(data_venda), 'YYYY-MM-DD HH:MM:SS'
+    total REAL NOT NULL DEFAULT 0,           -- SUM(valor_total_item)
+    itens INTEGER NOT NULL DEFAULT 0,        -- SUM(quantidade)
+    principal INTEGER NOT NULL DEFAULT 1,    -- 1 em uma única linha por transacao_id
+    PRIMARY KEY (transacao_id, formas_pagamento_id)
+)
+'''
+
+# calcular_ticket_medio com período: o índice cobre a consulta inteira
+DDL_INDICE_DATA = '''
+CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes (data, total, principal)
+'''
+
+# Análises por forma de pagamento: agrupa na ordem do índice, sem ordenação temporária
+DDL_INDICE_FORMA = '''
+CREATE INDEX IF NOT EXISTS idx_transacoes_forma ON transacoes (formas_pagamento_id, data, total)
+'''
+
+DDL_GATILHO_TRANSACOES = '''
+CREATE TRIGGER IF NOT EXISTS trg_vendas_transacoes
+AFTER INSERT ON vendas
+WHEN NEW.transacao_id IS NOT NULL
+BEGIN
+    INSERT INTO transacoes (transacao_id, formas_pagamento_id, cliente_id, data, total, itens, principal)
+    VALUES (
+        NEW.transacao_id,
+        NEW.formas_pagamento_id,
+        NEW.cliente_id,
+        NEW.data_venda,
+        NEW.valor_total_item,
+        NEW.quantidade,
+        -- Só a primeira linha gravada da transação vira a principal
+        NOT EXISTS (SELECT 1 FROM transacoes WHERE transacao_id = NEW.transacao_id)
+    )
+    ON CONFLICT (transacao_id, formas_pagamento_id) DO UPDATE SET
+        data = MIN(data, excluded.data),
+        total = total + excluded.total,
+        itens = itens + excluded.itens;
+END
+'''
+
+
+SQL_LIMPAR_TRANSACOES = "DELETE FROM transacoes;"
+
+# A linha principal é a forma de pagamento da primeira linha (menor id) da transação,
+# a mesma que o gatilho marcaria gravando as vendas em ordem.
+# {tabela}: 'vendas' ou a tabela TEMP com o histórico inteiro (functions/arquivo.py)
+SQL_RECONSTRUIR_TRANSACOES = '''
+INSERT INTO transacoes (transacao_id, formas_pagamento_id, cliente_id, data, total, itens, principal)
+SELECT
+    g.transacao_id,
+    g.formas_pagamento_id,
+    (SELECT cliente_id FROM {tabela} WHERE id = g.primeira_linha),
+    g.data,
+    g.total,
+    g.itens,
+    ROW_NUMBER() OVER (PARTITION BY g.transacao_id ORDER BY g.primeira_linha) = 1
+FROM (
+    SELECT
+        transacao_id,
+        formas_pagamento_id,
+        MIN(id) AS primeira_linha,
+        MIN(data_venda) AS data,
+        SUM(valor_total_item) AS total,
+        SUM(quantidade) AS itens
+    FROM {tabela}
+    WHERE transacao_id IS NOT NULL {filtro}
+    GROUP BY transacao_id, formas_pagamento_id
+) g;
+'''
+
+
+def reconstruir_transacoes(conn):
+    """
+    Recalcula os cabeçalhos do zero a partir de 'vendas' e dos meses já arquivados
+    (functions/arquivo.py). Use após cargas feitas com os gatilhos desligados, exclusões ou
+    correções de dados.
+    """
+    from functions import arquivo
+
+    cursor = conn.cursor()
+    historico = arquivo.carregar_historico(
+        cursor,
+        ["id", "transacao_id", "formas_pagamento_id", "cliente_id", "data_venda", "valor_total_item", "quantidade"],
+        "transacoes_historico",
+    )
+    cursor.execute(SQL_LIMPAR_TRANSACOES)
+    cursor.execute(SQL_RECONSTRUIR_TRANSACOES.format(tabela=historico, filtro=""))
+    cursor.execute(f"DROP TABLE {historico};")
+    conn.commit()
+
+
+def recalcular_dias(cursor, dias):
+    """
+    Recalcula os cabeçalhos (com todas as linhas) das transações que têm vendas nos dias
+    informados ('YYYY-MM-DD'). Usado pela carga em massa, que grava com o gatilho desligado.
+    Não faz commit.
+    """
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS transacoes_afetadas (transacao_id INTEGER PRIMARY KEY);")
+    cursor.execute("DELETE FROM transacoes_afetadas;")
+    for dia in sorted(dias):
+        cursor.execute('''
+        INSERT OR IGNORE INTO transacoes_afetadas (transacao_id)
+        SELECT transacao_id FROM vendas
+        WHERE transacao_id IS NOT NULL AND data_venda >= ? AND data_venda < DATE(?, '+1 day');
+        ''', (dia, dia))
+    cursor.execute("DELETE FROM transacoes WHERE transacao_id IN (SELECT transacao_id FROM transacoes_afetadas);")
+    cursor.execute(SQL_RECONSTRUIR_TRANSACOES.format(
+        tabela="vendas",
+        filtro="AND transacao_id IN (SELECT transacao_id FROM transacoes_afetadas)"
+    ))
+    cursor.execute("DELETE FROM transacoes_afetadas;")
@@ -0,0 +1,128 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+# 🗄️ Cache de resultados das consultas do setup.py
+# Cada rerun do Streamlit (e cada clique no menu, em cada sessão) chamava o SQLite de novo
+# com as mesmas agregações. Este cache guarda o resultado de cada função, identificado por:
+#   - nome da função + argumentos (sem a conexão/cursor)
+#   - arquivo do banco
+#   - um "token de versão" barato dos dados: o conteúdo de sqlite_sequence, que guarda o
+#     último id gerado de cada tabela AUTOINCREMENT (vendas, clientes, produtos, ...).
+# Enquanto nenhuma linha nova for inserida, o resultado em cache é devolvido. Exclusões e
+# alterações diretas não mudam o token: depois delas, chame invalidar_cache().
+#
+# O cache é do processo inteiro (compartilhado entre as sessões) e limitado a
+# MAX_ENTRADAS resultados, descartando o menos usado recentemente (LRU).
+
+MAX_ENTRADAS = 256
+
+SQL_TOKEN = """
+SELECT
+    (SELECT file FROM pragma_database_list WHERE name = 'main'),
+    (SELECT group_concat(name || '=' || seq, ';') FROM sqlite_sequence);
+"""
+
+
+class CacheConsultas:
+    """Cache LRU, seguro entre threads, com contadores de acertos (hits) e falhas (misses)."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        """Retorna (True, valor) se a chave estiver no cache, senão (False, None)."""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return True, self._itens[chave]
+            self.misses += 1
+            return False, None
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_entradas:
+                self._itens.popitem(last=False)
+
+    def descartar(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": self.hits / total if total else 0.0,
+                "entradas": len(self._itens),
+                "max_entradas": self.max_entradas,
+            }
+
+
+_cache = CacheConsultas()
+
+
+def _conexao_de(conn_ou_cursor):
+    """As funções do setup recebem ora uma conexão, ora um cursor."""
+    return getattr(conn_ou_cursor, "connection", conn_ou_cursor)
+
+
+def token_dados(conn_ou_cursor):
+    """
+    Retorna (identificação do banco, versão dos dados) com uma única consulta barata.
+    Bancos em memória não têm arquivo, então usam a identidade da conexão.
+    """
+    conn = _conexao_de(conn_ou_cursor)
+    arquivo, sequencias = conn.execute(SQL_TOKEN).fetchone()
+    return (arquivo or id(conn)), sequencias
+
+
+def cache_consulta(func):
+    """
+    Decorador para as funções de consulta do setup.py (primeiro argumento: conexão ou cursor).
+    DataFrames são devolvidos como cópia, para que quem chama possa alterá-los sem
+    corromper o cache.
+    """
+    assinatura = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(conn_ou_cursor, *args, **kwargs):
+        # Normaliza os argumentos (posicionais, nomeados ou padrão) para que
+        # get_top_produtos(conn) e get_top_produtos(conn, limite=None) usem a mesma chave
+        argumentos = assinatura.bind(conn_ou_cursor, *args, **kwargs)
+        argumentos.apply_defaults()
+        parametros = tuple(argumentos.arguments.items())[1:]
+
+        banco, versao = token_dados(conn_ou_cursor)
+        chave = (func.__qualname__, banco, versao, parametros)
+
+        encontrado, valor = _cache.obter(chave)
+        if not encontrado:
+            valor = func(conn_ou_cursor, *args, **kwargs)
+            _cache.guardar(chave, valor)
+        return valor.copy() if hasattr(valor, "copy") else valor
+
+    return wrapper
+
+
+def invalidar_cache():
+    """Descarta todos os resultados (use após DELETE/UPDATE feitos direto no banco)."""
+    _cache.limpar()
+
+
+def estatisticas_cache():
+    """Retorna um dicionário com hits, misses, taxa de acerto e ocupação do cache."""
+    return _cache.estatisticas()
@@ -0,0 +1,111 @@
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from functions import ao_vivo as agregados_ao_vivo
+from functions import lojas as cadastro_lojas
+from functions import setup
+from functions import snapshots
+
+# 🚚 Carregamento concorrente dos dados de uma página do dashboard
+# Cada página chamava suas funções do setup.py uma depois da outra (algumas mais de uma vez,
+# com os mesmos argumentos), e o tempo da página era a SOMA de todas as consultas.
+# Aqui a página descreve tudo o que precisa de uma vez:
+#
+#     dados = carregador.carregar({
+#         "analise": carregador.chamada(setup.get_analise_formas_pagamento, **periodo),
+#         "pagamentos": carregador.chamada(setup.get_vendas_por_forma_pagamento, **periodo),
+#     })
+#     dados["analise"]  # -> DataFrame
+#
+#   - chamadas idênticas (mesma função e mesmos argumentos, contando os valores padrão)
+#     são executadas uma vez só e cada nome que a pediu recebe o resultado (ou uma cópia);
+#   - as demais rodam ao mesmo tempo num pool de threads limitado (MAX_THREADS), compartilhado
+#     por todas as sessões, para que muitos usuários juntos não abram conexões sem limite;
+#   - cada thread do pool usa a sua própria conexão somente leitura (setup.get_connection(),
+#     ou a do banco da loja escolhida; com várias lojas, veja functions/federacao.py).
+#
+# O tempo da página passa a ser o da consulta mais lenta. Cache (@cache_consulta), motor colunar
+# e arquivo em Parquet continuam valendo, pois as funções são as mesmas do setup.py.
+# Com snapshots ligados (snapshots.usar_snapshots()), as chamadas já pré-calculadas pelo
+# trabalhador de functions/snapshots.py saem direto do snapshot, sem tocar no banco.
+# No modo ao vivo (ao_vivo=True), as que os agregados em memória sabem responder saem deles
+# (functions/ao_vivo.py), antes até do snapshot.
+
+MAX_THREADS = 4
+
+_executor = None
+_lock_executor = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Chamada:
+    """Uma função de consulta do setup.py com seus argumentos (sem a conexão), já normalizados."""
+    funcao: object
+    argumentos: tuple
+
+    def executar(self, banco=None):
+        """Roda a função com a conexão de leitura da thread atual (no banco padrão ou no informado)."""
+        conn = setup.get_connection() if banco is None else cadastro_lojas.conexao_leitura(banco)
+        return self.funcao(conn, **dict(self.argumentos))
+
+
+def chamada(funcao, *args, **kwargs):
+    """
+    Descreve uma chamada funcao(conn, *args, **kwargs). Os argumentos são ligados à assinatura
+    da função (com os valores padrão), então get_top_categorias(conn) e
+    get_top_categorias(conn, limite=None) viram a mesma chamada.
+    """
+    ligacao = inspect.signature(funcao).bind(None, *args, **kwargs)
+    ligacao.apply_defaults()
+    argumentos = tuple(ligacao.arguments.items())[1:]  # o primeiro é a conexão
+    return Chamada(funcao, argumentos)
+
+
+def _pool():
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="carregador")
+    return _executor
+
+
+def carregar(chamadas, lojas=None, ao_vivo=False):
+    """
+    Executa as chamadas ({nome: chamada(...)}) em paralelo e retorna {nome: resultado},
+    na mesma ordem. Se alguma função levantar uma exceção, ela é relançada aqui,
+    depois que todas terminarem.
+    'lojas' (lista de lojas.Loja): sem ela, usa o banco padrão do setup.py; com uma loja, o banco
+    dela; com várias, junta os resultados de todas (veja functions/federacao.py).
+    'ao_vivo': responde o que der pelos agregados em memória, atualizados só com as vendas novas.
+    """
+    unicas = list(dict.fromkeys(chamadas.values()))
+    resultados = agregados_ao_vivo.buscar(unicas, lojas) if ao_vivo else {}
+    unicas = [c for c in unicas if c not in resultados]
+    resultados.update(snapshots.buscar(unicas, lojas))
+    unicas = [c for c in unicas if c not in resultados]
+    if unicas and lojas is not None and len(lojas) > 1:
+        from functions import federacao  # federacao importa este módulo
+        resultados.update(federacao.consultar({c: c for c in unicas}, lojas))
+    elif len(unicas) < 2:
+        # Uma consulta só: roda na própria thread, sem passar pelo pool
+        banco = lojas[0].banco if lojas else None
+        resultados.update({c: c.executar(banco) for c in unicas})
+    else:
+        banco = lojas[0].banco if lojas else None
+        pool = _pool()
+        futuros = {c: pool.submit(c.executar, banco) for c in unicas}
+        erros = [f.exception() for f in futuros.values()]
+        for erro in erros:
+            if erro is not None:
+                raise erro
+        resultados.update({c: f.result() for c, f in futuros.items()})
+    # Nomes que pediram a mesma chamada recebem cópias (como no cache), para que alterar o
+    # DataFrame de um não mude o do outro
+    saida, entregues = {}, set()
+    for nome, c in chamadas.items():
+        valor = resultados[c]
+        saida[nome] = valor.copy() if c in entregues and hasattr(valor, "copy") else valor
+        entregues.add(c)
+    return saida
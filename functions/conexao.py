@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+# 🔌 Gerenciador de conexões SQLite
+# Antes, todas as sessões do Streamlit dividiam UMA conexão global (e um cursor global),
+# o que enfileirava todos os usuários e fazia os cursores "brigarem" entre si.
+# Agora:
+#   - o banco é colocado em modo WAL: escritas não bloqueiam as leituras;
+#   - cada thread recebe sua própria conexão SOMENTE LEITURA, já ajustada
+#     (cache_size / mmap_size), emprestada de um pool;
+#   - existe uma única conexão de ESCRITA, protegida por um lock.
+#
+# O Streamlit cria uma thread nova a cada rerun. Quando a thread termina, a conexão
+# dela volta para o pool e é reaproveitada pela próxima, mantendo o cache de páginas quente.
+
+CACHE_LEITURA_KIB = 64 * 1024          # 64 MiB de cache de páginas por conexão de leitura
+MMAP_LEITURA_BYTES = 256 * 1024 * 1024  # até 256 MiB do arquivo mapeado em memória
+MAX_CONEXOES_OCIOSAS = 16
+TIMEOUT_SEGUNDOS = 30
+
+
+class _Emprestimo:
+    """Guarda a conexão de leitura de uma thread; ao ser descartado, devolve-a ao pool."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+class GerenciadorConexoes:
+    """Conexões de leitura por thread (pool) + uma conexão de escrita, em modo WAL."""
+
+    def __init__(self, caminho="acai.db", cache_kib=CACHE_LEITURA_KIB, mmap_bytes=MMAP_LEITURA_BYTES,
+                 max_ociosas=MAX_CONEXOES_OCIOSAS):
+        self.caminho = caminho
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+        self.max_ociosas = max_ociosas
+        self._local = threading.local()
+        self._ociosas = []
+        self._lock_pool = threading.Lock()
+        self._lock_escrita = threading.RLock()
+        self._escrita = None
+
+    # --- ESCRITA -----------------------------------------------------------------------------
+
+    def conexao_escrita(self):
+        """
+        Retorna a conexão de escrita (criada na primeira chamada, já em modo WAL).
+        Para escrever a partir de várias threads, prefira o bloco 'with gerenciador.escrita()'.
+        """
+        with self._lock_escrita:
+            if self._escrita is None:
+                conn = sqlite3.connect(self.caminho, timeout=TIMEOUT_SEGUNDOS, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode = WAL;")
+                # Em WAL, NORMAL só perde a última transação numa queda de energia, nunca corrompe
+                conn.execute("PRAGMA synchronous = NORMAL;")
+                self._escrita = conn
+            return self._escrita
+
+    @contextmanager
+    def escrita(self):
+        """Bloco de escrita exclusivo: faz commit no final, ou rollback se houver erro."""
+        with self._lock_escrita:
+            conn = self.conexao_escrita()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    # --- LEITURA -----------------------------------------------------------------------------
+
+    def _abrir_leitura(self):
+        # Garante que o arquivo já exista e esteja em WAL antes de abrir em modo somente leitura
+        self.conexao_escrita()
+        uri = Path(self.caminho).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=TIMEOUT_SEGUNDOS, check_same_thread=False)
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_kib)};")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)};")
+        conn.execute("PRAGMA temp_store = MEMORY;")
+        return conn
+
+    def _devolver(self, conn):
+        with self._lock_pool:
+            if len(self._ociosas) < self.max_ociosas:
+                self._ociosas.append(conn)
+                return
+        conn.close()
+
+    def conexao_leitura(self):
+        """Retorna a conexão somente leitura da thread atual (emprestada do pool)."""
+        emprestimo = getattr(self._local, "emprestimo", None)
+        if emprestimo is None:
+            with self._lock_pool:
+                conn = self._ociosas.pop() if self._ociosas else None
+            if conn is None:
+                conn = self._abrir_leitura()
+            emprestimo = _Emprestimo(conn)
+            # Quando a thread terminar, o empréstimo é descartado e a conexão volta ao pool
+            weakref.finalize(emprestimo, self._devolver, conn)
+            self._local.emprestimo = emprestimo
+        return emprestimo.conn
+
+    def fechar(self):
+        """Fecha as conexões ociosas e a de escrita (as emprestadas fecham com suas threads)."""
+        with self._lock_pool:
+            ociosas, self._ociosas = self._ociosas, []
+            self.max_ociosas = 0
+        for conn in ociosas:
+            conn.close()
+        with self._lock_escrita:
+            if self._escrita is not None:
+                self._escrita.close()
+                self._escrita = None
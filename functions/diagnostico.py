@@ -0,0 +1,206 @@
+import re
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import pandas as pd
+
+from functions import quadros
+
+# 🩺 Instrumentação das consultas SQL
+# Todas as consultas do setup.py passam por executar() ou ler_sql(), que registram:
+#   - tempo de execução (incluindo a leitura das linhas) e número de linhas devolvidas;
+#   - a função do setup.py que fez a consulta;
+#   - o plano de execução (EXPLAIN QUERY PLAN), calculado uma vez por texto de SQL,
+#     com um aviso quando alguma tabela é varrida inteira sem índice.
+# Os registros ficam num buffer circular em memória (os mais antigos são descartados),
+# compartilhado pelo processo inteiro. Resultados vindos do cache (functions/cache.py)
+# não chegam ao banco e, por isso, não aparecem aqui.
+#
+# Os tempos de renderização de cada página do dashboard também são guardados aqui
+# (registrar_pagina), e a página "Diagnóstico" mostra tudo.
+
+MAX_REGISTROS = 500
+MAX_PAGINAS = 200
+MAX_PLANOS = 256
+
+# "SCAN vendas" (sem "USING ... INDEX") = leitura da tabela inteira. Subconsultas e CTEs
+# (CO-ROUTINE / MATERIALIZE) também aparecem como SCAN, mas não são tabelas.
+_VARREDURA = re.compile(r"^SCAN (\S+)(?!.*\bUSING\b.*\bINDEX\b)")
+_SUBCONSULTA = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+
+
+@dataclass(frozen=True)
+class ConsultaRegistrada:
+    """Uma execução de consulta: quando, quem chamou, quanto tempo levou e como o SQLite a executou."""
+    quando: float
+    funcao: str
+    sql: str
+    segundos: float
+    linhas: int
+    plano: tuple
+    varredura_completa: bool
+
+
+class Linhas(list):
+    """Linhas já lidas de uma consulta, com fetchone()/fetchall() como num cursor."""
+
+    def fetchone(self):
+        return self[0] if self else None
+
+    def fetchall(self):
+        return list(self)
+
+
+_registros = deque(maxlen=MAX_REGISTROS)
+_paginas = deque(maxlen=MAX_PAGINAS)
+_planos = {}
+_total = 0
+_lock = threading.Lock()
+
+
+def _conexao_de(conn_ou_cursor):
+    return getattr(conn_ou_cursor, "connection", conn_ou_cursor)
+
+
+def _sql_compacto(sql):
+    return " ".join(sql.split())
+
+
+def _plano(conn, sql, params):
+    """EXPLAIN QUERY PLAN da consulta (guardado por texto de SQL). Retorna (linhas do plano, varredura?)."""
+    with _lock:
+        if sql in _planos:
+            return _planos[sql]
+    try:
+        detalhes = tuple(linha[-1] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()))
+    except Exception as e:
+        detalhes = (f"(plano indisponível: {e})",)
+    subconsultas = {m.group(1) for m in map(_SUBCONSULTA.match, detalhes) if m} | {"CONSTANT"}
+    varredura = any(m and m.group(1) not in subconsultas for m in map(_VARREDURA.match, detalhes))
+    resultado = (detalhes, varredura)
+    with _lock:
+        if len(_planos) >= MAX_PLANOS:
+            _planos.clear()
+        _planos[sql] = resultado
+    return resultado
+
+
+def _registrar(conn, funcao, sql, params, segundos, linhas):
+    global _total
+    plano, varredura = _plano(conn, sql, params)
+    registro = ConsultaRegistrada(time.time(), funcao, _sql_compacto(sql), segundos, linhas, plano, varredura)
+    with _lock:
+        _registros.append(registro)
+        _total += 1
+
+
+def executar(conn_ou_cursor, sql, params=()):
+    """
+    Executa a consulta, lê todas as linhas e registra a execução.
+    Retorna as linhas (com fetchone()/fetchall(), como um cursor).
+    """
+    funcao = sys._getframe(1).f_code.co_name
+    inicio = time.perf_counter()
+    linhas = Linhas(conn_ou_cursor.execute(sql, params).fetchall())
+    _registrar(_conexao_de(conn_ou_cursor), funcao, sql, params, time.perf_counter() - inicio, len(linhas))
+    return linhas
+
+
+def ler_sql(sql, conn, params=None, datas=()):
+    """
+    Como pd.read_sql_query(sql, conn, params=params, parse_dates=datas), mas registra a execução
+    e devolve colunas em tipos compactos, montadas direto dos lotes do cursor (functions/quadros.py).
+    """
+    funcao = sys._getframe(1).f_code.co_name
+    inicio = time.perf_counter()
+    df = quadros.ler_cursor(conn.execute(sql, params or ()), datas)
+    _registrar(_conexao_de(conn), funcao, sql, params, time.perf_counter() - inicio, len(df))
+    return df
+
+
+def total_registradas():
+    """Quantas consultas já foram registradas no processo (inclusive as que saíram do buffer)."""
+    with _lock:
+        return _total
+
+
+def registros():
+    """Cópia dos registros no buffer, do mais antigo para o mais recente."""
+    with _lock:
+        return list(_registros)
+
+
+def consultas_mais_lentas(limite=20):
+    """DataFrame com as execuções mais lentas do buffer."""
+    linhas = [
+        {
+            "Função": r.funcao,
+            "Tempo (ms)": r.segundos * 1000,
+            "Linhas": r.linhas,
+            "Varredura completa": r.varredura_completa,
+            "SQL": r.sql,
+            "Plano": " | ".join(r.plano),
+        }
+        for r in sorted(registros(), key=lambda r: r.segundos, reverse=True)[:limite]
+    ]
+    return pd.DataFrame(linhas, columns=["Função", "Tempo (ms)", "Linhas", "Varredura completa", "SQL", "Plano"])
+
+
+def resumo_por_funcao():
+    """DataFrame com chamadas, tempo total/médio/máximo e avisos de varredura por função."""
+    df = pd.DataFrame(
+        [(r.funcao, r.segundos * 1000, r.linhas, r.varredura_completa) for r in registros()],
+        columns=["Função", "Tempo (ms)", "Linhas", "Varredura completa"],
+    )
+    if df.empty:
+        return pd.DataFrame(columns=["Função", "Chamadas", "Total (ms)", "Média (ms)", "Máximo (ms)", "Linhas",
+                                     "Varredura completa"])
+    resumo = df.groupby("Função").agg(
+        **{
+            "Chamadas": ("Tempo (ms)", "size"),
+            "Total (ms)": ("Tempo (ms)", "sum"),
+            "Média (ms)": ("Tempo (ms)", "mean"),
+            "Máximo (ms)": ("Tempo (ms)", "max"),
+            "Linhas": ("Linhas", "max"),
+            "Varredura completa": ("Varredura completa", "any"),
+        }
+    )
+    return resumo.sort_values("Total (ms)", ascending=False).reset_index()
+
+
+def registrar_pagina(pagina, segundos, consultas):
+    """Guarda o tempo de renderização de uma página do dashboard e quantas consultas ela fez."""
+    with _lock:
+        _paginas.append((time.time(), pagina, segundos, consultas))
+
+
+def tempos_paginas():
+    """DataFrame com renderizações, tempo médio/máximo e consultas por página."""
+    with _lock:
+        paginas = list(_paginas)
+    df = pd.DataFrame(paginas, columns=["Quando", "Página", "Tempo (ms)", "Consultas"])
+    df["Tempo (ms)"] *= 1000
+    if df.empty:
+        return pd.DataFrame(columns=["Página", "Renderizações", "Média (ms)", "Máximo (ms)", "Última (ms)",
+                                     "Consultas (última)"])
+    resumo = df.groupby("Página").agg(
+        **{
+            "Renderizações": ("Tempo (ms)", "size"),
+            "Média (ms)": ("Tempo (ms)", "mean"),
+            "Máximo (ms)": ("Tempo (ms)", "max"),
+            "Última (ms)": ("Tempo (ms)", "last"),
+            "Consultas (última)": ("Consultas", "last"),
+        }
+    )
+    return resumo.sort_values("Média (ms)", ascending=False).reset_index()
+
+
+def limpar():
+    """Descarta os registros de consultas, de páginas e os planos guardados."""
+    with _lock:
+        _registros.clear()
+        _paginas.clear()
+        _planos.clear()
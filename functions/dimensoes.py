@@ -0,0 +1,258 @@
+import argparse
+import os
+import threading
+
+import pandas as pd
+
+from functions import arquivo
+from functions import quadros
+from functions.cache import token_dados
+
+# 🏷️ Nomes únicos nas categorias e formas de pagamento + cache id -> nome em memória
+# As cargas antigas cadastravam a categoria e a forma de pagamento de novo a cada venda: o
+# acai.db distribuído tem 5.004 linhas em 'categorias' e em 'formas_pagamento' para 4 nomes
+# de cada. Nada impedia nomes repetidos, e as agregações por categoria e por forma de
+# pagamento juntavam e agrupavam esses textos.
+#
+# compactar_dimensoes() junta os cadastros repetidos dessas duas tabelas no de menor id, que
+# é o que a carga (functions/ingestao.py) já usava para um nome repetido, troca as chaves que
+# apontavam para os outros ('produtos', 'vendas', 'transacoes' e as partições do arquivo em
+# Parquet), apaga as linhas que sobram, e o comando cria índices UNIQUE nos nomes. Para elas,
+# o nome é a identidade: "Pix" é uma forma de pagamento só.
+#
+# Clientes e produtos NÃO são juntados: um nome não identifica um cliente (dois clientes
+# homônimos são pessoas diferentes, com métricas e contagens próprias), e um produto pode
+# ser recadastrado com outro preço ou categoria com o mesmo nome. As consultas do setup.py
+# continuam somando esses cadastros pelo nome onde o resultado é por nome.
+#
+# A compactação reescreve tabelas grandes e partições do arquivo, então não roda sozinha nas
+# migrações: é um comando explícito, numa transação só (nada muda se falhar no meio):
+#     python -m functions.dimensoes --banco acai.db --vacuum
+#
+# 🗂️ Cache de nomes: as funções do setup.py de categorias e de formas de pagamento agrupam só
+# pelos ids no SQL (direto dos índices de 'vendas'/'transacoes', sem JOIN com os textos) e
+# trocam os ids pelos nomes aqui, com os cadastros de cada banco guardados no processo. Os
+# ids são AUTOINCREMENT: um id maior que o último carregado é um cadastro novo, e só os
+# cadastros novos são lidos do banco. Renomeações não são vistas: depois delas, chame
+# limpar_cache_nomes().
+
+# Dimensões compactadas: tabela -> coluna do nome (categorias antes: os produtos apontam para elas)
+DIMENSOES = {
+    "categorias": "nome_categoria",
+    "formas_pagamento": "descricao",
+}
+
+# Colunas que guardam os ids de cada dimensão compactada ('transacoes', que tem o id da forma
+# de pagamento na chave primária, é juntada à parte)
+REFERENCIAS = {
+    "categorias": [("produtos", "categoria_id")],
+    "formas_pagamento": [("vendas", "formas_pagamento_id")],
+}
+
+# Coluna das partições do arquivo (functions/arquivo.py) com o id de cada dimensão compactada
+COLUNAS_ARQUIVO = {
+    "formas_pagamento": "formas_pagamento_id",
+}
+
+# Cache: tabela -> coluna do nome, e as colunas guardadas além do nome
+NOMES = {
+    "categorias": "nome_categoria",
+    "produtos": "nome",
+    "clientes": "nome",
+    "formas_pagamento": "descricao",
+}
+EXTRAS = {"produtos": ["categoria_id"]}
+
+DDL_NOMES_UNICOS = [
+    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabela}_nome ON {tabela} ({coluna})"
+    for tabela, coluna in DIMENSOES.items()
+]
+
+# Cada cadastro repetido -> o de menor id com o mesmo nome
+SQL_MAPA = '''
+INSERT INTO temp.mapa_{tabela} (antigo, novo)
+SELECT d.id, u.novo
+FROM {tabela} d
+JOIN (SELECT {coluna} AS nome, MIN(id) AS novo FROM {tabela} GROUP BY {coluna}) u ON u.nome = d.{coluna}
+WHERE d.id <> u.novo;
+'''
+
+SQL_TROCAR = '''
+UPDATE {tabela} SET {coluna} = (SELECT novo FROM temp.mapa_{dimensao} WHERE antigo = {coluna})
+WHERE {coluna} IN (SELECT antigo FROM temp.mapa_{dimensao});
+'''
+
+# Cabeçalhos das transações com a forma de pagamento trocada. Uma transação paga com duas
+# formas repetidas vira uma linha só: as partes se somam como no gatilho de cabecalho_transacoes.
+SQL_TRANSACOES_TROCADAS = '''
+CREATE TEMP TABLE transacoes_trocadas AS
+SELECT t.transacao_id, f.novo AS formas_pagamento_id, t.cliente_id, t.data, t.total, t.itens, t.principal
+FROM transacoes t
+JOIN temp.mapa_formas_pagamento f ON f.antigo = t.formas_pagamento_id;
+'''
+
+SQL_JUNTAR_TRANSACOES = '''
+INSERT INTO transacoes (transacao_id, formas_pagamento_id, cliente_id, data, total, itens, principal)
+SELECT transacao_id, formas_pagamento_id, cliente_id, data, total, itens, principal
+FROM temp.transacoes_trocadas WHERE true
+ON CONFLICT (transacao_id, formas_pagamento_id) DO UPDATE SET
+    cliente_id = CASE WHEN excluded.data < data THEN excluded.cliente_id ELSE cliente_id END,
+    data = MIN(data, excluded.data),
+    total = total + excluded.total,
+    itens = itens + excluded.itens,
+    principal = MAX(principal, excluded.principal);
+'''
+
+
+# --- COMPACTAÇÃO (comando) -------------------------------------------------------------------
+
+def contar_cadastros(conn):
+    """{tabela: linhas} das dimensões compactadas."""
+    return {tabela: conn.execute(f"SELECT COUNT(*) FROM {tabela};").fetchone()[0] for tabela in DIMENSOES}
+
+
+def _trocar_transacoes(cursor):
+    cursor.execute(SQL_TRANSACOES_TROCADAS)
+    cursor.execute("DELETE FROM transacoes WHERE formas_pagamento_id IN (SELECT antigo FROM temp.mapa_formas_pagamento);")
+    cursor.execute(SQL_JUNTAR_TRANSACOES)
+    cursor.execute("DROP TABLE temp.transacoes_trocadas;")
+
+
+def compactar_dimensoes(cursor):
+    """
+    Junta as categorias e as formas de pagamento repetidas (mesmo nome) no cadastro de menor
+    id e troca as referências a elas (veja acima). Retorna {tabela: cadastros apagados}.
+    Não faz commit. Versões de partições gravadas por uma transação desfeita depois são
+    apagadas por arquivo.limpar_versoes_antigas().
+    """
+    mapas = {}
+    for tabela, coluna in DIMENSOES.items():
+        cursor.execute(f"DROP TABLE IF EXISTS temp.mapa_{tabela};")
+        cursor.execute(f"CREATE TEMP TABLE mapa_{tabela} (antigo INTEGER PRIMARY KEY, novo INTEGER NOT NULL);")
+        cursor.execute(SQL_MAPA.format(tabela=tabela, coluna=coluna))
+        mapas[tabela] = dict(cursor.execute(f"SELECT antigo, novo FROM temp.mapa_{tabela};").fetchall())
+
+    novos = []
+    try:
+        if any(mapas.values()):
+            for dimensao, referencias in REFERENCIAS.items():
+                for tabela, coluna in referencias:
+                    cursor.execute(SQL_TROCAR.format(tabela=tabela, coluna=coluna, dimensao=dimensao))
+            _trocar_transacoes(cursor)
+            novos = arquivo.remapear_particoes(
+                cursor, {coluna: mapas[dimensao] for dimensao, coluna in COLUNAS_ARQUIVO.items()}
+            )
+        apagados = {}
+        for tabela in DIMENSOES:
+            cursor.execute(f"DELETE FROM {tabela} WHERE id IN (SELECT antigo FROM temp.mapa_{tabela});")
+            apagados[tabela] = cursor.rowcount
+            cursor.execute(f"DROP TABLE temp.mapa_{tabela};")
+    except Exception:
+        for caminho in novos:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        raise
+    return apagados
+
+
+# --- CACHE DE NOMES (consultas) --------------------------------------------------------------
+
+_cadastros = {}  # (banco, tabela) -> DataFrame indexado pelo id (nome + EXTRAS)
+_lock = threading.Lock()
+
+
+def _ler_cadastros(conn, tabela, ate_id):
+    """Cadastros da tabela em memória; lê do banco só os novos, se 'ate_id' passar do último carregado."""
+    chave = (token_dados(conn)[0], tabela)
+    df = _cadastros.get(chave)
+    if df is not None and ate_id <= (df.index[-1] if len(df) else 0):
+        return df
+    with _lock:
+        df = _cadastros.get(chave)
+        ultimo = int(df.index[-1]) if df is not None and len(df) else 0
+        if df is None or ate_id > ultimo:
+            colunas = [NOMES[tabela], *EXTRAS.get(tabela, [])]
+            novos = pd.DataFrame.from_records(
+                conn.execute(f"SELECT id, {', '.join(colunas)} FROM {tabela} WHERE id > ? ORDER BY id;", (ultimo,))
+                .fetchall(),
+                columns=["id", *colunas], index="id",
+            )
+            df = novos if df is None else pd.concat([df, novos])
+            # Troca a referência de uma vez: quem já leu continua com o DataFrame anterior
+            _cadastros[chave] = df
+    return df
+
+
+def traduzir(conn, tabela, ids, coluna=None):
+    """
+    Series com o nome (ou a 'coluna' de EXTRAS) do cadastro de cada id. Ids sem cadastro
+    viram nulos, para serem descartados como faria o JOIN.
+    """
+    ids = pd.Series(ids)
+    validos = ids.dropna()
+    df = _ler_cadastros(conn, tabela, int(validos.max()) if len(validos) else 0)
+    return ids.map(df[coluna or NOMES[tabela]])
+
+
+def somar_por_nome(conn, df, coluna_id, tabela, coluna_nome, ordem):
+    """
+    Troca a coluna 'coluna_id' de 'df' pelo nome do cadastro (coluna 'coluna_nome') e soma as
+    demais colunas por nome: como JOIN + GROUP BY nome ORDER BY 'ordem' DESC, nome ASC.
+    """
+    nomes = traduzir(conn, tabela, df[coluna_id])
+    df = df.drop(columns=coluna_id)
+    df.insert(0, coluna_nome, nomes)
+    df = df.dropna(subset=[coluna_nome]).groupby(coluna_nome, sort=True, as_index=False).sum()
+    return quadros.compactar(df.sort_values(ordem, ascending=False, kind="stable").reset_index(drop=True))
+
+
+def limpar_cache_nomes():
+    """Descarta os cadastros em memória (use após renomear cadastros direto no banco)."""
+    with _lock:
+        _cadastros.clear()
+
+
+def main(argv=None):
+    from functions import conexao
+    from functions import migracoes
+
+    parser = argparse.ArgumentParser(
+        description="Junta as categorias e formas de pagamento repetidas e torna os nomes delas únicos."
+    )
+    parser.add_argument("--banco", default="acai.db", help="Caminho do arquivo SQLite (padrão: acai.db)")
+    parser.add_argument("--vacuum", action="store_true", help="Roda VACUUM no final para encolher o arquivo do banco")
+    args = parser.parse_args(argv)
+
+    gerenciador = conexao.GerenciadorConexoes(args.banco)
+    try:
+        conn = gerenciador.conexao_escrita()
+        migracoes.aplicar_migracoes(conn, verbose=True)
+        antes = contar_cadastros(conn)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE;")
+            compactar_dimensoes(cursor)
+            for ddl in DDL_NOMES_UNICOS:
+                cursor.execute(ddl)
+            for tabela in DIMENSOES:
+                cursor.execute(f"ANALYZE {tabela};")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        depois = contar_cadastros(conn)
+        for tabela in DIMENSOES:
+            print(f"{tabela}: {antes[tabela]:,} -> {depois[tabela]:,} cadastros")
+        apagados = arquivo.limpar_versoes_antigas(conn)
+        if apagados:
+            print(f"{apagados} arquivos de versões antigas do arquivo histórico apagados")
+        if args.vacuum:
+            tamanho = os.path.getsize(args.banco)
+            conn.execute("VACUUM;")
+            print(f"VACUUM: {tamanho / 2**20:,.1f} MiB -> {os.path.getsize(args.banco) / 2**20:,.1f} MiB")
+    finally:
+        gerenciador.fechar()
+
+
+if __name__ == "__main__":
+    main()
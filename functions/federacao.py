@@ -0,0 +1,285 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from functions import aproximacao
+from functions import carregador
+from functions import series
+from functions import setup
+
+# 🌐 Consultas em várias lojas ao mesmo tempo (federação)
+# Cada loja tem o seu banco (functions/lojas.py). Para os números da rede inteira, cada
+# função do setup.py roda no banco de CADA loja, em paralelo (uma tarefa por loja), e os
+# resultados parciais são juntados aqui:
+#
+#   - somas e contagens são somadas; tabelas (DataFrames) são somadas por nome/dia/hora/mês
+#     e reordenadas como na função original;
+#   - médias nunca são somadas: ticket médio, receita média por cliente e a variação mensal
+#     são recalculados a partir das somas parciais (get_totais_transacoes,
+#     get_totais_clientes_com_compra, get_receita_mes_atual_e_anterior);
+#   - rankings com limite (top produtos/categorias/clientes) são pedidos inteiros a cada
+#     loja e cortados depois de juntar, para que o topo da rede saia exato. As listas
+#     paginadas (get_pagina_*) também: a página sai do ranking da rede (setup.paginar_ranking);
+#   - o snapshot de KPIs é montado com os resultados já juntados das funções de origem;
+#   - a série do gráfico de evolução é juntada dia a dia e só depois reduzida (functions/series.py),
+#     pois cada loja escolheria a granularidade pelos próprios dados;
+#   - no modo aproximado, as estimativas de clientes são somadas e a margem de erro da rede é a
+#     soma das margens (em clientes) de cada loja; os rankings da amostra, já na escala de cada
+#     loja, são somados como os exatos.
+#
+# Produtos, categorias, formas de pagamento e clientes são identificados pelo NOME entre lojas
+# (como na carga de dados). A contagem de clientes soma os cadastros de cada loja: quem compra
+# em duas lojas conta nas duas.
+#
+# O pool é de THREADS, e não de processos: o Streamlit registra o dashboard.py como módulo
+# __main__, e um processo iniciado com "spawn"/"forkserver" executaria o dashboard de novo;
+# "fork" num servidor com várias threads pode herdar travas (do SQLite inclusive) presas.
+# As consultas de cada loja passam a maior parte do tempo dentro do SQLite, que libera o GIL,
+# e juntar os resultados parciais é barato.
+#
+# Uso: carregador.carregar(chamadas, lojas=[...]) com mais de uma loja chama consultar().
+
+MAX_THREADS = 8
+
+_executor = None
+_lock_executor = threading.Lock()
+
+
+def _executar_na_loja(banco, chamadas):
+    """Roda numa thread do pool: executa as chamadas no banco de uma loja."""
+    return [c.executar(banco) for c in chamadas]
+
+
+def _pool():
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="federacao")
+    return _executor
+
+
+# --- COMO JUNTAR CADA FUNÇÃO -------------------------------------------------------------------
+
+def _somar(resultados):
+    return sum(resultados)
+
+
+def _somar_tuplas(resultados):
+    return tuple(sum(valores) for valores in zip(*resultados))
+
+
+def _somar_tabelas(resultados, chave, valores):
+    """Concatena as tabelas das lojas e soma 'valores' por 'chave' (ordenado pela chave)."""
+    tabelas = [df for df in resultados if chave in df.columns]
+    if not tabelas:
+        return resultados[0]
+    return pd.concat(tabelas, ignore_index=True).groupby(chave, as_index=False, sort=True)[valores].sum()
+
+
+def _ranking(chave, valor):
+    """Soma por 'chave' e ordena por 'valor' DESC, 'chave' ASC (o ORDER BY dos rankings)."""
+    def juntar(resultados):
+        df = _somar_tabelas(resultados, chave, [valor])
+        return df.sort_values([valor, chave], ascending=[False, True], kind="stable").reset_index(drop=True)
+    return juntar
+
+
+def _serie(chave, valor):
+    """Soma por 'chave', em ordem crescente da chave (dia, hora, mês...)."""
+    return lambda resultados: _somar_tabelas(resultados, chave, [valor])
+
+
+def _somar_estimativas(resultados):
+    valor = sum(e.valor for e in resultados)
+    margem = sum(e.valor * e.erro_relativo for e in resultados)
+    return aproximacao.Estimativa(valor, margem / valor if valor else 0.0)
+
+
+def _por_dia_da_semana(resultados):
+    ordem = {nome: i for i, nome in enumerate(setup.DIAS_SEMANA.values())}
+    df = _somar_tabelas(resultados, "Dia da Semana", ["Total Vendido"])
+    return df.sort_values("Dia da Semana", key=lambda dias: dias.map(ordem)).reset_index(drop=True)
+
+
+def _analise_formas_pagamento(resultados):
+    df = _somar_tabelas(resultados, "Forma de Pagamento", ["Valor Total", "Qtd. Transações"])
+    if "Valor Total" in df.columns:
+        df["Ticket Médio"] = df["Valor Total"] / df["Qtd. Transações"]
+        df = df.sort_values(["Valor Total", "Forma de Pagamento"], ascending=[False, True], kind="stable")
+    return df.reset_index(drop=True)
+
+
+# Funções que rodam em cada loja, e como juntar os resultados delas
+JUNTAR = {
+    "calcular_valor_total_vendas": _somar,
+    "calcular_quantidade_vendas": _somar,
+    "total_clientes": _somar,
+    "get_totais_transacoes": _somar_tuplas,
+    "get_totais_clientes_com_compra": _somar_tuplas,
+    "get_receita_mes_atual_e_anterior": _somar_tuplas,
+    "get_top_produtos": _ranking("Produto", "Total Vendido"),
+    "get_vendas_por_produto": _ranking("Produto", "Total Vendido"),
+    "get_top_categorias": _ranking("Categoria", "Total Vendido"),
+    "get_vendas_por_forma_pagamento": _ranking("Forma de Pagamento", "Total Vendido"),
+    "get_frequencia_forma_pagamento": _ranking("Forma de Pagamento", "Qtd. Transações"),
+    "get_top_clientes": _ranking("Cliente", "Total Gasto"),
+    "get_evolucao_vendas_diaria": _serie("Dia", "Total Vendido"),
+    "obter_dados_vendas": _serie("Dia", "Total Vendido"),
+    "get_vendas_por_hora_do_dia": _serie("Hora", "Total Vendido"),
+    "get_novos_clientes_por_mes": _serie("Mês", "Novos Clientes"),
+    "get_distribuicao_frequencia": _serie("Grupo de Frequência", "Número de Clientes"),
+    "get_vendas_por_dia_da_semana": _por_dia_da_semana,
+    "get_analise_formas_pagamento": _analise_formas_pagamento,
+    "get_receita_pelo_resumo": _somar,
+    "total_clientes_aproximado": _somar_estimativas,
+    "get_totais_amostra": _somar_tuplas,
+    "get_top_produtos_aproximado": _ranking("Produto", "Total Vendido"),
+    "get_top_categorias_aproximado": _ranking("Categoria", "Total Vendido"),
+}
+
+LIMITADAS = {
+    "get_top_produtos", "get_top_categorias", "get_top_clientes",
+    "get_top_produtos_aproximado", "get_top_categorias_aproximado",
+}
+
+# Listas paginadas -> ranking completo de onde a página da rede é cortada
+PAGINADAS = {
+    "get_pagina_produtos": setup.get_top_produtos,
+    "get_pagina_categorias": setup.get_top_categorias,
+    "get_pagina_clientes": setup.get_top_clientes,
+    "get_pagina_produtos_aproximado": setup.get_top_produtos_aproximado,
+    "get_pagina_categorias_aproximado": setup.get_top_categorias_aproximado,
+}
+
+
+def _razao(numerador, denominador):
+    return numerador / denominador if denominador else 0
+
+
+def _kpi_snapshot(argumentos):
+    periodo = {"inicio": argumentos["inicio"], "fim": argumentos["fim"]}
+    dependencias = {
+        "receita": carregador.chamada(setup.calcular_valor_total_vendas, **periodo),
+        "quantidade": carregador.chamada(setup.calcular_quantidade_vendas, **periodo),
+        "transacoes": carregador.chamada(setup.get_totais_transacoes, **periodo),
+        "clientes": carregador.chamada(setup.total_clientes, **periodo),
+        "produtos": carregador.chamada(setup.get_vendas_por_produto, **periodo),
+        "categorias": carregador.chamada(setup.get_top_categorias, **periodo),
+        "pagamentos": carregador.chamada(setup.get_vendas_por_forma_pagamento, **periodo),
+        "dias": carregador.chamada(setup.get_vendas_por_dia_da_semana, **periodo),
+        "horas": carregador.chamada(setup.get_vendas_por_hora_do_dia, **periodo),
+    }
+
+    def campeao(df, coluna):
+        # Mesma regra de get_kpi_snapshot: o maior total (o primeiro, em caso de empate)
+        return df.loc[df["Total Vendido"].idxmax(), coluna] if coluna in df.columns and len(df) else "N/D"
+
+    def compor(r):
+        return setup.KpiSnapshot(
+            receita_total=r["receita"],
+            quantidade_vendas=r["quantidade"],
+            ticket_medio=_razao(*r["transacoes"]),
+            total_clientes=r["clientes"],
+            produto_campeao=campeao(r["produtos"], "Produto"),
+            categoria_campea=campeao(r["categorias"], "Categoria"),
+            pagamento_preferido=campeao(r["pagamentos"], "Forma de Pagamento"),
+            dia_pico=campeao(r["dias"], "Dia da Semana"),
+            hora_pico=campeao(r["horas"], "Hora"),
+        )
+
+    return dependencias, compor
+
+
+def _evolucao_receita_mensal(argumentos):
+    def compor(r):
+        atual, anterior = r["meses"]
+        return atual, ((atual - anterior) / anterior) * 100 if anterior > 0 else float('inf')
+    return {"meses": carregador.chamada(setup.get_receita_mes_atual_e_anterior, fim=argumentos["fim"])}, compor
+
+
+def _receita_media_por_cliente_aproximada(argumentos):
+    periodo = {"inicio": argumentos["inicio"], "fim": argumentos["fim"]}
+    if periodo["inicio"] is None and periodo["fim"] is None:
+        # Sem período a função é exata (mesma conta de calcular_receita_media_por_cliente)
+        return (
+            {"totais": carregador.chamada(setup.get_totais_clientes_com_compra, **periodo)},
+            lambda r: aproximacao.Estimativa(_razao(*r["totais"]), 0.0),
+        )
+
+    def compor(r):
+        clientes = r["clientes"]
+        return aproximacao.Estimativa(_razao(r["receita"], clientes.valor), clientes.erro_relativo)
+
+    return {
+        "receita": carregador.chamada(setup.get_receita_pelo_resumo, **periodo),
+        "clientes": carregador.chamada(setup.total_clientes_aproximado, **periodo),
+    }, compor
+
+
+def _obter_dados_vendas(argumentos):
+    periodo = {"inicio": argumentos["inicio"], "fim": argumentos["fim"]}
+    return {"diaria": carregador.chamada(setup.obter_dados_vendas, **periodo)}, lambda r: series.reduzir_serie(
+        r["diaria"], argumentos["pontos"], argumentos["lttb"], **periodo
+    )
+
+
+# Funções que são médias/compostas: (argumentos) -> (chamadas que rodam nas lojas, compor(resultados))
+COMPOSTAS = {
+    "calcular_ticket_medio": lambda a: (
+        {"totais": carregador.chamada(setup.get_totais_transacoes, inicio=a["inicio"], fim=a["fim"])},
+        lambda r: _razao(*r["totais"]),
+    ),
+    "calcular_receita_media_por_cliente": lambda a: (
+        {"totais": carregador.chamada(setup.get_totais_clientes_com_compra, inicio=a["inicio"], fim=a["fim"])},
+        lambda r: _razao(*r["totais"]),
+    ),
+    "get_evolucao_receita_mensal": _evolucao_receita_mensal,
+    "get_kpi_snapshot": _kpi_snapshot,
+    "calcular_receita_media_por_cliente_aproximada": _receita_media_por_cliente_aproximada,
+    "obter_dados_vendas": _obter_dados_vendas,
+}
+
+
+def _expandir(chamada):
+    """Retorna ({chave: chamada que roda em cada loja}, compor(resultados já juntados))."""
+    nome = chamada.funcao.__name__
+    argumentos = dict(chamada.argumentos)
+    if nome in COMPOSTAS:
+        return COMPOSTAS[nome](argumentos)
+    if nome in PAGINADAS:
+        completa = carregador.chamada(PAGINADAS[nome], limite=None, inicio=argumentos["inicio"], fim=argumentos["fim"])
+        return {"completa": completa}, lambda r: setup.paginar_ranking(
+            r["completa"], argumentos["apos"], argumentos["tamanho"], argumentos["busca"]
+        )
+    if nome in LIMITADAS and argumentos["limite"] is not None:
+        completa = carregador.chamada(chamada.funcao, **{**argumentos, "limite": None})
+        return {"completa": completa}, lambda r: r["completa"].head(argumentos["limite"]).reset_index(drop=True)
+    if nome in JUNTAR:
+        return {"propria": chamada}, lambda r: r["propria"]
+    raise ValueError(f"{nome} não pode ser consultada em várias lojas")
+
+
+def consultar(chamadas, lojas):
+    """
+    Executa as chamadas ({nome: carregador.chamada(...)}) no banco de cada loja e retorna
+    {nome: resultado da rede inteira}. Cada loja recebe UMA tarefa com todas as chamadas
+    (sem repetições), e as lojas rodam em paralelo no pool de threads.
+    """
+    planos = {nome: _expandir(c) for nome, c in chamadas.items()}
+    bases = list(dict.fromkeys(c for dependencias, _ in planos.values() for c in dependencias.values()))
+
+    pool = _pool()
+    futuros = [(loja, pool.submit(_executar_na_loja, loja.banco, bases)) for loja in lojas]
+    por_loja = []
+    for loja, futuro in futuros:
+        try:
+            por_loja.append(futuro.result())
+        except Exception as e:
+            raise RuntimeError(f"Erro na loja '{loja.nome}': {e}") from e
+
+    juntos = {c: JUNTAR[c.funcao.__name__]([resultados[i] for resultados in por_loja]) for i, c in enumerate(bases)}
+    return {
+        nome: compor({chave: juntos[c] for chave, c in dependencias.items()})
+        for nome, (dependencias, compor) in planos.items()
+    }
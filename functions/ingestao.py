@@ -0,0 +1,379 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+from datetime import datetime
+
+from functions import aproximacao
+from functions import arquivo
+from functions import cabecalho_transacoes
+from functions import conexao
+from functions import metricas_clientes
+from functions import migracoes
+from functions import resumo_vendas
+
+# 📥 Carga em massa de vendas (CSV ou JSONL)
+# Lê o arquivo em fluxo (sem carregar tudo na memória), em lotes, e grava com
+# executemany + INSERT OR IGNORE dentro de transações grandes. Linhas repetidas são
+# descartadas pela restrição UNIQUE de 'vendas', então rodar a mesma carga duas vezes
+# não duplica nada.
+#
+# Produtos, clientes, categorias e formas de pagamento são informados pelo NOME e
+# resolvidos para ids com mapas em memória (criando o cadastro se ainda não existir).
+# Para categorias e formas de pagamento o nome é a identidade: nomes repetidos no banco
+# resolvem para o cadastro mais antigo (veja functions/dimensoes.py). Clientes homônimos
+# são pessoas diferentes, e um produto pode ser recadastrado com o mesmo nome: um nome com
+# mais de um cadastro é ambíguo, e a linha só é aceita com o id (cliente_id/produto_id).
+# A categoria de um produto já cadastrado não muda pela carga: uma linha com outra
+# categoria para ele é rejeitada.
+#
+# Em modo de carga em massa, os gatilhos que mantêm as tabelas derivadas (resumo por
+# dia/hora, métricas por cliente, cabeçalho das transações, esboços e amostra do modo
+# aproximado) são desligados durante cada transação; antes do commit, só os dias (e
+# clientes/transações) que receberam vendas são recalculados e os gatilhos são recriados.
+# Tudo na mesma transação: quem lê o banco nunca vê um resumo desatualizado.
+#
+# Meses já movidos para o arquivo em Parquet (functions/arquivo.py) estão fechados: linhas
+# com data nesses meses são rejeitadas (contam como erro), em vez de voltarem para 'vendas'.
+#
+# Colunas aceitas (cabeçalho do CSV ou chaves do JSONL):
+#   data_venda (obrigatória: ISO 'YYYY-MM-DD HH:MM:SS', também com 'T', ou 'DD/MM/AAAA HH:MM:SS';
+#   é gravada sempre como 'YYYY-MM-DD HH:MM:SS'), quantidade, preco_unitario_venda,
+#   produto, categoria, cliente, forma_pagamento, transacao_id, valor_total_item (opcional),
+#   cliente_id e produto_id (opcionais: no lugar de cliente/produto, com o id de um cadastro existente)
+#
+# Uso:
+#     python -m functions.ingestao vendas_2024-06-01.csv --banco acai.db
+
+TAMANHO_LOTE = 50_000
+LINHAS_POR_TRANSACAO = 500_000
+CATEGORIA_PADRAO = "Sem categoria"
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+FORMATOS_DATA_BR = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+SQL_INSERIR_VENDA = """
+INSERT OR IGNORE INTO vendas (
+    produto_id, quantidade, preco_unitario_venda, valor_total_item,
+    data_venda, cliente_id, formas_pagamento_id, transacao_id
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+
+# Tabelas derivadas mantidas por gatilho: (nome do gatilho, DDL do gatilho, recálculo por dias)
+DERIVADAS = [
+    ("trg_vendas_resumo_hora", resumo_vendas.DDL_GATILHO_RESUMO, resumo_vendas.recalcular_dias),
+    ("trg_vendas_clientes_metricas", metricas_clientes.DDL_GATILHO_METRICAS, metricas_clientes.recalcular_dias),
+    ("trg_vendas_transacoes", cabecalho_transacoes.DDL_GATILHO_TRANSACOES, cabecalho_transacoes.recalcular_dias),
+    ("trg_vendas_clientes_hll", aproximacao.DDL_GATILHO_ESBOCOS, aproximacao.recalcular_esbocos),
+    ("trg_vendas_amostra", aproximacao.DDL_GATILHO_AMOSTRA, aproximacao.recalcular_amostra),
+]
+
+
+class ErroLinha(ValueError):
+    """Linha do arquivo com dado faltando ou inválido."""
+
+
+def _numero(valor, tipo=float):
+    """Converte '10.5', '10,5' ou 10.5 para número (aceita vírgula decimal dos CSVs brasileiros)."""
+    if isinstance(valor, (int, float)):
+        return tipo(valor)
+    texto = str(valor).strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    return tipo(float(texto)) if tipo is int else tipo(texto)
+
+
+def _data_venda(texto):
+    """
+    Converte a data da venda para o formato de 'vendas' ('YYYY-MM-DD HH:MM:SS'). Outro formato
+    ficaria sem as colunas geradas (dia, hora, ano_mes) e escaparia da restrição UNIQUE.
+    """
+    try:
+        data = datetime.fromisoformat(texto)
+    except ValueError:
+        for formato in FORMATOS_DATA_BR:
+            try:
+                data = datetime.strptime(texto, formato)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ErroLinha(f"data_venda inválida: {texto!r}") from None
+    if data.tzinfo is not None:
+        raise ErroLinha(f"data_venda com fuso horário não é aceita: {texto!r}")
+    return data.strftime(FORMATO_DATA)
+
+
+class MapaDimensao:
+    """
+    Mapa nome -> id de uma tabela de dimensão, carregado uma vez e mantido em memória.
+    Sem 'coluna_id', nomes repetidos no banco resolvem para o menor id (o cadastro mais
+    antigo). Com 'coluna_id' (dimensões em que o nome não identifica o cadastro), um nome
+    repetido é ambíguo: a linha precisa trazer o id nessa coluna.
+    """
+
+    def __init__(self, conn, tabela, coluna_nome, coluna_id=None):
+        self.conn = conn
+        self.tabela = tabela
+        self.coluna_nome = coluna_nome
+        self.coluna_id = coluna_id
+        self.criados = 0
+        self.ids = {}
+        self.repetidos = {}  # nome -> quantos cadastros têm esse nome
+        self._existentes = set()
+        for id_, nome, cadastros in conn.execute(
+            f"SELECT MIN(id), {coluna_nome}, COUNT(*) FROM {tabela} GROUP BY {coluna_nome};"
+        ):
+            self.ids[nome] = id_
+            if cadastros > 1:
+                self.repetidos[nome] = cadastros
+
+    def conferir(self, id_):
+        """Retorna o id informado na linha, se ele existir na tabela."""
+        if id_ not in self._existentes:
+            if self.conn.execute(f"SELECT 1 FROM {self.tabela} WHERE id = ?;", (id_,)).fetchone() is None:
+                raise ErroLinha(f"{self.coluna_id} {id_} não existe em '{self.tabela}'")
+            self._existentes.add(id_)
+        return id_
+
+    def resolver(self, nome, **extras):
+        """Retorna o id do nome, criando o cadastro (com as colunas 'extras') se necessário."""
+        if self.coluna_id and nome in self.repetidos:
+            raise ErroLinha(
+                f"'{nome}' tem {self.repetidos[nome]} cadastros em '{self.tabela}': informe {self.coluna_id}"
+            )
+        id_ = self.ids.get(nome)
+        if id_ is None:
+            colunas = [self.coluna_nome, *extras]
+            marcadores = ", ".join("?" for _ in colunas)
+            cursor = self.conn.execute(
+                f"INSERT INTO {self.tabela} ({', '.join(colunas)}) VALUES ({marcadores});",
+                (nome, *extras.values()),
+            )
+            id_ = cursor.lastrowid
+            self.ids[nome] = id_
+            self.criados += 1
+        return id_
+
+
+class Ingestor:
+    """Converte linhas (dicionários) em tuplas de 'vendas', resolvendo as dimensões."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.categorias = MapaDimensao(conn, "categorias", "nome_categoria")
+        self.produtos = MapaDimensao(conn, "produtos", "nome", "produto_id")
+        self.clientes = MapaDimensao(conn, "clientes", "nome", "cliente_id")
+        self.formas_pagamento = MapaDimensao(conn, "formas_pagamento", "descricao")
+        self.meses_arquivados = arquivo.meses_arquivados(conn)
+        self._categoria_do_produto = {}
+
+    def _texto(self, linha, campo):
+        valor = linha.get(campo)
+        if valor is None or str(valor).strip() == "":
+            raise ErroLinha(f"campo '{campo}' vazio")
+        return str(valor).strip()
+
+    def _id_ou_nome(self, linha, mapa, campo_nome):
+        """Id do cadastro: o da coluna mapa.coluna_id, se vier preenchida, ou o do nome."""
+        id_ = linha.get(mapa.coluna_id)
+        if id_ not in (None, ""):
+            return mapa.conferir(_numero(id_, int))
+        return mapa.resolver(self._texto(linha, campo_nome))
+
+    def _produto(self, linha, preco):
+        if linha.get("produto_id") not in (None, ""):
+            return self.produtos.conferir(_numero(linha["produto_id"], int))
+        nome_produto = self._texto(linha, "produto")
+        categoria = str(linha.get("categoria") or "").strip()
+        if nome_produto not in self.produtos.ids:
+            categoria_id = self.categorias.resolver(categoria or CATEGORIA_PADRAO)
+            return self.produtos.resolver(nome_produto, preco_unitario=preco, categoria_id=categoria_id)
+        produto_id = self.produtos.resolver(nome_produto)
+        if categoria:
+            atual = self._categoria_do_produto.get(produto_id)
+            if atual is None:
+                atual = self.conn.execute(
+                    "SELECT c.nome_categoria FROM produtos p JOIN categorias c ON c.id = p.categoria_id WHERE p.id = ?;",
+                    (produto_id,),
+                ).fetchone()
+                atual = self._categoria_do_produto[produto_id] = atual[0] if atual else ""
+            if atual != categoria:
+                raise ErroLinha(f"produto '{nome_produto}' já cadastrado na categoria '{atual}', não em '{categoria}'")
+        return produto_id
+
+    def converter(self, linha):
+        data_venda = _data_venda(self._texto(linha, "data_venda"))
+        if self.meses_arquivados and int(data_venda[:4] + data_venda[5:7]) in self.meses_arquivados:
+            raise ErroLinha(f"o mês de {data_venda[:7]} já foi arquivado")
+        quantidade = _numero(self._texto(linha, "quantidade"), int)
+        preco = _numero(self._texto(linha, "preco_unitario_venda"))
+        valor_total = linha.get("valor_total_item")
+        valor_total = _numero(valor_total) if valor_total not in (None, "") else quantidade * preco
+        transacao = linha.get("transacao_id")
+        transacao = _numero(transacao, int) if transacao not in (None, "") else None
+
+        return (
+            self._produto(linha, preco),
+            quantidade,
+            preco,
+            valor_total,
+            data_venda,
+            self._id_ou_nome(linha, self.clientes, "cliente"),
+            self.formas_pagamento.resolver(self._texto(linha, "forma_pagamento")),
+            transacao,
+        )
+
+    def novos_cadastros(self):
+        return {
+            "categorias": self.categorias.criados,
+            "produtos": self.produtos.criados,
+            "clientes": self.clientes.criados,
+            "formas_pagamento": self.formas_pagamento.criados,
+        }
+
+
+def ler_linhas(caminho, formato=None, delimitador=","):
+    """Gera um dicionário por linha do arquivo, sem carregá-lo inteiro na memória."""
+    formato = formato or ("jsonl" if caminho.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        if formato == "csv":
+            yield from csv.DictReader(arquivo, delimiter=delimitador)
+        else:
+            for texto in arquivo:
+                if texto.strip():
+                    yield json.loads(texto)
+
+
+def _suspender_gatilhos(cursor):
+    for nome, _, _ in DERIVADAS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome};")
+
+
+def _restaurar_gatilhos(cursor, dias):
+    """Recalcula as tabelas derivadas dos dias afetados e recria os gatilhos."""
+    for _, ddl, recalcular in DERIVADAS:
+        recalcular(cursor, dias)
+        cursor.execute(ddl)
+    dias.clear()
+
+
+def carregar_vendas(conn, linhas, tamanho_lote=TAMANHO_LOTE, linhas_por_transacao=LINHAS_POR_TRANSACAO,
+                    em_massa=True, verbose=False):
+    """
+    Grava as linhas em 'vendas' em lotes (executemany + INSERT OR IGNORE).
+    Faz commit a cada 'linhas_por_transacao' linhas e no final.
+    Com em_massa=True, os gatilhos das tabelas derivadas ficam desligados durante cada
+    transação e os dias afetados são recalculados uma vez só, antes do commit.
+    Retorna um dicionário com lidas, inseridas, ignoradas (duplicadas), rejeitadas e linhas/s.
+    """
+    ingestor = Ingestor(conn)
+    cursor = conn.cursor()
+    lidas = inseridas = rejeitadas = desde_commit = 0
+    erros = []
+    dias_afetados = set()
+    inicio = time.perf_counter()
+
+    def _iniciar():
+        if em_massa:
+            if not conn.in_transaction:
+                cursor.execute("BEGIN;")
+            _suspender_gatilhos(cursor)
+
+    def _commit():
+        if em_massa:
+            _restaurar_gatilhos(cursor, dias_afetados)
+        conn.commit()
+
+    try:
+        _iniciar()
+        linhas = iter(linhas)
+        while True:
+            bloco = list(itertools.islice(linhas, tamanho_lote))
+            if not bloco:
+                break
+
+            lote = []
+            for numero, linha in enumerate(bloco, start=lidas + 1):
+                try:
+                    lote.append(ingestor.converter(linha))
+                except (ErroLinha, ValueError, TypeError) as e:
+                    rejeitadas += 1
+                    if len(erros) < 10:
+                        erros.append(f"linha {numero}: {e}")
+            lidas += len(bloco)
+
+            cursor.executemany(SQL_INSERIR_VENDA, lote)
+            # rowcount soma só as linhas de 'vendas' (as alterações dos gatilhos não entram)
+            inseridas += max(cursor.rowcount, 0)
+            if em_massa:
+                dias_afetados.update(venda[4][:10] for venda in lote)
+            desde_commit += len(bloco)
+            if desde_commit >= linhas_por_transacao:
+                _commit()
+                _iniciar()
+                desde_commit = 0
+
+            if verbose:
+                decorrido = time.perf_counter() - inicio
+                print(f"{lidas:>12,} linhas lidas | {lidas / decorrido:,.0f} linhas/s", file=sys.stderr)
+
+        _commit()
+    except Exception:
+        # Desfaz a transação em andamento (inclusive o DROP TRIGGER do modo em massa)
+        conn.rollback()
+        raise
+
+    decorrido = time.perf_counter() - inicio
+    return {
+        "lidas": lidas,
+        "inseridas": inseridas,
+        "ignoradas": lidas - rejeitadas - inseridas,
+        "rejeitadas": rejeitadas,
+        "erros": erros,
+        "novos_cadastros": ingestor.novos_cadastros(),
+        "segundos": decorrido,
+        "linhas_por_segundo": lidas / decorrido if decorrido else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carrega vendas em massa a partir de arquivos CSV ou JSONL.")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos .csv ou .jsonl de vendas")
+    parser.add_argument("--banco", default="acai.db", help="Caminho do arquivo SQLite (padrão: acai.db)")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], help="Força o formato (padrão: pela extensão)")
+    parser.add_argument("--delimitador", default=",", help="Separador de colunas do CSV (padrão: ',')")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Linhas por executemany")
+    parser.add_argument("--transacao", type=int, default=LINHAS_POR_TRANSACAO, help="Linhas por commit")
+    args = parser.parse_args(argv)
+
+    gerenciador = conexao.GerenciadorConexoes(args.banco)
+    try:
+        conn = gerenciador.conexao_escrita()
+        migracoes.aplicar_migracoes(conn)
+        for caminho in args.arquivos:
+            resultado = carregar_vendas(
+                conn,
+                ler_linhas(caminho, args.formato, args.delimitador),
+                tamanho_lote=args.lote,
+                linhas_por_transacao=args.transacao,
+                verbose=True,
+            )
+            print(
+                f"{caminho}: {resultado['lidas']:,} lidas, {resultado['inseridas']:,} inseridas, "
+                f"{resultado['ignoradas']:,} duplicadas, {resultado['rejeitadas']:,} rejeitadas "
+                f"em {resultado['segundos']:.1f}s ({resultado['linhas_por_segundo']:,.0f} linhas/s)"
+            )
+            for erro in resultado["erros"]:
+                print(f"  {erro}")
+            novos = {k: v for k, v in resultado["novos_cadastros"].items() if v}
+            if novos:
+                print(f"  novos cadastros: {novos}")
+    finally:
+        gerenciador.fechar()
+
+
+if __name__ == "__main__":
+    main()
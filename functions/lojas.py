@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+
+from functions import conexao
+from functions import migracoes
+
+# 🏪 Cadastro de lojas
+# Cada loja tem o seu próprio banco (um acai.db por loja). As lojas ficam em um arquivo
+# JSON (ARQUIVO_LOJAS), uma entrada por loja:
+#
+#     [
+#         {"nome": "Centro", "banco": "lojas/centro.db"},
+#         {"nome": "Praia", "banco": "lojas/praia.db"}
+#     ]
+#
+# Caminhos relativos são relativos à pasta do arquivo JSON. Sem o arquivo não há cadastro:
+# o dashboard usa só o banco padrão do setup.py (acai.db), como antes.
+#
+# conexao_leitura(banco) abre (uma vez por processo) um GerenciadorConexoes para o banco da
+# loja, aplicando as migrações pendentes, e devolve a conexão somente leitura da thread atual.
+# As consultas de várias lojas ao mesmo tempo ficam em functions/federacao.py.
+
+ARQUIVO_LOJAS = "lojas.json"
+TODAS = "Todas as lojas"
+
+
+@dataclass(frozen=True)
+class Loja:
+    """Uma loja e o caminho do seu banco SQLite."""
+    nome: str
+    banco: str
+
+
+_gerenciadores = {}
+_lock = threading.Lock()
+
+
+def carregar_lojas(caminho=ARQUIVO_LOJAS):
+    """Lista de Loja do arquivo de cadastro (vazia, se ele não existir)."""
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as arquivo:
+        entradas = json.load(arquivo)
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    lojas = [Loja(str(e["nome"]), os.path.join(pasta, e["banco"])) for e in entradas]
+    nomes = [loja.nome for loja in lojas]
+    if len(set(nomes)) != len(nomes) or TODAS in nomes:
+        raise ValueError(f"{caminho}: os nomes das lojas devem ser únicos (e diferentes de '{TODAS}')")
+    return lojas
+
+
+def gerenciador(banco):
+    """GerenciadorConexoes do banco (um por processo), com as migrações já aplicadas."""
+    chave = os.path.abspath(banco)
+    with _lock:
+        if chave not in _gerenciadores:
+            novo = conexao.GerenciadorConexoes(banco)
+            migracoes.aplicar_migracoes(novo.conexao_escrita())
+            _gerenciadores[chave] = novo
+        return _gerenciadores[chave]
+
+
+def conexao_leitura(banco):
+    """Conexão somente leitura da thread atual para o banco de uma loja."""
+    return gerenciador(banco).conexao_leitura()
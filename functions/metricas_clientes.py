@@ -0,0 +1,168 @@
+# 👥 Métricas por cliente (tabela materializada)
+# As análises de clientes (novos clientes por mês, distribuição de frequência, top clientes
+# e receita média) montavam, a cada chamada, um agrupamento por cliente sobre TODA a
+# tabela 'vendas'. Esta tabela guarda uma linha por cliente com os números já somados,
+# então essas funções leem no máximo uma linha por cliente (ou só o topo de um índice).
+#
+# A tabela e o gatilho são criados pelas migrações (functions/migracoes.py, passo 5).
+# Ela é mantida por um gatilho AFTER INSERT em 'vendas'; a carga em massa
+# (functions/ingestao.py) desliga o gatilho e chama recalcular_dias() no final.
+# Para exclusões/alterações feitas diretamente no banco, use reconstruir_metricas_clientes(conn).
+#
+# Meses movidos para o arquivo em Parquet (functions/arquivo.py) saem de 'vendas', mas não
+# desta tabela. A parte arquivada de cada cliente fica em 'clientes_metricas_arquivo', e os
+# recálculos somam as duas partes.
+
+DDL_METRICAS_CLIENTES = '''
+CREATE TABLE IF NOT EXISTS clientes_metricas (
+    cliente_id INTEGER PRIMARY KEY,
+    primeira_compra TEXT NOT NULL,          -- MIN(data_venda), 'YYYY-MM-DD HH:MM:SS'
+    ultima_compra TEXT NOT NULL,            -- MAX(data_venda)
+    transacoes INTEGER NOT NULL DEFAULT 0,  -- COUNT(DISTINCT transacao_id)
+    total_gasto REAL NOT NULL DEFAULT 0,    -- SUM(valor_total_item)
+    itens INTEGER NOT NULL DEFAULT 0        -- SUM(quantidade)
+)
+'''
+
+# get_novos_clientes_por_mes: agrupa pelo mês da primeira compra
+DDL_INDICE_PRIMEIRA_COMPRA = '''
+CREATE INDEX IF NOT EXISTS idx_clientes_metricas_primeira ON clientes_metricas (primeira_compra)
+'''
+
+# get_top_clientes: lê só o topo do índice, sem ordenar todos os clientes
+DDL_INDICE_TOTAL_GASTO = '''
+CREATE INDEX IF NOT EXISTS idx_clientes_metricas_total ON clientes_metricas (total_gasto DESC, cliente_id)
+'''
+
+DDL_GATILHO_METRICAS = '''
+CREATE TRIGGER IF NOT EXISTS trg_vendas_clientes_metricas
+AFTER INSERT ON vendas
+BEGIN
+    INSERT INTO clientes_metricas (cliente_id, primeira_compra, ultima_compra, transacoes, total_gasto, itens)
+    VALUES (
+        NEW.cliente_id,
+        NEW.data_venda,
+        NEW.data_venda,
+        -- Só conta a transação se for a primeira linha dela para este cliente
+        NEW.transacao_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM vendas
+            WHERE transacao_id = NEW.transacao_id
+              AND cliente_id = NEW.cliente_id
+              AND id <> NEW.id
+        ),
+        NEW.valor_total_item,
+        NEW.quantidade
+    )
+    ON CONFLICT (cliente_id) DO UPDATE SET
+        primeira_compra = MIN(primeira_compra, excluded.primeira_compra),
+        ultima_compra = MAX(ultima_compra, excluded.ultima_compra),
+        transacoes = transacoes + excluded.transacoes,
+        total_gasto = total_gasto + excluded.total_gasto,
+        itens = itens + excluded.itens;
+END
+'''
+
+# Mesmas colunas, só com as vendas que já foram para o arquivo em Parquet (passo 7)
+DDL_METRICAS_ARQUIVADAS = '''
+CREATE TABLE IF NOT EXISTS clientes_metricas_arquivo (
+    cliente_id INTEGER PRIMARY KEY,
+    primeira_compra TEXT NOT NULL,
+    ultima_compra TEXT NOT NULL,
+    transacoes INTEGER NOT NULL DEFAULT 0,
+    total_gasto REAL NOT NULL DEFAULT 0,
+    itens INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+
+SQL_LIMPAR_METRICAS = "DELETE FROM clientes_metricas;"
+
+SQL_RECONSTRUIR_METRICAS = '''
+INSERT INTO clientes_metricas (cliente_id, primeira_compra, ultima_compra, transacoes, total_gasto, itens)
+SELECT
+    cliente_id,
+    MIN(data_venda),
+    MAX(data_venda),
+    COUNT(DISTINCT transacao_id),
+    SUM(valor_total_item),
+    SUM(quantidade)
+FROM vendas
+{filtro}
+GROUP BY cliente_id;
+'''
+
+# Soma as vendas de um mês (ano_mes = ?) que está indo para o arquivo
+SQL_ARQUIVAR_MES = '''
+INSERT INTO clientes_metricas_arquivo (cliente_id, primeira_compra, ultima_compra, transacoes, total_gasto, itens)
+SELECT
+    cliente_id,
+    MIN(data_venda),
+    MAX(data_venda),
+    COUNT(DISTINCT transacao_id),
+    SUM(valor_total_item),
+    SUM(quantidade)
+FROM main.vendas
+WHERE ano_mes = ?
+GROUP BY cliente_id
+ON CONFLICT (cliente_id) DO UPDATE SET
+    primeira_compra = MIN(primeira_compra, excluded.primeira_compra),
+    ultima_compra = MAX(ultima_compra, excluded.ultima_compra),
+    transacoes = transacoes + excluded.transacoes,
+    total_gasto = total_gasto + excluded.total_gasto,
+    itens = itens + excluded.itens;
+'''
+
+# Como SQL_RECONSTRUIR_METRICAS, somando a parte arquivada ({filtro} vale para as duas partes)
+SQL_RECONSTRUIR_METRICAS_COM_ARQUIVO = '''
+INSERT INTO clientes_metricas (cliente_id, primeira_compra, ultima_compra, transacoes, total_gasto, itens)
+SELECT cliente_id, MIN(primeira_compra), MAX(ultima_compra), SUM(transacoes), SUM(total_gasto), SUM(itens)
+FROM (
+    SELECT
+        cliente_id,
+        MIN(data_venda) AS primeira_compra,
+        MAX(data_venda) AS ultima_compra,
+        COUNT(DISTINCT transacao_id) AS transacoes,
+        SUM(valor_total_item) AS total_gasto,
+        SUM(quantidade) AS itens
+    FROM main.vendas
+    {filtro}
+    GROUP BY cliente_id
+    UNION ALL
+    SELECT cliente_id, primeira_compra, ultima_compra, transacoes, total_gasto, itens
+    FROM clientes_metricas_arquivo
+    {filtro}
+)
+GROUP BY cliente_id;
+'''
+
+
+def reconstruir_metricas_clientes(conn):
+    """
+    Recalcula a tabela de métricas do zero a partir de 'vendas', somando a parte dos meses
+    já arquivados guardada em 'clientes_metricas_arquivo'. Use após cargas feitas com os
+    gatilhos desligados, exclusões ou correções de dados.
+    """
+    cursor = conn.cursor()
+    cursor.execute(SQL_LIMPAR_METRICAS)
+    cursor.execute(SQL_RECONSTRUIR_METRICAS_COM_ARQUIVO.format(filtro=""))
+    conn.commit()
+
+
+def recalcular_dias(cursor, dias):
+    """
+    Recalcula as métricas (de todo o histórico) dos clientes que compraram nos dias
+    informados ('YYYY-MM-DD'). Usado pela carga em massa, que grava com o gatilho desligado.
+    Não faz commit.
+    """
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS clientes_afetados (cliente_id INTEGER PRIMARY KEY);")
+    cursor.execute("DELETE FROM clientes_afetados;")
+    for dia in sorted(dias):
+        cursor.execute('''
+        INSERT OR IGNORE INTO clientes_afetados (cliente_id)
+        SELECT cliente_id FROM vendas WHERE data_venda >= ? AND data_venda < DATE(?, '+1 day');
+        ''', (dia, dia))
+    cursor.execute("DELETE FROM clientes_metricas WHERE cliente_id IN (SELECT cliente_id FROM clientes_afetados);")
+    cursor.execute(SQL_RECONSTRUIR_METRICAS_COM_ARQUIVO.format(
+        filtro="WHERE cliente_id IN (SELECT cliente_id FROM clientes_afetados)"
+    ))
+    cursor.execute("DELETE FROM clientes_afetados;")
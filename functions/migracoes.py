@@ -0,0 +1,284 @@
+import argparse
+import sqlite3
+
+from functions import aproximacao
+from functions import arquivo
+from functions import cabecalho_transacoes
+from functions import metricas_clientes
+from functions import resumo_vendas
+
+# 🧱 Migrações de esquema versionadas
+# A versão do esquema fica gravada no próprio arquivo do banco (PRAGMA user_version).
+# Cada passo da lista MIGRACOES leva o banco da versão N-1 para a versão N e roda
+# dentro de uma transação: ou o passo inteiro é aplicado, ou nada muda.
+#
+# Para atualizar um banco existente no lugar:
+#     python -m functions.migracoes --banco acai.db
+#
+# Para criar um passo novo, escreva uma função que recebe o cursor e adicione-a
+# no FINAL da lista (nunca altere passos que já foram publicados).
+
+#____________________________________________________________________________________________________________________________________________#
+
+# PASSO 1: tabelas do esquema estrela (as mesmas que o setup.py criava na importação)
+
+def _v1_tabelas_base(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS produtos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        preco_unitario REAL NOT NULL,
+        categoria_id INTEGER NOT NULL,
+        FOREIGN KEY (categoria_id) REFERENCES categorias(id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS vendas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        produto_id INTEGER NOT NULL,
+        quantidade INTEGER NOT NULL,
+        preco_unitario_venda REAL NOT NULL,
+        valor_total_item REAL NOT NULL,
+        data_venda TEXT NOT NULL,         -- Formato 'YYYY-MM-DD HH:MM:SS'
+        cliente_id INTEGER NOT NULL,
+        formas_pagamento_id INTEGER NOT NULL,
+        transacao_id INTEGER,
+        FOREIGN KEY (produto_id) REFERENCES produtos(id),
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+        FOREIGN KEY (formas_pagamento_id) REFERENCES formas_pagamento(id),
+        -- Mesma restrição do acai.db distribuído, para evitar duplicatas:
+        UNIQUE (data_venda, cliente_id, produto_id, quantidade, preco_unitario_venda)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS categorias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome_categoria TEXT NOT NULL
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS clientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS formas_pagamento (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        descricao TEXT NOT NULL
+    )
+    ''')
+
+
+# PASSO 2: resumo de vendas por dia/hora + gatilho de manutenção
+
+def _v2_resumo_vendas(cursor):
+    cursor.execute(resumo_vendas.DDL_RESUMO_VENDAS)
+    cursor.execute(resumo_vendas.DDL_INDICE_TRANSACAO)
+    cursor.execute(resumo_vendas.DDL_GATILHO_RESUMO)
+    # Preenche o resumo com o histórico que já existir no banco
+    cursor.execute(resumo_vendas.SQL_LIMPAR_RESUMO)
+    cursor.execute(resumo_vendas.SQL_RECONSTRUIR_RESUMO.format(tabela="vendas"))
+
+
+# PASSO 3: índices secundários (cobrindo) para as consultas do dashboard
+
+def _v3_indices_secundarios(cursor):
+    # get_top_produtos / get_vendas_por_produto / get_top_categorias:
+    # junta por produto_id e soma valor_total_item sem tocar na tabela.
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vendas_produto
+    ON vendas (produto_id, valor_total_item)
+    ''')
+    # get_top_categorias: produtos -> categorias
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_produtos_categoria
+    ON produtos (categoria_id)
+    ''')
+    # get_analise_formas_pagamento / get_frequencia_forma_pagamento / get_vendas_por_forma_pagamento
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vendas_pagamento
+    ON vendas (formas_pagamento_id, transacao_id, valor_total_item)
+    ''')
+    # get_top_clientes / get_novos_clientes_por_mes / get_distribuicao_frequencia
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vendas_cliente
+    ON vendas (cliente_id, transacao_id, data_venda, valor_total_item)
+    ''')
+    # Filtros por período (data_venda >= ? AND data_venda < ?)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vendas_data
+    ON vendas (data_venda)
+    ''')
+    # Atualiza as estatísticas para o planejador escolher os índices novos
+    cursor.execute("ANALYZE;")
+
+
+# PASSO 4: colunas temporais pré-calculadas (inteiros) em 'vendas', com índices
+# São colunas GERADAS virtuais: não ocupam espaço na tabela nem precisam de gatilho ou
+# backfill, e os índices guardam o valor já calculado. Assim, agrupar por mês vira uma
+# varredura só do índice, sem strftime() em cada linha. Hora e dia da semana não têm índice
+# em 'vendas': as consultas por eles leem o resumo por dia/hora (passo 2).
+
+COLUNAS_TEMPORAIS = [
+    ("epoch", "CAST(strftime('%s', data_venda) AS INTEGER)"),        # segundos desde 1970
+    ("dia", "CAST(strftime('%Y%m%d', data_venda) AS INTEGER)"),      # ex.: 20240512
+    ("hora", "CAST(strftime('%H', data_venda) AS INTEGER)"),         # 0 a 23
+    ("dia_semana", "CAST(strftime('%w', data_venda) AS INTEGER)"),   # 0=Domingo ... 6=Sábado
+    ("ano_mes", "CAST(strftime('%Y%m', data_venda) AS INTEGER)"),    # ex.: 202405
+]
+
+
+def _v4_colunas_temporais(cursor):
+    colunas = {linha[1] for linha in cursor.execute("PRAGMA table_xinfo(vendas);")}
+    for nome, expressao in COLUNAS_TEMPORAIS:
+        if nome not in colunas:
+            cursor.execute(f"ALTER TABLE vendas ADD COLUMN {nome} INTEGER GENERATED ALWAYS AS ({expressao}) VIRTUAL;")
+
+    # get_evolucao_receita_mensal
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_ano_mes ON vendas (ano_mes, valor_total_item);")
+    # get_novos_clientes_por_mes: MIN(dia) por cliente lido só do índice
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_cliente_dia ON vendas (cliente_id, dia);")
+
+    # O resumo por dia/hora também ganha o dia da semana como inteiro
+    colunas_resumo = {linha[1] for linha in cursor.execute("PRAGMA table_xinfo(vendas_resumo_hora);")}
+    if "dia_semana" not in colunas_resumo:
+        cursor.execute(
+            "ALTER TABLE vendas_resumo_hora ADD COLUMN dia_semana INTEGER "
+            "GENERATED ALWAYS AS (CAST(strftime('%w', dia) AS INTEGER)) VIRTUAL;"
+        )
+    cursor.execute("ANALYZE;")
+
+
+# PASSO 5: métricas materializadas por cliente + gatilho de manutenção
+
+def _v5_metricas_clientes(cursor):
+    cursor.execute(metricas_clientes.DDL_METRICAS_CLIENTES)
+    cursor.execute(metricas_clientes.DDL_INDICE_PRIMEIRA_COMPRA)
+    cursor.execute(metricas_clientes.DDL_INDICE_TOTAL_GASTO)
+    cursor.execute(metricas_clientes.DDL_GATILHO_METRICAS)
+    # Preenche as métricas com o histórico que já existir no banco
+    cursor.execute(metricas_clientes.SQL_LIMPAR_METRICAS)
+    cursor.execute(metricas_clientes.SQL_RECONSTRUIR_METRICAS.format(filtro=""))
+    cursor.execute("ANALYZE clientes_metricas;")
+
+
+# PASSO 6: cabeçalho das transações + gatilho de manutenção
+
+def _v6_cabecalho_transacoes(cursor):
+    cursor.execute(cabecalho_transacoes.DDL_TRANSACOES)
+    cursor.execute(cabecalho_transacoes.DDL_INDICE_DATA)
+    cursor.execute(cabecalho_transacoes.DDL_INDICE_FORMA)
+    cursor.execute(cabecalho_transacoes.DDL_GATILHO_TRANSACOES)
+    # Preenche os cabeçalhos com o histórico que já existir no banco
+    cursor.execute(cabecalho_transacoes.SQL_LIMPAR_TRANSACOES)
+    cursor.execute(cabecalho_transacoes.SQL_RECONSTRUIR_TRANSACOES.format(tabela="vendas", filtro=""))
+    cursor.execute("ANALYZE transacoes;")
+
+
+# PASSO 7: catálogo do arquivo histórico em Parquet + métricas de clientes já arquivadas
+
+def _v7_arquivo_historico(cursor):
+    cursor.execute(arquivo.DDL_PARTICOES)
+    cursor.execute(metricas_clientes.DDL_METRICAS_ARQUIVADAS)
+
+
+# PASSO 8: esboços HyperLogLog dos clientes por dia + amostra das vendas (modo aproximado)
+
+def _v8_modo_aproximado(cursor):
+    cursor.execute(aproximacao.DDL_ESBOCOS_CLIENTES)
+    cursor.execute(aproximacao.DDL_AMOSTRA)
+    cursor.execute(aproximacao.DDL_AMOSTRA_ESTADO)
+    cursor.execute(aproximacao.SQL_INICIAR_AMOSTRA)
+    cursor.execute(aproximacao.DDL_GATILHO_ESBOCOS)
+    cursor.execute(aproximacao.DDL_GATILHO_AMOSTRA)
+    # Preenche com o histórico que já existir (inclusive os meses arquivados)
+    aproximacao.preencher_historico(cursor)
+
+
+# PASSO 9: sem os índices de hora e dia da semana em 'vendas'
+# As versões antigas do passo 4 os criavam, mas essas consultas leem o resumo por dia/hora:
+# eles só deixavam cada venda gravada mais cara.
+
+def _v9_sem_indices_hora(cursor):
+    cursor.execute("DROP INDEX IF EXISTS idx_vendas_hora;")
+    cursor.execute("DROP INDEX IF EXISTS idx_vendas_dia_semana;")
+
+
+# Lista ordenada de passos: (versão, descrição, função)
+MIGRACOES = [
+    (1, "Tabelas base do esquema estrela", _v1_tabelas_base),
+    (2, "Resumo de vendas por dia/hora", _v2_resumo_vendas),
+    (3, "Índices secundários das consultas do dashboard", _v3_indices_secundarios),
+    (4, "Colunas temporais inteiras (epoch, dia, hora, dia_semana, ano_mes)", _v4_colunas_temporais),
+    (5, "Métricas materializadas por cliente", _v5_metricas_clientes),
+    (6, "Cabeçalho das transações", _v6_cabecalho_transacoes),
+    (7, "Catálogo do arquivo histórico (Parquet)", _v7_arquivo_historico),
+    (8, "Esboços de clientes por dia e amostra das vendas (modo aproximado)", _v8_modo_aproximado),
+    (9, "Índices de hora e dia da semana em 'vendas' removidos (consultas usam o resumo)", _v9_sem_indices_hora),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+#____________________________________________________________________________________________________________________________________________#
+
+def versao_esquema(conn):
+    """Retorna a versão do esquema gravada no banco (0 para bancos nunca migrados)."""
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def aplicar_migracoes(conn, verbose=False):
+    """
+    Aplica, em ordem, todos os passos com versão maior que a do banco.
+    Cada passo roda em sua própria transação junto com a atualização do user_version.
+    Retorna a lista de versões aplicadas.
+    """
+    aplicadas = []
+    versao = versao_esquema(conn)
+    if versao > VERSAO_ATUAL:
+        raise RuntimeError(
+            f"O banco está na versão {versao}, mais nova que a suportada por este código ({VERSAO_ATUAL})."
+        )
+
+    for numero, descricao, passo in MIGRACOES:
+        if numero <= versao:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN;")
+            passo(cursor)
+            # PRAGMA não aceita parâmetros '?', mas 'numero' vem da lista acima (inteiro)
+            cursor.execute(f"PRAGMA user_version = {int(numero)};")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(numero)
+        if verbose:
+            print(f"Migração {numero} aplicada: {descricao}")
+    return aplicadas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atualiza o esquema de um banco do dashboard no lugar.")
+    parser.add_argument("--banco", default="acai.db", help="Caminho do arquivo SQLite (padrão: acai.db)")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.banco)
+    try:
+        antes = versao_esquema(conn)
+        aplicadas = aplicar_migracoes(conn, verbose=True)
+        if aplicadas:
+            print(f"{args.banco}: versão {antes} -> {versao_esquema(conn)}")
+        else:
+            print(f"{args.banco}: já está na versão {antes}, nada a fazer.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+import functools
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from functions import arquivo
+from functions import quadros
+from functions import series
+from functions.cache import token_dados
+
+# 🧮 Motor colunar em memória (opcional)
+# Todas as agregações do dashboard são GROUP BYs diferentes sobre as mesmas colunas de
+# 'vendas'. Em vez de relê-las do SQLite a cada consulta, este motor carrega 'vendas' UMA
+# vez em arrays NumPy tipados e responde às funções do setup.py com agrupamentos
+# vetorizados (np.bincount / np.sort), devolvendo os mesmos DataFrames.
+#
+#   - ids das dimensões em int32, valores em float64, data/hora em int64 (segundos desde 1970);
+#   - a cada consulta, só as linhas com id acima da "marca d'água" (maior id já carregado)
+#     são lidas do banco e anexadas aos arrays;
+#   - as dimensões (produtos, categorias, clientes, formas de pagamento) também são
+#     anexadas por id. Renomeações e exclusões não são vistas: depois delas, chame recarregar();
+#   - os meses movidos para o arquivo em Parquet (functions/arquivo.py) entram na primeira carga.
+#
+# Uso (veja setup.usar_motor_colunar):
+#     setup.usar_motor_colunar()        # liga o motor para todas as funções get_*/calcular_*
+#     setup.usar_motor_colunar(False)   # volta para as consultas SQL
+
+SEGUNDOS_DIA = 86_400
+LINHAS_POR_BLOCO = 100_000
+
+# main.vendas: a VIEW TEMP 'vendas' das consultas híbridas (functions/arquivo.py) já traria
+# as linhas arquivadas, que entram aqui pelo blocos_arquivados()
+
+SQL_VENDAS = """
+SELECT id, produto_id, cliente_id, formas_pagamento_id, transacao_id, quantidade, valor_total_item, epoch
+FROM main.vendas WHERE id > ? ORDER BY id;
+"""
+
+# (tabela, coluna do nome, coluna extra)
+DIMENSOES = {
+    "produtos": ("nome", "categoria_id"),
+    "categorias": ("nome_categoria", None),
+    "clientes": ("nome", None),
+    "formas_pagamento": ("descricao", None),
+}
+
+NOMES_DIAS_SEMANA = ["Domingo", "Segunda-feira", "Terça-feira", "Quarta-feira", "Quinta-feira",
+                     "Sexta-feira", "Sábado"]
+
+
+class Dimensao:
+    """Nomes de uma tabela de dimensão indexados pelo id (posições sem cadastro ficam None)."""
+
+    def __init__(self, nomes=None, extra=None):
+        self.nomes = nomes if nomes is not None else np.empty(0, dtype=object)
+        self.extra = extra if extra is not None else np.empty(0, dtype=np.int32)
+
+    @property
+    def ultimo_id(self):
+        return len(self.nomes) - 1
+
+    def anexar(self, ids, nomes, extra=None):
+        """Retorna uma nova Dimensao com os cadastros (ids maiores que ultimo_id) incluídos."""
+        tamanho = max(len(self.nomes), int(ids.max()) + 1)
+        novos_nomes = np.full(tamanho, None, dtype=object)
+        novos_nomes[:len(self.nomes)] = self.nomes
+        novos_nomes[ids] = nomes
+        novo_extra = np.full(tamanho, -1, dtype=np.int32)
+        novo_extra[:len(self.extra)] = self.extra
+        if extra is not None:
+            novo_extra[ids] = extra
+        return Dimensao(novos_nomes, novo_extra)
+
+    def nomes_ate(self, tamanho):
+        """Nomes para os ids 0..tamanho-1 (ids além do último cadastro viram None)."""
+        if tamanho <= len(self.nomes):
+            return self.nomes[:tamanho]
+        return np.concatenate([self.nomes, np.full(tamanho - len(self.nomes), None, dtype=object)])
+
+
+class _Colunas:
+    """Foto imutável dos arrays de 'vendas': quem consulta nunca vê um anexo pela metade."""
+
+    CAMPOS = {
+        "id": np.int64,
+        "produto_id": np.int32,
+        "cliente_id": np.int32,
+        "formas_pagamento_id": np.int32,
+        "transacao_id": np.int64,   # -1 = sem transação (NULL)
+        "quantidade": np.int64,
+        "valor_total_item": np.float64,
+        "epoch": np.int64,
+    }
+
+    def __init__(self, arrays=None):
+        self.arrays = arrays or {campo: np.empty(0, dtype=tipo) for campo, tipo in self.CAMPOS.items()}
+        epoch = self.arrays["epoch"]
+        # Colunas derivadas, calculadas uma vez por foto (1970-01-01 foi uma quinta-feira: %w = 4)
+        self.dia = epoch // SEGUNDOS_DIA
+        self.hora = (epoch % SEGUNDOS_DIA) // 3600
+        self.dia_semana = (self.dia + 4) % 7
+        self._cabecalhos = None
+
+    def __getattr__(self, campo):
+        try:
+            return self.__dict__["arrays"][campo]
+        except KeyError:
+            raise AttributeError(campo) from None
+
+    def __len__(self):
+        return len(self.arrays["id"])
+
+    @property
+    def ultimo_id(self):
+        return int(self.arrays["id"][-1]) if len(self) else 0
+
+    def anexar(self, blocos):
+        """Retorna uma nova foto com as linhas dos DataFrames 'blocos' (resultado de SQL_VENDAS) no final."""
+        partes = {campo: [self.arrays[campo]] for campo in self.CAMPOS}
+        for df in blocos:
+            df["transacao_id"] = df["transacao_id"].fillna(-1)
+            for campo, tipo in self.CAMPOS.items():
+                partes[campo].append(df[campo].to_numpy(dtype=tipo))
+        return _Colunas({campo: np.concatenate(arrays) for campo, arrays in partes.items()})
+
+    def cabecalhos(self):
+        """
+        Os mesmos cabeçalhos da tabela 'transacoes' (functions/cabecalho_transacoes.py): uma
+        linha por transação e forma de pagamento, com total, dia de início e 'principal'.
+        Calculados na primeira vez que alguém pede, uma vez por foto.
+        """
+        if self._cabecalhos is not None:
+            return self._cabecalhos
+        com_transacao = np.flatnonzero(self.transacao_id >= 0)
+        if not len(com_transacao):
+            self._cabecalhos = {"formas_pagamento_id": self.formas_pagamento_id[:0], "dia": self.dia[:0],
+                                "total": self.valor_total_item[:0], "principal": np.zeros(0, dtype=np.int64)}
+            return self._cabecalhos
+        # Ordena as linhas por (transação, forma de pagamento); a ordenação estável mantém cada
+        # grupo em ordem de id, então a primeira linha do grupo é a de menor id
+        base = int(self.formas_pagamento_id[com_transacao].max()) + 1
+        chaves = self.transacao_id[com_transacao] * base + self.formas_pagamento_id[com_transacao]
+        ordem_chaves = np.argsort(chaves, kind="stable")
+        ordem, chaves = com_transacao[ordem_chaves], chaves[ordem_chaves]
+        inicios = np.flatnonzero(np.concatenate(([True], chaves[1:] != chaves[:-1])))
+        primeira_linha = ordem[inicios]
+        transacoes = self.transacao_id[primeira_linha]
+        # Principal: o grupo que tem a primeira linha da transação
+        por_transacao = np.lexsort((primeira_linha, transacoes))
+        transacoes = transacoes[por_transacao]
+        principal = np.zeros(len(inicios), dtype=np.int64)
+        principal[por_transacao[np.concatenate(([True], transacoes[1:] != transacoes[:-1]))]] = 1
+        self._cabecalhos = {
+            "formas_pagamento_id": self.formas_pagamento_id[primeira_linha],
+            "dia": np.minimum.reduceat(self.epoch[ordem], inicios) // SEGUNDOS_DIA,
+            "total": np.add.reduceat(self.valor_total_item[ordem], inicios),
+            "principal": principal,
+        }
+        return self._cabecalhos
+
+
+def _dia_epoch(valor):
+    """'YYYY-MM-DD' / date -> dias desde 1970-01-01."""
+    from functions.setup import _texto_data
+    return (date.fromisoformat(_texto_data(valor)) - date(1970, 1, 1)).days
+
+
+def datas_dias(dias):
+    """Array de dias desde 1970 -> array datetime64 (a coluna 'Dia' das consultas SQL)."""
+    return dias.astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def _distintos(valores):
+    """Valores distintos, ordenados. Ordenar e comparar vizinhos é bem mais rápido que o np.unique por hash."""
+    if not len(valores):
+        return valores
+    ordenados = np.sort(valores)
+    return ordenados[np.concatenate(([True], ordenados[1:] != ordenados[:-1]))]
+
+
+def _ordenar_desc(df, coluna):
+    """ORDER BY coluna DESC, nome ASC (as linhas já chegam ordenadas pelo nome)."""
+    return df.sort_values(coluna, ascending=False, kind="stable").reset_index(drop=True)
+
+
+def somar_por_nome(chaves, pesos, dimensao, coluna_nome, coluna_total):
+    """SUM(pesos) ... JOIN dimensao GROUP BY nome ORDER BY total DESC (também usada pelo modo ao vivo)."""
+    validas = chaves >= 0
+    chaves, pesos = chaves[validas], pesos[validas]
+    tamanho = max(len(dimensao.nomes), int(chaves.max()) + 1 if len(chaves) else 0)
+    somas = np.bincount(chaves, weights=pesos, minlength=tamanho)
+    linhas = np.bincount(chaves, minlength=tamanho)
+    nomes = dimensao.nomes_ate(tamanho)
+    com_nome = (linhas > 0) & (nomes != None)  # noqa: E711 (comparação elemento a elemento)
+    serie = pd.Series(somas[com_nome]).groupby(nomes[com_nome], sort=True).sum()
+    df = pd.DataFrame({coluna_nome: serie.index.astype(object), coluna_total: serie.to_numpy()})
+    return _ordenar_desc(df, coluna_total)
+
+
+def anexar_dimensoes(conn, dimensoes):
+    """Retorna uma cópia de 'dimensoes' com os cadastros novos (id acima do último carregado) incluídos."""
+    dimensoes = dict(dimensoes)
+    for tabela, (coluna_nome, coluna_extra) in DIMENSOES.items():
+        colunas = ", ".join(c for c in ("id", coluna_nome, coluna_extra) if c)
+        novos = conn.execute(
+            f"SELECT {colunas} FROM {tabela} WHERE id > ? ORDER BY id;",
+            (dimensoes[tabela].ultimo_id,),
+        ).fetchall()
+        if novos:
+            valores = list(zip(*novos))
+            dimensoes[tabela] = dimensoes[tabela].anexar(
+                np.asarray(valores[0], dtype=np.int64),
+                np.asarray(valores[1], dtype=object),
+                np.asarray(valores[2], dtype=np.int32) if coluna_extra else None,
+            )
+    return dimensoes
+
+
+def blocos_arquivados(conn):
+    """Vendas das partições do arquivo em Parquet (functions/arquivo.py), no formato de SQL_VENDAS."""
+    blocos = []
+    for _, pasta, versao in arquivo.particoes(conn):
+        df = arquivo.ler_linhas(pasta, versao)
+        # Mesma conta da coluna gerada 'epoch' (strftime('%s') trata a data como UTC)
+        df["epoch"] = pd.to_datetime(df["data_venda"]).to_numpy(dtype="datetime64[s]").astype(np.int64)
+        blocos.append(df[list(_Colunas.CAMPOS)])
+    return blocos
+
+
+class MotorColunar:
+    """Cópia colunar de 'vendas' em memória, com as mesmas consultas do setup.py."""
+
+    def __init__(self):
+        self.banco = None
+        self._colunas = _Colunas()
+        self._dimensoes = {tabela: Dimensao() for tabela in DIMENSOES}
+        self._sequencias = None
+        self._lock = threading.Lock()
+
+    # --- CARGA -------------------------------------------------------------------------------
+
+    def recarregar(self):
+        """Descarta os arrays; a próxima consulta carrega o banco inteiro de novo."""
+        with self._lock:
+            self.banco = None
+            self._colunas = _Colunas()
+            self._dimensoes = {tabela: Dimensao() for tabela in DIMENSOES}
+            self._sequencias = None
+
+    def atualizar(self, conn):
+        """Anexa as vendas e cadastros novos (id acima da marca d'água). Retorna as linhas anexadas."""
+        banco, sequencias = token_dados(conn)
+        if banco != self.banco:
+            self.recarregar()
+        if sequencias == self._sequencias:
+            return 0
+        with self._lock:
+            if self.banco is None:
+                self.banco = banco
+            dimensoes = anexar_dimensoes(conn, self._dimensoes)
+            # Lê em blocos: o pico de memória fica num bloco de tuplas Python, e não na tabela toda
+            blocos = [
+                df for df in pd.read_sql_query(SQL_VENDAS, conn, params=(self._colunas.ultimo_id,),
+                                               chunksize=LINHAS_POR_BLOCO)
+                if len(df)
+            ]
+            if not len(self._colunas):
+                # Primeira carga: os meses arquivados também entram (em ordem de id, como no banco)
+                arquivados = blocos_arquivados(conn)
+                if arquivados:
+                    blocos = [pd.concat(arquivados + blocos, ignore_index=True).sort_values("id", kind="stable")]
+            colunas = self._colunas.anexar(blocos) if blocos else self._colunas
+            # Troca as referências de uma vez: consultas em andamento continuam na foto antiga
+            self._dimensoes, self._colunas, self._sequencias = dimensoes, colunas, sequencias
+            return sum(len(df) for df in blocos)
+
+    def _foto(self, inicio=None, fim=None):
+        """Retorna (colunas, máscara do período ou None, dimensões)."""
+        colunas, dimensoes = self._colunas, self._dimensoes
+        mascara = None
+        if inicio is not None:
+            mascara = colunas.dia >= _dia_epoch(inicio)
+        if fim is not None:
+            ate = colunas.dia <= _dia_epoch(fim)
+            mascara = ate if mascara is None else mascara & ate
+        return colunas, mascara, dimensoes
+
+    def _foto_transacoes(self, inicio=None, fim=None):
+        """Retorna (cabeçalhos das transações, máscara do período pelo dia de início ou None, dimensões)."""
+        cabecalhos, dimensoes = self._colunas.cabecalhos(), self._dimensoes
+        mascara = None
+        if inicio is not None:
+            mascara = cabecalhos["dia"] >= _dia_epoch(inicio)
+        if fim is not None:
+            ate = cabecalhos["dia"] <= _dia_epoch(fim)
+            mascara = ate if mascara is None else mascara & ate
+        return cabecalhos, mascara, dimensoes
+
+    @staticmethod
+    def _filtrar(array, mascara):
+        return array if mascara is None else array[mascara]
+
+    @staticmethod
+    def _distintas_por_grupo(grupos, transacoes, tamanho):
+        """COUNT(DISTINCT transacao) de cada grupo 0..tamanho-1, com uma única ordenação de chaves (grupo, transação)."""
+        if not len(grupos):
+            return np.zeros(tamanho, dtype=np.int64)
+        base = int(transacoes.max()) + 1
+        pares = _distintos(grupos.astype(np.int64) * base + transacoes)
+        return np.bincount(pares // base, minlength=tamanho)
+
+    @staticmethod
+    def _transacoes_por_nome(ids, totais, dimensao):
+        """Por nome, sobre os cabeçalhos das transações: (SUM(total), COUNT(*))."""
+        nomes = dimensao.nomes_ate(max(len(dimensao.nomes), int(ids.max()) + 1 if len(ids) else 0))
+        # Código do nome de cada id (-1 sem cadastro): ids diferentes com o mesmo nome se juntam
+        codigo_por_id, nomes_unicos = pd.factorize(nomes, sort=True)
+        codigos = codigo_por_id[ids]
+        validas = codigos >= 0
+        codigos, totais = codigos[validas], totais[validas]
+        somas = np.bincount(codigos, weights=totais, minlength=len(nomes_unicos)).astype(np.float64)
+        contagens = np.bincount(codigos, minlength=len(nomes_unicos))
+        com_venda = contagens > 0
+        return np.asarray(nomes_unicos, dtype=object)[com_venda], somas[com_venda], contagens[com_venda]
+
+    # --- CONSULTAS (mesmos nomes e retornos das funções do setup.py) --------------------------
+
+    def calcular_valor_total_vendas(self, inicio=None, fim=None):
+        colunas, mascara, _ = self._foto(inicio, fim)
+        valores = self._filtrar(colunas.valor_total_item, mascara)
+        return float(valores.sum()) if len(valores) else 0
+
+    def calcular_quantidade_vendas(self, inicio=None, fim=None):
+        colunas, mascara, _ = self._foto(inicio, fim)
+        return int(self._filtrar(colunas.quantidade, mascara).sum())
+
+    def calcular_ticket_medio(self, inicio=None, fim=None):
+        cabecalhos, mascara, _ = self._foto_transacoes(inicio, fim)
+        transacoes = int(self._filtrar(cabecalhos["principal"], mascara).sum())
+        if not transacoes:
+            return 0
+        return float(self._filtrar(cabecalhos["total"], mascara).sum()) / transacoes
+
+    def total_clientes(self, inicio=None, fim=None):
+        colunas, mascara, dimensoes = self._foto(inicio, fim)
+        if inicio is None and fim is None:
+            return int(np.count_nonzero(dimensoes["clientes"].nomes != None))  # noqa: E711
+        return len(_distintos(self._filtrar(colunas.cliente_id, mascara)))
+
+    def get_top_clientes(self, limite=10, inicio=None, fim=None):
+        colunas, mascara, dimensoes = self._foto(inicio, fim)
+        clientes = self._filtrar(colunas.cliente_id, mascara)
+        valores = self._filtrar(colunas.valor_total_item, mascara)
+        tamanho = max(len(dimensoes["clientes"].nomes), int(clientes.max()) + 1 if len(clientes) else 0)
+        somas = np.bincount(clientes, weights=valores, minlength=tamanho)
+        linhas = np.bincount(clientes, minlength=tamanho)
+        nomes = dimensoes["clientes"].nomes_ate(tamanho)
+        ids = np.flatnonzero((linhas > 0) & (nomes != None))  # noqa: E711
+        # ORDER BY total DESC, c.id ASC
+        ordem = ids[np.argsort(-somas[ids], kind="stable")]
+        if limite is not None and limite >= 0:
+            ordem = ordem[:limite]
+        return pd.DataFrame({"Cliente": nomes[ordem], "Total Gasto": somas[ordem]})
+
+    def get_top_produtos(self, limite=None, inicio=None, fim=None):
+        df = self.get_vendas_por_produto(inicio, fim)
+        return df if limite is None else df.head(limite)
+
+    def get_top_categorias(self, limite=None, inicio=None, fim=None):
+        colunas, mascara, dimensoes = self._foto(inicio, fim)
+        produtos = dimensoes["produtos"]
+        produto_ids = self._filtrar(colunas.produto_id, mascara)
+        # Categoria de cada venda (-1 quando o produto não existe: o JOIN descartaria a linha)
+        tamanho = max(len(produtos.extra), int(produto_ids.max()) + 1 if len(produto_ids) else 0)
+        categoria_do_produto = np.full(tamanho, -1, dtype=np.int32)
+        categoria_do_produto[:len(produtos.extra)] = np.where(produtos.nomes != None, produtos.extra, -1)  # noqa: E711
+        df = somar_por_nome(
+            categoria_do_produto[produto_ids], self._filtrar(colunas.valor_total_item, mascara),
+            dimensoes["categorias"], "Categoria", "Total Vendido",
+        )
+        return df if limite is None else df.head(limite)
+
+    def get_vendas_por_produto(self, inicio=None, fim=None):
+        colunas, mascara, dimensoes = self._foto(inicio, fim)
+        return somar_por_nome(
+            self._filtrar(colunas.produto_id, mascara), self._filtrar(colunas.valor_total_item, mascara),
+            dimensoes["produtos"], "Produto", "Total Vendido",
+        )
+
+    def get_vendas_por_forma_pagamento(self, inicio=None, fim=None):
+        colunas, mascara, dimensoes = self._foto(inicio, fim)
+        return somar_por_nome(
+            self._filtrar(colunas.formas_pagamento_id, mascara), self._filtrar(colunas.valor_total_item, mascara),
+            dimensoes["formas_pagamento"], "Forma de Pagamento", "Total Vendido",
+        )
+
+    def get_analise_formas_pagamento(self, inicio=None, fim=None):
+        cabecalhos, mascara, dimensoes = self._foto_transacoes(inicio, fim)
+        nomes, somas, transacoes = self._transacoes_por_nome(
+            self._filtrar(cabecalhos["formas_pagamento_id"], mascara), self._filtrar(cabecalhos["total"], mascara),
+            dimensoes["formas_pagamento"],
+        )
+        df = pd.DataFrame({
+            "Forma de Pagamento": nomes,
+            "Valor Total": somas,
+            "Qtd. Transações": transacoes,
+            "Ticket Médio": somas / transacoes,
+        })
+        return _ordenar_desc(df, "Valor Total")
+
+    def get_frequencia_forma_pagamento(self, inicio=None, fim=None):
+        cabecalhos, mascara, dimensoes = self._foto_transacoes(inicio, fim)
+        nomes, _, transacoes = self._transacoes_por_nome(
+            self._filtrar(cabecalhos["formas_pagamento_id"], mascara), self._filtrar(cabecalhos["total"], mascara),
+            dimensoes["formas_pagamento"],
+        )
+        return _ordenar_desc(pd.DataFrame({"Forma de Pagamento": nomes, "Qtd. Transações": transacoes}),
+                             "Qtd. Transações")
+
+    def _receita_por_dia(self, inicio=None, fim=None):
+        """(dias desde 1970 com vendas, receita de cada dia), em ordem crescente de dia."""
+        colunas, mascara, _ = self._foto(inicio, fim)
+        dias = self._filtrar(colunas.dia, mascara)
+        if not len(dias):
+            return dias, np.empty(0)
+        primeiro = dias.min()
+        somas = np.bincount(dias - primeiro, weights=self._filtrar(colunas.valor_total_item, mascara))
+        linhas = np.bincount(dias - primeiro)
+        com_venda = np.flatnonzero(linhas)
+        return com_venda + primeiro, somas[com_venda]
+
+    def get_evolucao_vendas_diaria(self, inicio=None, fim=None):
+        dias, somas = self._receita_por_dia(inicio, fim)
+        return pd.DataFrame({"Dia": datas_dias(dias), "Total Vendido": somas})
+
+    def obter_dados_vendas(self, inicio=None, fim=None, pontos=None, lttb=False):
+        df = self.get_evolucao_vendas_diaria(inicio, fim)
+        return series.reduzir_serie(df, pontos, lttb, inicio, fim)
+
+    def _somar_por_posicao(self, chaves, tamanho, inicio=None, fim=None):
+        colunas, mascara, _ = self._foto(inicio, fim)
+        chaves = self._filtrar(chaves(colunas), mascara)
+        somas = np.bincount(chaves, weights=self._filtrar(colunas.valor_total_item, mascara), minlength=tamanho)
+        linhas = np.bincount(chaves, minlength=tamanho)
+        posicoes = np.flatnonzero(linhas)
+        return posicoes, somas[posicoes]
+
+    def get_vendas_por_hora_do_dia(self, inicio=None, fim=None):
+        horas, somas = self._somar_por_posicao(lambda c: c.hora, 24, inicio, fim)
+        return pd.DataFrame({"Hora": [f"{hora:02d}h" for hora in horas], "Total Vendido": somas})
+
+    def get_vendas_por_dia_da_semana(self, inicio=None, fim=None):
+        dias, somas = self._somar_por_posicao(lambda c: c.dia_semana, 7, inicio, fim)
+        return pd.DataFrame({"Dia da Semana": [NOMES_DIAS_SEMANA[d] for d in dias], "Total Vendido": somas})
+
+    def get_evolucao_receita_mensal(self, fim=None):
+        referencia = date.fromisoformat(str(fim)[:10]) if fim is not None else date.today()
+        inicio_mes = referencia.replace(day=1)
+        inicio_mes_anterior = (inicio_mes - timedelta(days=1)).replace(day=1)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        receita_atual = self.calcular_valor_total_vendas(inicio_mes, proximo_mes - timedelta(days=1))
+        receita_anterior = self.calcular_valor_total_vendas(inicio_mes_anterior, inicio_mes - timedelta(days=1))
+        variacao_perc = ((receita_atual - receita_anterior) / receita_anterior) * 100 if receita_anterior > 0 else float('inf')
+        return receita_atual, variacao_perc
+
+    def get_novos_clientes_por_mes(self, inicio=None, fim=None):
+        colunas, _, _ = self._foto()
+        clientes = colunas.cliente_id
+        # Primeiro dia de compra de cada cliente (em todo o histórico)
+        primeira = np.full(int(clientes.max()) + 1 if len(clientes) else 0, np.iinfo(np.int64).max)
+        np.minimum.at(primeira, clientes, colunas.dia)
+        primeira = primeira[primeira != np.iinfo(np.int64).max]
+        if inicio is not None:
+            primeira = primeira[primeira >= _dia_epoch(inicio)]
+        if fim is not None:
+            primeira = primeira[primeira <= _dia_epoch(fim)]
+        meses, contagem = np.unique(primeira.astype("datetime64[D]").astype("datetime64[M]"), return_counts=True)
+        df = pd.DataFrame({"Mês": meses.astype("datetime64[D]").astype(str), "Novos Clientes": contagem})
+        df["Mês"] = pd.to_datetime(df["Mês"])
+        return df
+
+    def _compras_por_cliente(self, inicio=None, fim=None):
+        """COUNT(DISTINCT transacao_id) de cada cliente com compra (linhas com transação)."""
+        colunas, mascara, _ = self._foto(inicio, fim)
+        clientes = self._filtrar(colunas.cliente_id, mascara)
+        transacoes = self._filtrar(colunas.transacao_id, mascara)
+        com_transacao = transacoes >= 0
+        clientes, transacoes = clientes[com_transacao], transacoes[com_transacao]
+        compras = self._distintas_por_grupo(clientes, transacoes, int(clientes.max()) + 1 if len(clientes) else 0)
+        return compras[compras > 0]
+
+    def get_distribuicao_frequencia(self, inicio=None, fim=None):
+        compras = self._compras_por_cliente(inicio, fim)
+        grupos = np.select(
+            [compras == 1, compras == 2, (compras >= 3) & (compras <= 5)],
+            ["1 Compra", "2 Compras", "3-5 Compras"],
+            default="6+ Compras",
+        )
+        rotulos, contagem = np.unique(grupos, return_counts=True)
+        return pd.DataFrame({"Grupo de Frequência": rotulos.astype(object), "Número de Clientes": contagem})
+
+    def calcular_receita_media_por_cliente(self, inicio=None, fim=None):
+        colunas, mascara, _ = self._foto(inicio, fim)
+        clientes = len(_distintos(self._filtrar(colunas.cliente_id, mascara)))
+        if not clientes:
+            return 0
+        return float(self._filtrar(colunas.valor_total_item, mascara).sum()) / clientes
+
+    def get_kpi_snapshot(self, inicio=None, fim=None):
+        from functions.setup import KpiSnapshot, _campeao
+        colunas, mascara, _ = self._foto(inicio, fim)
+
+        def _totais(df, coluna_nome, coluna_total="Total Vendido"):
+            return dict(zip(df[coluna_nome], df[coluna_total]))
+
+        if inicio is None and fim is None:
+            num_clientes = self.total_clientes()
+        else:
+            num_clientes = len(_distintos(self._filtrar(colunas.cliente_id, mascara)))
+        valores = self._filtrar(colunas.valor_total_item, mascara)
+        return KpiSnapshot(
+            receita_total=float(valores.sum()) if len(valores) else 0,
+            quantidade_vendas=int(self._filtrar(colunas.quantidade, mascara).sum()),
+            ticket_medio=self.calcular_ticket_medio(inicio, fim),
+            total_clientes=num_clientes,
+            produto_campeao=_campeao(_totais(self.get_vendas_por_produto(inicio, fim), "Produto")),
+            categoria_campea=_campeao(_totais(self.get_top_categorias(None, inicio, fim), "Categoria")),
+            pagamento_preferido=_campeao(_totais(self.get_vendas_por_forma_pagamento(inicio, fim), "Forma de Pagamento")),
+            dia_pico=_campeao(_totais(self.get_vendas_por_dia_da_semana(inicio, fim), "Dia da Semana")),
+            hora_pico=_campeao(_totais(self.get_vendas_por_hora_do_dia(inicio, fim), "Hora")),
+        )
+
+
+# --- SELEÇÃO DO BACKEND ----------------------------------------------------------------------
+
+_motor = None
+
+
+def ativar(motor=None):
+    """Passa a responder as funções decoradas com @com_motor pelo motor colunar. Retorna o motor."""
+    global _motor
+    _motor = motor or MotorColunar()
+    return _motor
+
+
+def desativar():
+    """Volta a responder as funções decoradas com @com_motor pelas consultas SQL."""
+    global _motor
+    _motor = None
+
+
+def motor_ativo():
+    return _motor
+
+
+def com_motor(func):
+    """
+    Decorador para as funções de consulta do setup.py: com o motor ativo, atualiza os arrays
+    (só as linhas novas) e delega ao método de mesmo nome do MotorColunar. DataFrames saem
+    nos mesmos tipos compactos das consultas SQL (functions/quadros.py).
+    """
+    @functools.wraps(func)
+    def wrapper(conn_ou_cursor, *args, **kwargs):
+        motor = _motor
+        if motor is None:
+            return func(conn_ou_cursor, *args, **kwargs)
+        motor.atualizar(getattr(conn_ou_cursor, "connection", conn_ou_cursor))
+        resultado = getattr(motor, func.__name__)(*args, **kwargs)
+        return quadros.compactar(resultado) if isinstance(resultado, pd.DataFrame) else resultado
+
+    return wrapper
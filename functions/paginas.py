@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+
+from functions import carregador
+from functions import series
+from functions import setup
+
+# 📑 Consultas de cada página do dashboard
+# Cada página pede os seus dados com um dicionário {nome: carregador.chamada(...)}. Eles ficam
+# aqui, e não dentro do dashboard.py, para que o trabalhador de snapshots
+# (functions/snapshots.py) pré-calcule exatamente as mesmas chamadas que as páginas vão pedir.
+
+PERIODOS = {
+    "Todo o período": None,
+    "Últimos 7 dias": 7,
+    "Últimos 30 dias": 30,
+    "Últimos 90 dias": 90,
+    "Últimos 365 dias": 365,
+    "Personalizado": "personalizado",
+}
+
+# Quantos produtos/categorias aparecem no gráfico da página (a lista completa só sob demanda)
+TOP_GRAFICO = 3
+
+
+def periodo_predefinido(dias, hoje=None):
+    """{'inicio', 'fim'} dos últimos 'dias' dias até hoje (dias=None: todo o período)."""
+    if dias is None:
+        return {"inicio": None, "fim": None}
+    hoje = hoje or date.today()
+    return {"inicio": hoje - timedelta(days=dias - 1), "fim": hoje}
+
+
+def _visao_geral(periodo, modo_aproximado, picos):
+    # Um único snapshot com todos os números dos cards (uma varredura de 'vendas')
+    return {"kpis": carregador.chamada(setup.get_kpi_snapshot, **periodo)}
+
+
+def _analise_vendas(periodo, modo_aproximado, picos):
+    return {
+        "kpis": carregador.chamada(setup.get_kpi_snapshot, **periodo),
+        "dia_semana": carregador.chamada(setup.get_vendas_por_dia_da_semana, **periodo),
+        "pico_horarios": carregador.chamada(setup.get_vendas_por_hora_do_dia, **periodo),
+        # No máximo ~PONTOS_PADRAO pontos no gráfico, qualquer que seja o tamanho do histórico
+        "evolucao": carregador.chamada(
+            setup.obter_dados_vendas, pontos=series.PONTOS_PADRAO, lttb=picos, **periodo
+        ),
+    }
+
+
+def _rankings(modo_aproximado):
+    """Funções dos rankings de produtos e de categorias (estimados pela amostra no modo aproximado)."""
+    if modo_aproximado:
+        return setup.get_top_produtos_aproximado, setup.get_top_categorias_aproximado
+    return setup.get_top_produtos, setup.get_top_categorias
+
+
+def _produtos_categorias(periodo, modo_aproximado, picos):
+    # Só o topo: destaques e gráficos. As listas completas vêm página a página (pagina_lista())
+    produtos, categorias = _rankings(modo_aproximado)
+    chamadas = {
+        "produtos": carregador.chamada(produtos, limite=TOP_GRAFICO, **periodo),
+        "categorias": carregador.chamada(categorias, limite=TOP_GRAFICO, **periodo),
+    }
+    if modo_aproximado:
+        chamadas["amostra"] = carregador.chamada(setup.get_totais_amostra, **periodo)
+    return chamadas
+
+
+def _formas_pagamento(periodo, modo_aproximado, picos):
+    # As chamadas repetidas viram uma consulta só, e as diferentes rodam em paralelo
+    return {
+        "analise_pag": carregador.chamada(setup.get_analise_formas_pagamento, **periodo),
+        "pagamentos": carregador.chamada(setup.get_vendas_por_forma_pagamento, **periodo),
+        "frequente": carregador.chamada(setup.get_frequencia_forma_pagamento, **periodo),
+        "pag_qtd": carregador.chamada(setup.get_frequencia_forma_pagamento, **periodo),
+        "rentavel": carregador.chamada(setup.get_vendas_por_forma_pagamento, **periodo),
+        "ticket": carregador.chamada(setup.get_analise_formas_pagamento, **periodo),
+    }
+
+
+def _clientes(periodo, modo_aproximado, picos):
+    # No modo aproximado, os dois cards recebem uma Estimativa (valor + erro relativo)
+    return {
+        "total_clientes": carregador.chamada(
+            setup.total_clientes_aproximado if modo_aproximado else setup.total_clientes, **periodo
+        ),
+        "receita_media": carregador.chamada(
+            setup.calcular_receita_media_por_cliente_aproximada if modo_aproximado
+            else setup.calcular_receita_media_por_cliente, **periodo
+        ),
+        "top_clientes": carregador.chamada(setup.get_top_clientes, limite=5, **periodo),
+    }
+
+
+PAGINAS = {
+    "Visão Geral": _visao_geral,
+    "Análise de Vendas": _analise_vendas,
+    "Análise de Produtos & Categorias": _produtos_categorias,
+    "Análises de Formas de Pagamento": _formas_pagamento,
+    "Análises de Clientes": _clientes,
+}
+
+
+def chamadas_pagina(pagina, periodo, modo_aproximado=False, picos=False):
+    """
+    {nome: chamada} com tudo o que a página precisa no período ({'inicio', 'fim'}).
+    'picos': série de evolução com os valores diários (LTTB) em vez de somas por semana/mês.
+    """
+    return PAGINAS[pagina](periodo, modo_aproximado, picos)
+
+
+# Tabelas "Ver lista completa": nome -> (função paginada, versão do modo aproximado)
+LISTAS = {
+    "produtos": (setup.get_pagina_produtos, setup.get_pagina_produtos_aproximado),
+    "categorias": (setup.get_pagina_categorias, setup.get_pagina_categorias_aproximado),
+    "clientes": (setup.get_pagina_clientes, setup.get_pagina_clientes),  # o ranking de clientes é sempre exato
+}
+
+
+def pagina_lista(nome, periodo, modo_aproximado=False, apos=None, busca=None):
+    """
+    Chamada de uma página da lista completa 'nome' (veja LISTAS) no período, depois da chave
+    'apos' (df.attrs["proxima"] da página anterior; None = primeira página).
+    """
+    exata, aproximada = LISTAS[nome]
+    return carregador.chamada(aproximada if modo_aproximado else exata, apos=apos, busca=busca or None, **periodo)
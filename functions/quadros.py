@@ -0,0 +1,108 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+# 🗜️ DataFrames compactos dos resultados
+# pd.read_sql_query lê o resultado inteiro como tuplas do Python (fetchall) e devolve os textos
+# ("Produto", "Cliente", "Forma de Pagamento", ...) como um objeto do Python por célula, os
+# inteiros em int64 e as datas como texto. Esses DataFrames ficam no cache e cada sessão do
+# dashboard recebe uma cópia, então a memória cresce com o número de usuários conectados.
+#
+# ler_cursor() monta o DataFrame direto dos lotes do cursor (fetchmany), e compactar() ajusta
+# os tipos de cada coluna:
+#   - textos viram strings do Arrow (um buffer contíguo por coluna, em vez de um objeto por célula);
+#   - inteiros viram int32 quando cabem. Menores que isso, não: as contas do dashboard e da
+#     federação de lojas com int8/int16 estourariam;
+#   - as colunas de 'datas' (texto 'YYYY-MM-DD') viram datetime64;
+#   - valores com casas decimais continuam float64: são receitas, somadas de novo pela federação
+#     de lojas e pelo dashboard, e em float32 perderiam centavos.
+# Sem o pyarrow instalado, os textos continuam objetos do Python.
+#
+# Um resultado vazio não tem valores de onde tirar os tipos (o cursor do sqlite3 não informa
+# os tipos das colunas, e o motor colunar soma arrays vazios como inteiros): as colunas
+# chegariam como objetos ou em tipos trocados. Para que um período sem vendas devolva as
+# mesmas colunas, nos mesmos tipos, de um período com vendas, o tipo vem do nome da coluna:
+# TEXTOS e DATAS como acima, INTEIROS e ids (*_id) em int32 e o restante (receitas, médias)
+# em float64.
+
+LINHAS_POR_LOTE = 10_000
+
+_INT32 = np.iinfo(np.int32)
+
+# Colunas dos resultados do setup.py (functions/setup.py) pelo tipo, para os resultados vazios
+TEXTOS = frozenset({
+    "Produto", "Categoria", "Cliente", "Forma de Pagamento", "Hora", "Dia da Semana", "Grupo de Frequência",
+})
+INTEIROS = frozenset({"Qtd. Transações", "Número de Clientes", "Novos Clientes"})
+DATAS = frozenset({"Dia", "Mês"})
+
+
+@functools.lru_cache(maxsize=None)
+def _tipo_texto():
+    """Tipo das colunas de texto: string do Arrow, ou None sem o pyarrow."""
+    try:
+        import pyarrow  # noqa: F401 (só confere se está instalado)
+    except ImportError:
+        return None
+    # O pandas 3 já lê textos como strings do Arrow ("str"): usa o mesmo tipo, para que as
+    # colunas vindas do SQL e dos motores em memória sejam iguais
+    padrao = pd.Series([""]).dtype
+    if isinstance(padrao, pd.StringDtype) and padrao.storage == "pyarrow":
+        return padrao
+    return pd.StringDtype("pyarrow")
+
+
+@functools.lru_cache(maxsize=None)
+def _tipo_data():
+    """Tipo das colunas de datas (a resolução que pd.to_datetime dá aos textos 'YYYY-MM-DD')."""
+    return pd.to_datetime(pd.Series(["2000-01-01"])).dtype
+
+
+def _tipo_vazio(coluna, datas, tipo_texto):
+    """Tipo de uma coluna de um resultado vazio, pelo nome (veja acima)."""
+    if coluna in datas or coluna in DATAS:
+        return _tipo_data()
+    if coluna in TEXTOS:
+        return tipo_texto if tipo_texto is not None else object
+    if coluna in INTEIROS or coluna == "id" or str(coluna).endswith("_id"):
+        return np.int32
+    return np.float64
+
+
+def _so_textos(serie):
+    return serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) == "string"
+
+
+def compactar(df, datas=()):
+    """Troca, no próprio DataFrame, os tipos das colunas pelos compactos (veja acima). Retorna o df."""
+    tipo_texto = _tipo_texto()
+    for coluna in df.columns:
+        serie = df[coluna]
+        if not len(serie):
+            df[coluna] = serie.astype(_tipo_vazio(coluna, datas, tipo_texto))
+        elif coluna in datas:
+            df[coluna] = pd.to_datetime(serie)
+        elif serie.dtype == np.int64:
+            if not len(serie) or (serie.min() >= _INT32.min and serie.max() <= _INT32.max):
+                df[coluna] = serie.astype(np.int32)
+        elif tipo_texto is not None and _so_textos(serie):
+            df[coluna] = serie.astype(tipo_texto)
+    return df
+
+
+def ler_cursor(cursor, datas=(), linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    DataFrame com o resultado de um cursor já executado, lido em lotes de 'linhas_por_lote'.
+    Cada lote vira um pedaço já compacto, e só ele fica como tuplas do Python na memória.
+    """
+    nomes = [descricao[0] for descricao in cursor.description]
+    pedacos = []
+    while lote := cursor.fetchmany(linhas_por_lote):
+        pedacos.append(compactar(pd.DataFrame.from_records(lote, columns=nomes, coerce_float=True)))
+    if not pedacos:
+        return compactar(pd.DataFrame(columns=nomes), datas)
+    if len(pedacos) == 1:
+        return compactar(pedacos[0], datas)
+    # Lotes com tipos diferentes (ex.: um só com nulos) se acertam na compactação do todo
+    return compactar(pd.concat(pedacos, ignore_index=True), datas)
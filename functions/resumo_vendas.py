@@ -0,0 +1,105 @@
+# 📊 Tabela de resumo (rollup) das vendas por DIA x HORA
+# Em vez de varrer a tabela 'vendas' inteira e chamar DATE()/strftime() em cada linha
+# a cada renderização, as funções de série temporal leem este resumo, que tem no
+# máximo 24 linhas por dia, independente de quantas vendas existam.
+#
+# A tabela e o gatilho são criados pelas migrações (functions/migracoes.py, passo 2).
+# O resumo é mantido atualizado por um gatilho (trigger) AFTER INSERT em 'vendas'.
+# Para exclusões/alterações feitas diretamente no banco, use reconstruir_resumo_vendas(conn).
+
+DDL_RESUMO_VENDAS = '''
+CREATE TABLE IF NOT EXISTS vendas_resumo_hora (
+    dia TEXT NOT NULL,                  -- Formato 'YYYY-MM-DD'
+    hora INTEGER NOT NULL,              -- 0 a 23
+    receita REAL NOT NULL DEFAULT 0,    -- SUM(valor_total_item)
+    itens INTEGER NOT NULL DEFAULT 0,   -- SUM(quantidade)
+    transacoes INTEGER NOT NULL DEFAULT 0, -- COUNT(DISTINCT transacao_id) no dia/hora
+    PRIMARY KEY (dia, hora)
+) WITHOUT ROWID
+'''
+
+# Índice de apoio ao gatilho: permite saber rapidamente se a transação já foi contada.
+DDL_INDICE_TRANSACAO = '''
+CREATE INDEX IF NOT EXISTS idx_vendas_transacao ON vendas (transacao_id)
+'''
+
+DDL_GATILHO_RESUMO = '''
+CREATE TRIGGER IF NOT EXISTS trg_vendas_resumo_hora
+AFTER INSERT ON vendas
+BEGIN
+    INSERT INTO vendas_resumo_hora (dia, hora, receita, itens, transacoes)
+    VALUES (
+        DATE(NEW.data_venda),
+        CAST(strftime('%H', NEW.data_venda) AS INTEGER),
+        NEW.valor_total_item,
+        NEW.quantidade,
+        -- Só conta a transação se for a primeira linha dela neste dia/hora
+        NEW.transacao_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM vendas
+            WHERE transacao_id = NEW.transacao_id
+              AND id <> NEW.id
+              AND DATE(data_venda) = DATE(NEW.data_venda)
+              AND strftime('%H', data_venda) = strftime('%H', NEW.data_venda)
+        )
+    )
+    ON CONFLICT (dia, hora) DO UPDATE SET
+        receita = receita + excluded.receita,
+        itens = itens + excluded.itens,
+        transacoes = transacoes + excluded.transacoes;
+END
+'''
+
+
+SQL_LIMPAR_RESUMO = "DELETE FROM vendas_resumo_hora;"
+
+# {tabela}: 'vendas' ou a tabela TEMP com o histórico inteiro (functions/arquivo.py)
+SQL_RECONSTRUIR_RESUMO = '''
+INSERT INTO vendas_resumo_hora (dia, hora, receita, itens, transacoes)
+SELECT
+    DATE(data_venda),
+    CAST(strftime('%H', data_venda) AS INTEGER),
+    SUM(valor_total_item),
+    SUM(quantidade),
+    COUNT(DISTINCT transacao_id)
+FROM {tabela}
+GROUP BY 1, 2;
+'''
+
+
+def reconstruir_resumo_vendas(conn):
+    """
+    Recalcula o resumo por dia/hora do zero a partir de 'vendas' e dos meses já arquivados
+    (functions/arquivo.py). Use após cargas feitas com os gatilhos desligados, exclusões ou
+    correções de dados.
+    """
+    from functions import arquivo
+
+    cursor = conn.cursor()
+    historico = arquivo.carregar_historico(
+        cursor, ["data_venda", "valor_total_item", "quantidade", "transacao_id"], "resumo_historico"
+    )
+    cursor.execute(SQL_LIMPAR_RESUMO)
+    cursor.execute(SQL_RECONSTRUIR_RESUMO.format(tabela=historico))
+    cursor.execute(f"DROP TABLE {historico};")
+    conn.commit()
+
+
+def recalcular_dias(cursor, dias):
+    """
+    Recalcula o resumo apenas dos dias informados ('YYYY-MM-DD'), lendo 'vendas' pelo índice
+    de data. Usado pela carga em massa, que grava com o gatilho desligado. Não faz commit.
+    """
+    for dia in sorted(dias):
+        cursor.execute("DELETE FROM vendas_resumo_hora WHERE dia = ?;", (dia,))
+        cursor.execute('''
+        INSERT INTO vendas_resumo_hora (dia, hora, receita, itens, transacoes)
+        SELECT
+            DATE(data_venda),
+            CAST(strftime('%H', data_venda) AS INTEGER),
+            SUM(valor_total_item),
+            SUM(quantidade),
+            COUNT(DISTINCT transacao_id)
+        FROM vendas
+        WHERE data_venda >= ? AND data_venda < DATE(?, '+1 day')
+        GROUP BY 1, 2;
+        ''', (dia, dia))
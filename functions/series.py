@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# 📉 Redução de séries temporais para os gráficos
+# obter_dados_vendas devolve um ponto por dia. Com anos de histórico, são milhares de pontos
+# enviados ao navegador a cada renderização. reduzir_serie() limita a série a ~'pontos' pontos,
+# qualquer que seja o tamanho do histórico:
+#
+#   - resolução adaptativa (padrão): soma por dia, semana ou mês, a mais fina em que o
+#     período pedido cabe em 'pontos' pontos. A coluna de datas passa a se chamar "Dia",
+#     "Semana" ou "Mês" (início do intervalo) e os valores são os totais do intervalo;
+#   - LTTB (largest-triangle-three-buckets): mantém os valores DIÁRIOS e escolhe, em cada faixa
+#     da série, o ponto que mais altera o desenho do gráfico. Picos e vales isolados continuam
+#     visíveis (numa soma semanal eles somem), e a série nunca passa de 'pontos' pontos.
+#
+# Usado por setup.obter_dados_vendas (SQL e motor colunar) e pela federação de lojas,
+# que junta as séries diárias de cada loja antes de reduzir.
+
+PONTOS_PADRAO = 500
+
+GRANULARIDADES = (
+    ("Dia", None),
+    ("Semana", "W-SUN"),   # semanas de segunda a domingo, rotuladas pela segunda-feira
+    ("Mês", "M"),
+)
+
+
+def _limites(dias, inicio=None, fim=None):
+    """Primeiro e último dia do período pedido (ou dos dados, se o período for aberto)."""
+    primeiro = pd.Timestamp(inicio) if inicio is not None else dias.min()
+    ultimo = pd.Timestamp(fim) if fim is not None else dias.max()
+    return primeiro, ultimo
+
+
+def escolher_granularidade(dias, pontos, inicio=None, fim=None):
+    """
+    Nome e frequência (pandas) da granularidade mais fina em que o período cabe em 'pontos'
+    pontos. Se nem por mês couber, fica por mês.
+    """
+    if len(dias) == 0:
+        return GRANULARIDADES[0]
+    primeiro, ultimo = _limites(dias, inicio, fim)
+    for nome, frequencia in GRANULARIDADES:
+        if frequencia is None:
+            intervalos = (ultimo - primeiro).days + 1
+        else:
+            intervalos = ultimo.to_period(frequencia).ordinal - primeiro.to_period(frequencia).ordinal + 1
+        if intervalos <= pontos:
+            return nome, frequencia
+    return GRANULARIDADES[-1]
+
+
+def lttb(x, y, pontos):
+    """
+    Índices dos pontos escolhidos pelo largest-triangle-three-buckets (Steinarsson, 2013).
+    O primeiro e o último ponto ficam sempre; o resto da série é dividido em 'pontos' - 2
+    faixas, e de cada faixa fica o ponto que forma o maior triângulo com o ponto escolhido
+    na faixa anterior e a média da faixa seguinte. Com menos de 3 pontos, não reduz.
+    """
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)  # nada a reduzir (ou pontos demais para formar faixas)
+    bordas = np.linspace(1, n - 1, pontos - 1).astype(int)  # faixas [bordas[i], bordas[i + 1])
+    escolhidos = np.empty(pontos, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(pontos - 2):
+        faixa = slice(bordas[i], bordas[i + 1])
+        seguinte = slice(bordas[i + 1], bordas[i + 2]) if i + 2 < len(bordas) else slice(n - 1, n)
+        media_x, media_y = x[seguinte].mean(), y[seguinte].mean()
+        # Área (em dobro) do triângulo (anterior, candidato, média da faixa seguinte)
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[faixa] - y[anterior])
+            - (x[anterior] - x[faixa]) * (media_y - y[anterior])
+        )
+        anterior = bordas[i] + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def reduzir_serie(df, pontos, usar_lttb=False, inicio=None, fim=None, coluna_data="Dia", coluna_valor="Total Vendido"):
+    """
+    Reduz uma série diária (colunas coluna_data, em datetime, e coluna_valor, em ordem de data)
+    para ~'pontos' pontos. 'inicio'/'fim' são os do período pedido: com eles, a granularidade
+    depende do período, e não só dos dias que tiveram venda. Sem 'pontos', retorna a série como veio.
+    """
+    if not pontos or df.empty:
+        return df
+    if usar_lttb:
+        if len(df) <= pontos:
+            return df
+        dias = df[coluna_data].to_numpy(dtype="datetime64[D]").astype(np.int64).astype(float)
+        indices = lttb(dias, df[coluna_valor].to_numpy(dtype=float), pontos)
+        return df.iloc[indices].reset_index(drop=True)
+
+    nome, frequencia = escolher_granularidade(df[coluna_data], pontos, inicio, fim)
+    if frequencia is None:
+        return df
+    inicio_intervalo = df[coluna_data].dt.to_period(frequencia).dt.start_time
+    reduzida = df.groupby(inicio_intervalo, sort=True)[coluna_valor].sum()
+    return pd.DataFrame({nome: reduzida.index, coluna_valor: reduzida.to_numpy()})
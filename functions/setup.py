@@ -1,395 +1,634 @@
-import sqlite3
-import pandas as pd # Removido se não usado diretamente aqui, mas pode ser útil para formatar saídas
-import streamlit as st # Removido se não usado diretamente aqui # Removido se não usado diretamente aqui
-from datetime import date # Importe 'date' para usar nos filtros
-from functions import setup
-
-# 📦 Conecta (ou cria) o banco de dados SQLite
-# Esta conexão e cursor são globais e criados quando o módulo é importado.
-conn = sqlite3.connect("acai.db", check_same_thread=False)
-cursor = conn.cursor() # Este é o cursor global que suas funções podem usar
-
-# 🏗️ Criação das tabelas (DDL)
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS produtos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nome TEXT NOT NULL,
-    preco_unitario REAL NOT NULL,
-    categoria_id INTEGER NOT NULL,
-    FOREIGN KEY (categoria_id) REFERENCES categorias(id)
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS vendas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    produto_id INTEGER NOT NULL,
-    quantidade INTEGER NOT NULL,
-    preco_unitario_venda REAL NOT NULL, 
-    valor_total_item REAL NOT NULL,   
-    data_venda TEXT NOT NULL,         -- Formato 'YYYY-MM-DD HH:MM:SS'
-    cliente_id INTEGER NOT NULL,
-    formas_pagamento_id INTEGER NOT NULL,
-    transacao_id INTEGER, 
-    FOREIGN KEY (produto_id) REFERENCES produtos(id),
-    FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-    FOREIGN KEY (formas_pagamento_id) REFERENCES formas_pagamento(id)
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS categorias (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nome_categoria TEXT NOT NULL
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS clientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    nome TEXT NOT NULL
-)
-''')
-
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS formas_pagamento (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    descricao TEXT NOT NULL
-)
-''')
-
-# Aplica as criações de tabelas no banco de dados
-conn.commit() # Adicionado para garantir que as tabelas sejam criadas/salvas.
+import threading
+import pandas as pd # Usado nos DataFrames de resultado (as consultas passam por diagnostico.ler_sql)
+from datetime import date, datetime, timedelta # Usados nos filtros de período (inicio/fim)
+from dataclasses import dataclass
+from functions import conexao
+from functions import migracoes
+from functions.cache import cache_consulta, estatisticas_cache, invalidar_cache
+from functions.motor_colunar import com_motor
+from functions import motor_colunar
+from functions.diagnostico import executar, ler_sql
+from functions.arquivo import com_arquivo, LINHAS, RESUMO
+from functions import aproximacao
+from functions import dimensoes
+from functions import series
+
+# 📦 Conexão com o banco de dados SQLite
+# Importar este módulo NÃO abre o banco nem executa DDL. A inicialização é explícita
+# (init_db) ou acontece na primeira chamada de get_connection()/get_write_connection().
+# Cada thread (sessão do Streamlit) usa sua própria conexão somente leitura, e as escritas
+# passam por uma conexão única. Veja functions/conexao.py.
+CAMINHO_BANCO = "acai.db"
+
+gerenciador = None
+_lock_init = threading.Lock()
+
+
+def init_db(caminho=CAMINHO_BANCO):
+    """
+    Abre (ou cria) o banco e aplica as migrações de esquema pendentes.
+    Pode ser chamada várias vezes: só a primeira faz o trabalho. Retorna o gerenciador de conexões.
+    """
+    global gerenciador
+    with _lock_init:
+        if gerenciador is None:
+            novo = conexao.GerenciadorConexoes(caminho)
+            # 🏗️ Criação/atualização do esquema (DDL)
+            # As tabelas, o resumo por dia/hora e os índices são criados pelas migrações
+            # versionadas (PRAGMA user_version). Bancos antigos são atualizados no lugar.
+            migracoes.aplicar_migracoes(novo.conexao_escrita())
+            gerenciador = novo
+    return gerenciador
+
+
+def get_connection():
+    """Retorna a conexão somente leitura da thread atual (use nas funções de consulta)."""
+    return init_db().conexao_leitura()
+
+
+def get_write_connection():
+    """Retorna a conexão de escrita (única no processo, em modo WAL)."""
+    return init_db().conexao_escrita()
+
+
+def usar_motor_colunar(ativo=True):
+    """
+    Liga (ou desliga) o motor colunar em memória para as funções de consulta abaixo.
+    Com ele ligado, 'vendas' é carregada uma vez em arrays NumPy e as funções devolvem os
+    mesmos resultados sem consultar o SQLite (veja functions/motor_colunar.py).
+    Retorna o motor ativo, ou None.
+    """
+    if not ativo:
+        motor_colunar.desativar()
+        return None
+    return motor_colunar.motor_ativo() or motor_colunar.ativar()
 
 #____________________________________________________________________________________________________________________________________________#
 
 # FUNÇÕES DE CÁLCULO
-# Todas as funções abaixo recebem um 'cursor_param' como argumento.
-# Elas usarão esse cursor passado, não o global 'cursor' diretamente (a menos que você passe setup.cursor para elas).
+# As funções marcadas com @cache_consulta guardam o resultado até que novos dados sejam
+# inseridos no banco (veja functions/cache.py). Use estatisticas_cache() para ver hits/misses.
+# As marcadas com @com_motor podem ser respondidas pelo motor colunar (usar_motor_colunar()).
+# As marcadas com @com_arquivo também enxergam os meses movidos para o arquivo em Parquet
+# (functions/arquivo.py): antes da consulta, as partições do período são carregadas na conexão,
+# só no resumo por dia x produto x forma de pagamento ou linha a linha, conforme o que a função lê.
+# Todas as funções abaixo recebem uma conexão ('conn') ou um cursor ('cursor_param') como argumento.
+# Use get_connection() para obter a conexão de leitura da thread atual.
+# O SQL é executado por executar()/ler_sql() (functions/diagnostico.py), que registram tempo,
+# linhas e plano de cada consulta para a página "Diagnóstico".
+# Os DataFrames saem de ler_sql() em tipos compactos: textos do Arrow, inteiros em int32 e
+# datas em datetime64 (veja functions/quadros.py).
+#
+# 📅 Filtro de período: as funções aceitam 'inicio' e 'fim' opcionais (date ou 'YYYY-MM-DD',
+# ambos inclusivos). Eles viram predicados de faixa simples (data_venda >= ? AND data_venda < ?),
+# que usam o índice de data em vez de aplicar strftime() em cada linha.
+
+def _texto_data(valor):
+    """Converte date/datetime/'YYYY-MM-DD' para o texto 'YYYY-MM-DD' usado no banco."""
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return date.fromisoformat(str(valor)[:10]).isoformat()
+
+
+def _filtro_periodo(inicio=None, fim=None, coluna="data_venda", inteiro=False):
+    """
+    Monta o predicado de período para 'coluna' e seus parâmetros.
+    'fim' é inclusivo: vira "coluna < dia seguinte", o que também pega os horários do último dia.
+    Com inteiro=True, os limites saem no formato AAAAMMDD das colunas inteiras (ex.: vendas.dia).
+    Sem limites, retorna "1 = 1" (sem filtro).
+    """
+    def _formatar(dia):
+        return int(dia.strftime("%Y%m%d")) if inteiro else dia.isoformat()
+
+    condicoes, params = [], []
+    if inicio is not None:
+        condicoes.append(f"{coluna} >= ?")
+        params.append(_formatar(date.fromisoformat(_texto_data(inicio))))
+    if fim is not None:
+        condicoes.append(f"{coluna} < ?")
+        params.append(_formatar(date.fromisoformat(_texto_data(fim)) + timedelta(days=1)))
+    return (" AND ".join(condicoes) or "1 = 1"), params
 
-def calcular_valor_total_vendas(cursor_param):
-    cursor_param.execute("SELECT SUM(valor_total_item) FROM vendas;")
-    resultado = cursor_param.fetchone()
+
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def calcular_valor_total_vendas(cursor_param, inicio=None, fim=None):
+    filtro, params = _filtro_periodo(inicio, fim)
+    resultado = executar(cursor_param, f"SELECT SUM(valor_total_item) FROM vendas WHERE {filtro};", params).fetchone()
     return resultado[0] if resultado and resultado[0] is not None else 0
 
-def calcular_quantidade_vendas(cursor_param):
-    cursor_param.execute("SELECT SUM(quantidade) FROM vendas;")
-    resultado = cursor_param.fetchone()
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def calcular_quantidade_vendas(cursor_param, inicio=None, fim=None):
+    filtro, params = _filtro_periodo(inicio, fim)
+    resultado = executar(cursor_param, f"SELECT SUM(quantidade) FROM vendas WHERE {filtro};", params).fetchone()
     return resultado[0] if resultado and resultado[0] is not None else 0
 
-def calcular_ticket_medio(cursor_param):
+@cache_consulta
+def get_totais_transacoes(cursor_param, inicio=None, fim=None):
     """
-    Calcula o ticket médio (valor total de vendas / número de transações distintas).
-    Executa uma única query no banco de dados para maior eficiência.
+    Retorna (receita, número de transações) lidos da tabela de cabeçalhos 'transacoes'
+    (uma linha por transação e forma de pagamento), sem COUNT(DISTINCT) sobre os itens.
+    Com período, a transação conta no dia em que começou. É a base do ticket médio
+    (e o que se soma entre lojas, veja functions/federacao.py).
     """
-    # Esta query SQL faz todo o trabalho.
-    # O banco de dados retornará NULL (None) se não houver transações, evitando erro de divisão por zero.
-    query = """
+    filtro, params = _filtro_periodo(inicio, fim, "data")
+    query = f"""
     SELECT 
-        SUM(valor_total_item) / COUNT(DISTINCT transacao_id) 
-    FROM vendas 
-    WHERE transacao_id IS NOT NULL;
+        SUM(total), SUM(principal) 
+    FROM transacoes 
+    WHERE {filtro};
     """
-    
-    cursor_param.execute(query)
-    resultado = cursor_param.fetchone()
-    
-    # Se o 'resultado' existir e o valor dentro dele (resultado[0]) não for nulo, retorne o valor.
-    # Caso contrário, retorne 0.
-    return resultado[0] if resultado and resultado[0] is not None else 0
+    receita, transacoes = executar(cursor_param, query, params).fetchone()
+    return receita or 0, transacoes or 0
+
+@cache_consulta
+@com_motor
+def calcular_ticket_medio(cursor_param, inicio=None, fim=None):
+    """
+    Calcula o ticket médio (valor total de vendas / número de transações distintas).
+    Retorna 0 se não houver transações.
+    """
+    receita, transacoes = get_totais_transacoes(cursor_param, inicio, fim)
+    return receita / transacoes if transacoes else 0
 
-def total_clientes(cursor_param):
-    cursor_param.execute("SELECT COUNT(*) FROM clientes;")
-    resultado = cursor_param.fetchone()
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=None, com_periodo=LINHAS)
+def total_clientes(cursor_param, inicio=None, fim=None):
+    """Total de clientes cadastrados ou, com período, os clientes que compraram nele."""
+    if inicio is None and fim is None:
+        resultado = executar(cursor_param, "SELECT COUNT(*) FROM clientes;").fetchone()
+    else:
+        filtro, params = _filtro_periodo(inicio, fim)
+        resultado = executar(cursor_param, f"SELECT COUNT(DISTINCT cliente_id) FROM vendas WHERE {filtro};", params).fetchone()
     return resultado[0] if resultado and resultado[0] is not None else 0
 
-def get_top_clientes(conn, limite=10):
-    """Busca os clientes que mais gastaram, com um limite opcional."""
-    query = """
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=None, com_periodo=LINHAS)
+def get_top_clientes(conn, limite=10, inicio=None, fim=None):
+    """Busca os clientes que mais gastaram, com um limite opcional (None = todos)."""
+    if limite is None:
+        limite = -1  # LIMIT negativo = sem limite no SQLite
+    if inicio is None and fim is None:
+        # Sem período, o total de cada cliente já está em clientes_metricas: o topo sai
+        # direto do índice idx_clientes_metricas_total, sem agrupar 'vendas'
+        query = """
+        SELECT c.nome AS "Cliente", m.total_gasto AS "Total Gasto"
+        FROM clientes_metricas m JOIN clientes c ON c.id = m.cliente_id
+        ORDER BY m.total_gasto DESC, m.cliente_id ASC LIMIT ?;
+        """
+        return ler_sql(query, conn, params=(limite,))
+    filtro, params = _filtro_periodo(inicio, fim, "v.data_venda")
+    query = f"""
     SELECT c.nome AS "Cliente", SUM(v.valor_total_item) AS "Total Gasto"
     FROM clientes c JOIN vendas v ON c.id = v.cliente_id
-    GROUP BY c.id, c.nome ORDER BY "Total Gasto" DESC LIMIT ?;
+    WHERE {filtro}
+    GROUP BY c.id, c.nome ORDER BY "Total Gasto" DESC, c.id ASC LIMIT ?;
     """
-    return pd.read_sql_query(query, conn, params=(limite,))
+    return ler_sql(query, conn, params=(*params, limite))
 
-def get_top_produtos(conn, limite=None): # O padrão agora é None
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_top_produtos(conn, limite=None, inicio=None, fim=None): # O padrão agora é None
     """
     Busca os produtos mais vendidos (em valor).
     Se um limite for fornecido, aplica o LIMIT. Senão, busca todos.
     """
-    query = """
+    filtro, params = _filtro_periodo(inicio, fim, "v.data_venda")
+    query = f"""
     SELECT p.nome AS "Produto", SUM(v.valor_total_item) AS "Total Vendido"
     FROM produtos p JOIN vendas v ON p.id = v.produto_id
-    GROUP BY p.nome ORDER BY "Total Vendido" DESC
+    WHERE {filtro}
+    GROUP BY p.nome ORDER BY "Total Vendido" DESC, "Produto" ASC
     """
-    params = []
     
     # Adiciona o LIMIT apenas se um valor for passado
     if limite is not None:
         query += " LIMIT ?;"
         params.append(limite)
     
-    return pd.read_sql_query(query, conn, params=params)
+    return ler_sql(query, conn, params=params)
 
 
-def get_top_categorias(conn, limite=None): # O padrão agora é None
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_top_categorias(conn, limite=None, inicio=None, fim=None): # O padrão agora é None
     """
     Busca as categorias mais vendidas (em valor).
     Se um limite for fornecido, aplica o LIMIT. Senão, busca todas.
     """
-    query = """
-    SELECT c.nome_categoria AS "Categoria", SUM(v.valor_total_item) AS "Total Vendido"
+    # Soma por produto_id (só o índice idx_vendas_produto); produto -> categoria -> nome em memória
+    filtro, params = _filtro_periodo(inicio, fim)
+    query = f"""
+    SELECT produto_id, SUM(valor_total_item) AS "Total Vendido"
+    FROM vendas WHERE {filtro} GROUP BY produto_id;
+    """
+    df = ler_sql(query, conn, params=params)
+    df["produto_id"] = dimensoes.traduzir(conn, "produtos", df["produto_id"], "categoria_id")
+    df = dimensoes.somar_por_nome(conn, df, "produto_id", "categorias", "Categoria", "Total Vendido")
+    return df if limite is None else df.head(limite)
+
+#____________________________________________________________________________________________________________________________________________#
+
+# 📄 LISTAS COMPLETAS PAGINADAS ("Ver lista completa")
+# Em vez do ranking inteiro, cada chamada devolve UMA página de 'tamanho' linhas, por keyset
+# (seek): a próxima página começa depois da chave (total, desempate) da última linha da anterior,
+# sem OFFSET. O desempate é o mesmo dos rankings acima: o id do cliente em get_top_clientes e o
+# nome nos rankings agrupados por nome (produtos, categorias). Sem período, a página de
+# clientes é lida direto do índice idx_clientes_metricas_total (total_gasto DESC, cliente_id).
+# A chave da próxima página fica em df.attrs["proxima"] (None na última). A chave é opaca para quem
+# chama: é só devolvê-la em 'apos'. 'busca' filtra os nomes que contêm o texto.
+
+TAMANHO_PAGINA = 20
+
+
+def _filtro_busca(busca, coluna):
+    """Predicado "coluna contém 'busca'" (LIKE, com % e _ escapados) e seus parâmetros. Sem busca, "1 = 1"."""
+    if not busca:
+        return "1 = 1", []
+    padrao = busca.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{coluna} LIKE ? ESCAPE '\\'", [f"%{padrao}%"]
+
+
+def _fechar_pagina(df, tamanho):
+    """
+    Corta a página ('df' vem com até tamanho + 1 linhas: a última só diz se há outra página),
+    guarda a chave (total, chave) da última linha em df.attrs["proxima"] e tira a coluna 'chave'.
+    """
+    proxima = None
+    if len(df) > tamanho:
+        df = df.iloc[:tamanho]
+        ultima = df.iloc[-1]
+        proxima = tuple(v.item() if hasattr(v, "item") else v for v in (ultima.iloc[1], ultima["chave"]))
+    df = df.drop(columns="chave").reset_index(drop=True)
+    df.attrs["proxima"] = proxima
+    return df
+
+
+def _pagina_ranking(conn, ranking, params, colunas, apos, tamanho):
+    """
+    Uma página de 'ranking' (SQL com as colunas nome, total e chave, uma linha por item),
+    na ordem total DESC, chave ASC, a partir da linha seguinte a 'apos'.
+    """
+    seek, params_seek = "1 = 1", []
+    if apos is not None:
+        total, chave = apos
+        # "total <= ?" sozinho já delimita a faixa do índice; o OR só desempata no mesmo total
+        seek, params_seek = "total <= ? AND (total < ? OR chave > ?)", [total, total, chave]
+    query = f"""
+    WITH ranking AS ({ranking})
+    SELECT nome AS "{colunas[0]}", total AS "{colunas[1]}", chave FROM ranking
+    WHERE {seek} ORDER BY total DESC, chave ASC LIMIT ?;
+    """
+    return _fechar_pagina(ler_sql(query, conn, params=[*params, *params_seek, tamanho + 1]), tamanho)
+
+
+def paginar_ranking(df, apos=None, tamanho=TAMANHO_PAGINA, busca=None):
+    """
+    A mesma página, cortada de um ranking já em memória (colunas nome e total, na ordem
+    total DESC, nome ASC). Usada nos rankings aproximados e na federação de lojas (functions/federacao.py).
+    """
+    coluna_nome, coluna_total = df.columns[:2]
+    if busca:
+        df = df[df[coluna_nome].str.contains(busca, case=False, regex=False, na=False)]
+    if apos is not None:
+        total, nome = apos
+        df = df[(df[coluna_total] < total) | ((df[coluna_total] == total) & (df[coluna_nome] > nome))]
+    df = df.sort_values([coluna_total, coluna_nome], ascending=[False, True], kind="stable")
+    return _fechar_pagina(df.head(tamanho + 1).assign(chave=df[coluna_nome]), tamanho)
+
+
+@cache_consulta
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_pagina_produtos(conn, apos=None, tamanho=TAMANHO_PAGINA, busca=None, inicio=None, fim=None):
+    """Uma página do ranking de produtos (como get_top_produtos), depois da chave 'apos'."""
+    filtro, params = _filtro_periodo(inicio, fim, "v.data_venda")
+    filtro_busca, params_busca = _filtro_busca(busca, "p.nome")
+    ranking = f"""
+    SELECT p.nome AS nome, SUM(v.valor_total_item) AS total, p.nome AS chave
+    FROM produtos p JOIN vendas v ON p.id = v.produto_id
+    WHERE {filtro} AND {filtro_busca} GROUP BY p.nome
+    """
+    return _pagina_ranking(conn, ranking, params + params_busca, ("Produto", "Total Vendido"), apos, tamanho)
+
+
+@cache_consulta
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_pagina_categorias(conn, apos=None, tamanho=TAMANHO_PAGINA, busca=None, inicio=None, fim=None):
+    """Uma página do ranking de categorias (como get_top_categorias), depois da chave 'apos'."""
+    filtro, params = _filtro_periodo(inicio, fim, "v.data_venda")
+    filtro_busca, params_busca = _filtro_busca(busca, "c.nome_categoria")
+    ranking = f"""
+    SELECT c.nome_categoria AS nome, SUM(v.valor_total_item) AS total, c.nome_categoria AS chave
     FROM vendas v JOIN produtos p ON v.produto_id = p.id JOIN categorias c ON p.categoria_id = c.id
-    GROUP BY c.nome_categoria ORDER BY "Total Vendido" DESC
+    WHERE {filtro} AND {filtro_busca} GROUP BY c.nome_categoria
     """
-    params = []
-    
-    if limite is not None:
-        query += " LIMIT ?;"
-        params.append(limite)
+    return _pagina_ranking(conn, ranking, params + params_busca, ("Categoria", "Total Vendido"), apos, tamanho)
 
-    return pd.read_sql_query(query, conn, params=params)
+
+@cache_consulta
+@com_arquivo(sem_periodo=None, com_periodo=LINHAS)
+def get_pagina_clientes(conn, apos=None, tamanho=TAMANHO_PAGINA, busca=None, inicio=None, fim=None):
+    """Uma página do ranking de clientes (como get_top_clientes), depois da chave 'apos'."""
+    filtro_busca, params_busca = _filtro_busca(busca, "c.nome")
+    if inicio is None and fim is None:
+        ranking = f"""
+        SELECT c.nome AS nome, m.total_gasto AS total, m.cliente_id AS chave
+        FROM clientes_metricas m JOIN clientes c ON c.id = m.cliente_id
+        WHERE {filtro_busca}
+        """
+        return _pagina_ranking(conn, ranking, params_busca, ("Cliente", "Total Gasto"), apos, tamanho)
+    filtro, params = _filtro_periodo(inicio, fim, "v.data_venda")
+    ranking = f"""
+    SELECT c.nome AS nome, SUM(v.valor_total_item) AS total, c.id AS chave
+    FROM clientes c JOIN vendas v ON c.id = v.cliente_id
+    WHERE {filtro} AND {filtro_busca} GROUP BY c.id, c.nome
+    """
+    return _pagina_ranking(conn, ranking, params + params_busca, ("Cliente", "Total Gasto"), apos, tamanho)
 
 def get_delta_style(cursor_param):
-    if cursor > 0:
+    if cursor_param > 0:
         # Aumento (bom) -> Verde
         return "color: #28a745;", "▲" # Cor verde e seta para cima
-    elif cursor < 0:
+    elif cursor_param < 0:
         # Queda (ruim) -> Vermelho
         return "color: #dc3545;", "▼" # Cor vermelha e seta para baixo
     else:
         # Sem mudança
         return "color: #808080;", "" # Cor cinza e sem seta
 
-def get_evolucao_vendas_diaria(conn):
-    """Busca o total de vendas POR DIA."""
-    query = """
-    SELECT DATE(data_venda) AS "Dia", SUM(valor_total_item) AS "Total Vendido"
-    FROM vendas GROUP BY "Dia" ORDER BY "Dia" ASC;
-    """
-    return pd.read_sql_query(query, conn)
+@cache_consulta
+@com_motor
+def get_evolucao_vendas_diaria(conn, inicio=None, fim=None):
+    """Busca o total de vendas POR DIA (lido do resumo por dia/hora)."""
+    filtro, params = _filtro_periodo(inicio, fim, "dia")
+    query = f"""
+    SELECT dia AS "Dia", SUM(receita) AS "Total Vendido"
+    FROM vendas_resumo_hora WHERE {filtro} GROUP BY dia ORDER BY dia ASC;
+    """
+    return ler_sql(query, conn, params=params, datas=("Dia",))
 
-def obter_dados_vendas(conn):
+@cache_consulta
+@com_motor
+def obter_dados_vendas(conn, inicio=None, fim=None, pontos=None, lttb=False):
     """
     Busca o total de vendas AGRUPADO POR DIA.
     Esta é a forma correta para criar um gráfico de evolução limpo.
-    """
-    # A query foi corrigida para usar os nomes de coluna corretos:
-    # 'data_venda' e 'valor_total_item'.
-    # E já agrupa os dados por dia para o gráfico.
-    query = """
+    Com 'pontos', a série é reduzida para o gráfico (veja functions/series.py): soma por dia,
+    semana ou mês conforme o tamanho do período, ou, com lttb=True, os valores diários que
+    preservam os picos. Nos dois casos, no máximo ~'pontos' pontos, qualquer que seja o histórico.
+    """
+    # Lê do resumo por dia/hora (vendas_resumo_hora), que já está agregado,
+    # em vez de aplicar DATE() em cada linha da tabela 'vendas'.
+    filtro, params = _filtro_periodo(inicio, fim, "dia")
+    query = f"""
     SELECT
-        DATE(data_venda) AS "Dia",
-        SUM(valor_total_item) AS "Total Vendido"
+        dia AS "Dia",
+        SUM(receita) AS "Total Vendido"
     FROM
-        vendas
+        vendas_resumo_hora
+    WHERE
+        {filtro}
     GROUP BY
-        "Dia"
+        dia
     ORDER BY
-        "Dia" ASC;
+        dia ASC;
     """
     try:
-        # Usa o pandas para ler o resultado da query diretamente para um DataFrame
-        df = pd.read_sql_query(query, conn)
-        # Converte a coluna 'Dia' para o tipo datetime, essencial para gráficos
-        df['Dia'] = pd.to_datetime(df['Dia'])
-        return df
+        # Lê o resultado direto para um DataFrame, com a coluna 'Dia' já em datetime (essencial para gráficos)
+        df = ler_sql(query, conn, params=params, datas=("Dia",))
+        return series.reduzir_serie(df, pontos, lttb, inicio, fim)
     except Exception as e:
         print(f"Erro em obter_dados_vendas: {e}")
         return pd.DataFrame(columns=["Dia", "Total Vendido"])
     
-def get_vendas_por_hora_do_dia(conn):
+@cache_consulta
+@com_motor
+def get_vendas_por_hora_do_dia(conn, inicio=None, fim=None):
     """
     Busca o total de vendas consolidado para cada hora do dia (0-23h).
     Retorna um DataFrame pronto para um gráfico de barras.
     """
-    # A função strftime('%H', data_venda) extrai apenas a hora (ex: '14', '15')
-    # de cada registro de venda.
-    query = """
+    # O resumo já guarda a hora como inteiro (0-23), então não é preciso
+    # aplicar strftime() em cada registro de venda.
+    filtro, params = _filtro_periodo(inicio, fim, "dia")
+    query = f"""
     SELECT
-        strftime('%H', data_venda) || 'h' AS "Hora", -- Adiciona um 'h' para ficar mais legível
-        SUM(valor_total_item) AS "Total Vendido"
+        printf('%02dh', hora) AS "Hora", -- Adiciona um 'h' para ficar mais legível
+        SUM(receita) AS "Total Vendido"
     FROM
-        vendas
+        vendas_resumo_hora
+    WHERE
+        {filtro}
     GROUP BY
-        "Hora"
+        hora
     ORDER BY
-        "Hora" ASC; -- Ordena das 0h às 23h
+        hora ASC; -- Ordena das 0h às 23h
     """
     try:
-        df = pd.read_sql_query(query, conn)
+        df = ler_sql(query, conn, params=params)
         return df
     except Exception as e:
         print(f"Erro em get_vendas_por_hora_do_dia: {e}")
         return pd.DataFrame(columns=["Hora", "Total Vendido"])
     
-def get_evolucao_receita_mensal(cursor):
-    """
-    Calcula a receita do mês atual e anterior para o delta do card.
-    Retorna o valor atual e a variação percentual.
-    """
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_receita_mes_atual_e_anterior(cursor, fim=None):
+    # Sem @cache_consulta: sem 'fim', o resultado depende da data de hoje, não só dos dados.
+    """
+    Retorna (receita do mês atual, receita do mês anterior).
+    Com 'fim', o "mês atual" passa a ser o mês de 'fim' (útil junto do filtro de período).
+    """
+    referencia = date.fromisoformat(_texto_data(fim)) if fim is not None else date.today()
+    inicio_mes = referencia.replace(day=1)
+    inicio_mes_anterior = (inicio_mes - timedelta(days=1)).replace(day=1)
+    ano_mes_atual = inicio_mes.year * 100 + inicio_mes.month
+    ano_mes_anterior = inicio_mes_anterior.year * 100 + inicio_mes_anterior.month
+    # Compara a coluna inteira ano_mes (AAAAMM), lida só do índice idx_vendas_ano_mes,
+    # em vez de aplicar strftime('%Y-%m') em cada linha
     query = """
     SELECT
-        SUM(CASE WHEN strftime('%Y-%m', data_venda) = strftime('%Y-%m', 'now', 'localtime') THEN valor_total_item ELSE 0 END),
-        SUM(CASE WHEN strftime('%Y-%m', data_venda) = strftime('%Y-%m', 'now', '-1 month', 'localtime') THEN valor_total_item ELSE 0 END)
+        SUM(CASE WHEN ano_mes = ? THEN valor_total_item ELSE 0 END),
+        SUM(CASE WHEN ano_mes = ? THEN valor_total_item ELSE 0 END)
     FROM vendas
-    WHERE strftime('%Y-%m', data_venda) IN (strftime('%Y-%m', 'now', 'localtime'), strftime('%Y-%m', 'now', '-1 month', 'localtime'));
+    WHERE ano_mes IN (?, ?);
     """
-    cursor.execute(query)
-    receita_atual, receita_anterior = cursor.fetchone()
-    receita_atual = receita_atual or 0
-    receita_anterior = receita_anterior or 0
-    
+    receita_atual, receita_anterior = executar(
+        cursor, query, (ano_mes_atual, ano_mes_anterior, ano_mes_atual, ano_mes_anterior)
+    ).fetchone()
+    return receita_atual or 0, receita_anterior or 0
+
+@com_motor
+def get_evolucao_receita_mensal(cursor, fim=None):
+    """
+    Calcula a receita do mês atual e anterior para o delta do card.
+    Com 'fim', o "mês atual" passa a ser o mês de 'fim' (útil junto do filtro de período).
+    Retorna o valor atual e a variação percentual.
+    """
+    receita_atual, receita_anterior = get_receita_mes_atual_e_anterior(cursor, fim)
     variacao_perc = ((receita_atual - receita_anterior) / receita_anterior) * 100 if receita_anterior > 0 else float('inf')
     return receita_atual, variacao_perc
  
-def get_vendas_por_dia_da_semana(conn):
+@cache_consulta
+@com_motor
+def get_vendas_por_dia_da_semana(conn, inicio=None, fim=None):
     """
     Busca o total de vendas consolidado para cada dia da semana (Domingo, Segunda, etc.).
     Retorna um DataFrame ordenado de Domingo (0) a Sábado (6).
     """
     # A mágica acontece aqui no SQL:
-    # 1. strftime('%w', data_venda) extrai o dia da semana como um número (0=Domingo, 1=Segunda, etc.)
+    # 1. A coluna inteira dia_semana (0=Domingo, 1=Segunda, etc.) já vem pronta
+    #    no resumo por dia/hora (no máximo 24 linhas por dia, e não uma por venda).
     # 2. A declaração CASE...WHEN...END traduz esses números para os nomes dos dias em português.
     # 3. Agrupamos e ordenamos pelo NÚMERO do dia da semana para manter a ordem cronológica.
-    query = """
+    filtro, params = _filtro_periodo(inicio, fim, "dia")
+    query = f"""
     SELECT
-        CASE strftime('%w', data_venda)
-            WHEN '0' THEN 'Domingo'
-            WHEN '1' THEN 'Segunda-feira'
-            WHEN '2' THEN 'Terça-feira'
-            WHEN '3' THEN 'Quarta-feira'
-            WHEN '4' THEN 'Quinta-feira'
-            WHEN '5' THEN 'Sexta-feira'
-            WHEN '6' THEN 'Sábado'
+        CASE dia_semana
+            WHEN 0 THEN 'Domingo'
+            WHEN 1 THEN 'Segunda-feira'
+            WHEN 2 THEN 'Terça-feira'
+            WHEN 3 THEN 'Quarta-feira'
+            WHEN 4 THEN 'Quinta-feira'
+            WHEN 5 THEN 'Sexta-feira'
+            WHEN 6 THEN 'Sábado'
         END AS "Dia da Semana",
-        SUM(valor_total_item) AS "Total Vendido"
+        SUM(receita) AS "Total Vendido"
     FROM
-        vendas
+        vendas_resumo_hora
+    WHERE
+        {filtro}
     GROUP BY
-        strftime('%w', data_venda) -- Agrupa pelo número do dia
+        dia_semana -- Agrupa pelo número do dia
     ORDER BY
-        strftime('%w', data_venda) ASC; -- Ordena pelo número do dia
+        dia_semana ASC; -- Ordena pelo número do dia
     """
     try:
-        df = pd.read_sql_query(query, conn)
+        df = ler_sql(query, conn, params=params)
         return df
     except Exception as e:
         print(f"Erro em get_vendas_por_dia_da_semana: {e}")
         return pd.DataFrame(columns=["Dia da Semana", "Total Vendido"])
     
 
-def get_vendas_por_produto(conn):
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_vendas_por_produto(conn, inicio=None, fim=None):
     """Busca o valor total de vendas para cada produto."""
-    query = """
+    filtro, params = _filtro_periodo(inicio, fim, "v.data_venda")
+    query = f"""
     SELECT p.nome AS "Produto", SUM(v.valor_total_item) AS "Total Vendido"
     FROM produtos p JOIN vendas v ON p.id = v.produto_id
-    GROUP BY p.nome ORDER BY "Total Vendido" DESC;
+    WHERE {filtro}
+    GROUP BY p.nome ORDER BY "Total Vendido" DESC, "Produto" ASC;
     """
-    return pd.read_sql_query(query, conn)
+    return ler_sql(query, conn, params=params)
 
-def get_vendas_por_forma_pagamento(conn):
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=RESUMO)
+def get_vendas_por_forma_pagamento(conn, inicio=None, fim=None):
     """Busca o valor total de vendas para cada forma de pagamento."""
-    query = """
-    SELECT fp.descricao AS "Forma de Pagamento", SUM(v.valor_total_item) AS "Total Vendido"
-    FROM formas_pagamento fp JOIN vendas v ON fp.id = v.formas_pagamento_id
-    GROUP BY fp.descricao ORDER BY "Total Vendido" DESC;
-    """
-    return pd.read_sql_query(query, conn)
+    # Soma pelo id (índice idx_vendas_pagamento) e troca os ids pelos nomes em memória
+    filtro, params = _filtro_periodo(inicio, fim)
+    query = f"""
+    SELECT formas_pagamento_id, SUM(valor_total_item) AS "Total Vendido"
+    FROM vendas WHERE {filtro} GROUP BY formas_pagamento_id;
+    """
+    df = ler_sql(query, conn, params=params)
+    return dimensoes.somar_por_nome(
+        conn, df, "formas_pagamento_id", "formas_pagamento", "Forma de Pagamento", "Total Vendido"
+    )
 
 
 #funções de hanking
 
 # Em functions/setup.py
-def get_analise_formas_pagamento(conn):
+@cache_consulta
+@com_motor
+def get_analise_formas_pagamento(conn, inicio=None, fim=None):
     """
     Calcula o Valor Total, a Quantidade de Transações e o Ticket Médio 
     para cada forma de pagamento. Retorna UM DataFrame completo.
     """
-    query = """
-    SELECT
-        fp.descricao AS "Forma de Pagamento",
-        SUM(v.valor_total_item) AS "Valor Total",
-        COUNT(DISTINCT v.transacao_id) AS "Qtd. Transações",
-        CASE
-            WHEN COUNT(DISTINCT v.transacao_id) > 0
-            THEN SUM(v.valor_total_item) / COUNT(DISTINCT v.transacao_id)
-            ELSE 0
-        END AS "Ticket Médio"
-    FROM formas_pagamento fp JOIN vendas v ON fp.id = v.formas_pagamento_id
-    WHERE v.transacao_id IS NOT NULL
-    GROUP BY fp.descricao ORDER BY "Valor Total" DESC;
-    """
-    return pd.read_sql_query(query, conn)
-    """
-    Calcula o Valor Total, a Quantidade de Transações e o Ticket Médio para cada forma de pagamento.
-    Retorna um DataFrame completo para análise.
-    """
-    # Esta query junta as tabelas e usa funções de agregação para calcular tudo de uma vez.
-    query = """
-    SELECT
-        fp.descricao AS "Forma de Pagamento",
-        SUM(v.valor_total_item) AS "Valor Total",
-        COUNT(DISTINCT v.transacao_id) AS "Qtd. Transações",
-        -- Usamos CASE para evitar divisão por zero se não houver transações
-        CASE
-            WHEN COUNT(DISTINCT v.transacao_id) > 0
-            THEN SUM(v.valor_total_item) / COUNT(DISTINCT v.transacao_id)
-            ELSE 0
-        END AS "Ticket Médio"
-    FROM
-        formas_pagamento fp
-    JOIN
-        vendas v ON fp.id = v.formas_pagamento_id
-    WHERE
-        v.transacao_id IS NOT NULL
-    GROUP BY
-        fp.descricao
-    ORDER BY
-        "Valor Total" DESC;
+    # Cada linha de 'transacoes' é uma transação paga com aquela forma: COUNT(*) basta.
+    # Agrupa só pelo id (na ordem do índice idx_transacoes_forma); os nomes vêm da memória.
+    filtro, params = _filtro_periodo(inicio, fim, "data")
+    query = f"""
+    SELECT formas_pagamento_id, SUM(total) AS "Valor Total", COUNT(*) AS "Qtd. Transações"
+    FROM transacoes WHERE {filtro} GROUP BY formas_pagamento_id;
     """
-    try:
-        df = pd.read_sql_query(query, conn)
-        return df
-    except Exception as e:
-        print(f"Erro em get_analise_formas_pagamento: {e}")
-        return pd.DataFrame()
-    
-def get_frequencia_forma_pagamento(conn):
+    df = ler_sql(query, conn, params=params)
+    df = dimensoes.somar_por_nome(conn, df, "formas_pagamento_id", "formas_pagamento", "Forma de Pagamento", "Valor Total")
+    df["Ticket Médio"] = df["Valor Total"] / df["Qtd. Transações"]
+    return df
+
+@cache_consulta
+@com_motor
+def get_frequencia_forma_pagamento(conn, inicio=None, fim=None):
     """
     Busca a QUANTIDADE DE TRANSAÇÕES para cada forma de pagamento, ordenado da mais frequente para a menos.
     """
-    query = """
-    SELECT fp.descricao AS "Forma de Pagamento", COUNT(DISTINCT v.transacao_id) AS "Qtd. Transações"
-    FROM formas_pagamento fp JOIN vendas v ON fp.id = v.formas_pagamento_id
-    WHERE v.transacao_id IS NOT NULL
-    GROUP BY fp.descricao ORDER BY "Qtd. Transações" DESC;
+    filtro, params = _filtro_periodo(inicio, fim, "data")
+    query = f"""
+    SELECT formas_pagamento_id, COUNT(*) AS "Qtd. Transações"
+    FROM transacoes WHERE {filtro} GROUP BY formas_pagamento_id;
     """
-    return pd.read_sql_query(query, conn)
+    df = ler_sql(query, conn, params=params)
+    return dimensoes.somar_por_nome(
+        conn, df, "formas_pagamento_id", "formas_pagamento", "Forma de Pagamento", "Qtd. Transações"
+    )
     
 
 
-def get_novos_clientes_por_mes(conn):
-    """Retorna um DataFrame com a contagem de novos clientes para cada mês."""
-    query = """
-    WITH PrimeiraCompra AS (
-        SELECT cliente_id, MIN(DATE(data_venda)) as data_primeira_compra
-        FROM vendas GROUP BY cliente_id
-    )
-    SELECT strftime('%Y-%m', data_primeira_compra) || '-01' AS "Mês", COUNT(cliente_id) AS "Novos Clientes"
-    FROM PrimeiraCompra GROUP BY "Mês" ORDER BY "Mês" ASC;
+@cache_consulta
+@com_motor
+def get_novos_clientes_por_mes(conn, inicio=None, fim=None):
     """
-    df = pd.read_sql_query(query, conn)
-    df['Mês'] = pd.to_datetime(df['Mês'])
-    return df
+    Retorna um DataFrame com a contagem de novos clientes para cada mês.
+    Com período, conta os clientes cuja PRIMEIRA compra (de todo o histórico) caiu nele.
+    """
+    # A primeira compra de cada cliente já está em clientes_metricas (índice em
+    # primeira_compra): não é preciso agrupar 'vendas' inteira por cliente.
+    filtro, params = _filtro_periodo(inicio, fim, "primeira_compra")
+    query = f"""
+    SELECT
+        substr(primeira_compra, 1, 7) || '-01' AS "Mês",
+        COUNT(*) AS "Novos Clientes"
+    FROM clientes_metricas WHERE {filtro}
+    GROUP BY substr(primeira_compra, 1, 7) ORDER BY substr(primeira_compra, 1, 7) ASC;
+    """
+    return ler_sql(query, conn, params=params, datas=("Mês",))
 
-def get_distribuicao_frequencia(conn):
-    """Retorna um DataFrame com a contagem de clientes por número de compras."""
-    query = """
-    WITH FrequenciaPorCliente AS (
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=None, com_periodo=LINHAS)
+def get_distribuicao_frequencia(conn, inicio=None, fim=None):
+    """Retorna um DataFrame com a contagem de clientes por número de compras (no período, se informado)."""
+    if inicio is None and fim is None:
+        # Sem período, o número de compras de cada cliente já está em clientes_metricas
+        params = []
+        frequencia = """
+        SELECT cliente_id, transacoes AS num_compras
+        FROM clientes_metricas WHERE transacoes > 0
+        """
+    else:
+        filtro, params = _filtro_periodo(inicio, fim)
+        frequencia = f"""
         SELECT cliente_id, COUNT(DISTINCT transacao_id) AS num_compras
-        FROM vendas WHERE transacao_id IS NOT NULL GROUP BY cliente_id
-    )
+        FROM vendas WHERE transacao_id IS NOT NULL AND {filtro} GROUP BY cliente_id
+        """
+    query = f"""
+    WITH FrequenciaPorCliente AS ({frequencia})
     SELECT 
         CASE 
             WHEN num_compras = 1 THEN '1 Compra'
@@ -400,15 +639,262 @@ def get_distribuicao_frequencia(conn):
         COUNT(cliente_id) AS "Número de Clientes"
     FROM FrequenciaPorCliente GROUP BY "Grupo de Frequência";
     """
-    return pd.read_sql_query(query, conn)
+    return ler_sql(query, conn, params=params)
+
+@cache_consulta
+@com_arquivo(sem_periodo=None, com_periodo=LINHAS)
+def get_totais_clientes_com_compra(cursor, inicio=None, fim=None):
+    """Retorna (receita, número de clientes que compraram), no período se informado."""
+    if inicio is None and fim is None:
+        # Uma linha por cliente em clientes_metricas: sem COUNT(DISTINCT)
+        query, params = "SELECT SUM(total_gasto), COUNT(*) FROM clientes_metricas;", []
+    else:
+        filtro, params = _filtro_periodo(inicio, fim)
+        query = f"SELECT SUM(valor_total_item), COUNT(DISTINCT cliente_id) FROM vendas WHERE cliente_id IS NOT NULL AND {filtro};"
+    receita, clientes = executar(cursor, query, params).fetchone()
+    return receita or 0, clientes or 0
 
-def calcular_receita_media_por_cliente(cursor):
-    """Calcula o valor médio que cada cliente gastou no total."""
-    query = "SELECT SUM(valor_total_item) / COUNT(DISTINCT cliente_id) FROM vendas WHERE cliente_id IS NOT NULL;"
+@cache_consulta
+@com_motor
+def calcular_receita_media_por_cliente(cursor, inicio=None, fim=None):
+    """Calcula o valor médio que cada cliente gastou no total (no período, se informado)."""
     try:
-        cursor.execute(query)
-        resultado = cursor.fetchone()
-        return resultado[0] if resultado and resultado[0] is not None else 0
+        receita, clientes = get_totais_clientes_com_compra(cursor, inicio, fim)
+        return receita / clientes if clientes else 0
     except Exception as e:
         print(f"Erro em calcular_receita_media_por_cliente: {e}")
-        return 0
\ No newline at end of file
+        return 0
+
+
+#____________________________________________________________________________________________________________________________________________#
+
+# ≈ MODO APROXIMADO (históricos muito grandes)
+# Versões aproximadas das funções mais caras num período longo, lidas só das tabelas do modo
+# aproximado (functions/aproximacao.py) e do resumo por dia/hora: nenhuma varre 'vendas' nem
+# carrega o arquivo em Parquet. As contagens de clientes retornam uma aproximacao.Estimativa
+# (valor + erro relativo), para que o dashboard mostre a margem de erro. Sem período, as
+# contagens já são baratas e saem exatas (erro 0). O número de transações não precisa de
+# aproximação: ele já vem da tabela 'transacoes' (get_totais_transacoes).
+
+@cache_consulta
+def get_receita_pelo_resumo(cursor_param, inicio=None, fim=None):
+    """Receita do período somada do resumo por dia/hora (o histórico inteiro, inclusive o arquivado)."""
+    filtro, params = _filtro_periodo(inicio, fim, "dia")
+    resultado = executar(cursor_param, f"SELECT SUM(receita) FROM vendas_resumo_hora WHERE {filtro};", params).fetchone()
+    return resultado[0] if resultado and resultado[0] is not None else 0
+
+@cache_consulta
+def get_esboco_clientes(cursor_param, inicio=None, fim=None):
+    """Esboço HyperLogLog dos clientes do período: os esboços dos dias juntados (um array)."""
+    filtro, params = _filtro_periodo(inicio, fim, "dia")
+    linhas = executar(cursor_param, f"SELECT registros FROM clientes_hll_dia WHERE {filtro};", params)
+    return aproximacao.juntar_esbocos(registros for registros, in linhas)
+
+@cache_consulta
+def total_clientes_aproximado(cursor_param, inicio=None, fim=None):
+    """Como total_clientes, mas com período a contagem sai dos esboços por dia. Retorna uma Estimativa."""
+    if inicio is None and fim is None:
+        return aproximacao.Estimativa(total_clientes(cursor_param), 0.0)
+    esboco = get_esboco_clientes(cursor_param, inicio, fim)
+    if not esboco.any():
+        return aproximacao.Estimativa(0, 0.0)  # nenhuma venda no período: zero exato
+    return aproximacao.Estimativa(aproximacao.estimar_distintos(esboco), aproximacao.ERRO_RELATIVO)
+
+@cache_consulta
+def calcular_receita_media_por_cliente_aproximada(cursor, inicio=None, fim=None):
+    """
+    Como calcular_receita_media_por_cliente: receita exata do resumo dividida pelo número
+    aproximado de clientes do período (mesmo erro relativo). Retorna uma Estimativa.
+    """
+    if inicio is None and fim is None:
+        return aproximacao.Estimativa(calcular_receita_media_por_cliente(cursor), 0.0)
+    try:
+        clientes = total_clientes_aproximado(cursor, inicio, fim)
+        receita = get_receita_pelo_resumo(cursor, inicio, fim)
+        return aproximacao.Estimativa(receita / clientes.valor if clientes.valor else 0, clientes.erro_relativo)
+    except Exception as e:
+        print(f"Erro em calcular_receita_media_por_cliente_aproximada: {e}")
+        return aproximacao.Estimativa(0, 0.0)
+
+@cache_consulta
+def get_totais_amostra(cursor_param, inicio=None, fim=None):
+    """Retorna (vendas da amostra no período, receita delas): a base dos rankings aproximados."""
+    filtro, params = _filtro_periodo(inicio, fim)
+    linhas, receita = executar(cursor_param, f"""
+    SELECT COUNT(*), SUM(valor_total_item) FROM vendas_amostra WHERE {filtro};
+    """, params).fetchone()
+    return linhas, receita or 0
+
+def _escala_amostra(conn, inicio=None, fim=None):
+    """Quanto cada real da amostra vale no período: receita exata (resumo) / receita da amostra."""
+    _, receita_amostra = get_totais_amostra(conn, inicio, fim)
+    return get_receita_pelo_resumo(conn, inicio, fim) / receita_amostra if receita_amostra else 0
+
+@cache_consulta
+def get_top_produtos_aproximado(conn, limite=None, inicio=None, fim=None):
+    """Como get_top_produtos, estimado a partir da amostra das vendas ('vendas_amostra')."""
+    filtro, params = _filtro_periodo(inicio, fim, "a.data_venda")
+    query = f"""
+    SELECT p.nome AS "Produto", SUM(a.valor_total_item) AS "Total Vendido"
+    FROM produtos p JOIN vendas_amostra a ON p.id = a.produto_id
+    WHERE {filtro}
+    GROUP BY p.nome ORDER BY "Total Vendido" DESC, "Produto" ASC
+    """
+    if limite is not None:
+        query += " LIMIT ?;"
+        params.append(limite)
+    df = ler_sql(query, conn, params=params)
+    df["Total Vendido"] *= _escala_amostra(conn, inicio, fim)
+    return df
+
+@cache_consulta
+def get_top_categorias_aproximado(conn, limite=None, inicio=None, fim=None):
+    """Como get_top_categorias, estimado a partir da amostra das vendas ('vendas_amostra')."""
+    filtro, params = _filtro_periodo(inicio, fim, "a.data_venda")
+    query = f"""
+    SELECT c.nome_categoria AS "Categoria", SUM(a.valor_total_item) AS "Total Vendido"
+    FROM vendas_amostra a JOIN produtos p ON a.produto_id = p.id JOIN categorias c ON p.categoria_id = c.id
+    WHERE {filtro}
+    GROUP BY c.nome_categoria ORDER BY "Total Vendido" DESC, "Categoria" ASC
+    """
+    if limite is not None:
+        query += " LIMIT ?;"
+        params.append(limite)
+    df = ler_sql(query, conn, params=params)
+    df["Total Vendido"] *= _escala_amostra(conn, inicio, fim)
+    return df
+
+@cache_consulta
+def get_pagina_produtos_aproximado(conn, apos=None, tamanho=TAMANHO_PAGINA, busca=None, inicio=None, fim=None):
+    """Uma página de get_top_produtos_aproximado (o ranking da amostra já é pequeno: a página sai dele)."""
+    return paginar_ranking(get_top_produtos_aproximado(conn, None, inicio, fim), apos, tamanho, busca)
+
+@cache_consulta
+def get_pagina_categorias_aproximado(conn, apos=None, tamanho=TAMANHO_PAGINA, busca=None, inicio=None, fim=None):
+    """Uma página de get_top_categorias_aproximado."""
+    return paginar_ranking(get_top_categorias_aproximado(conn, None, inicio, fim), apos, tamanho, busca)
+
+
+#____________________________________________________________________________________________________________________________________________#
+
+# 💡 SNAPSHOT DE KPIs (Visão Geral / Análise de Vendas)
+# Em vez de uma consulta por card, get_kpi_snapshot() calcula todos os números de destaque
+# e os "campeões" com UMA varredura de 'vendas' (agrupada por produto x forma de pagamento),
+# mais leituras baratas do resumo por dia/hora e do índice de transações.
+
+DIAS_SEMANA = {
+    0: "Domingo",
+    1: "Segunda-feira",
+    2: "Terça-feira",
+    3: "Quarta-feira",
+    4: "Quinta-feira",
+    5: "Sexta-feira",
+    6: "Sábado",
+}
+
+
+@dataclass(frozen=True)
+class KpiSnapshot:
+    """Números de destaque do dashboard. Campeões sem dados ficam como "N/D"."""
+    receita_total: float
+    quantidade_vendas: int
+    ticket_medio: float
+    total_clientes: int
+    produto_campeao: str
+    categoria_campea: str
+    pagamento_preferido: str
+    dia_pico: str
+    hora_pico: str
+
+
+def _campeao(totais):
+    """Retorna a chave com o maior total de um dicionário {nome: total}, ou "N/D" se vazio."""
+    return max(totais, key=totais.get) if totais else "N/D"
+
+
+@cache_consulta
+@com_motor
+@com_arquivo(sem_periodo=RESUMO, com_periodo=LINHAS)
+def get_kpi_snapshot(conn, inicio=None, fim=None):
+    """
+    Calcula receita, quantidade, ticket médio, total de clientes e os campeões
+    (produto, categoria, forma de pagamento, dia da semana e hora) de uma só vez.
+    Aceita o mesmo filtro de período (inicio/fim) das demais funções. Retorna um KpiSnapshot.
+    """
+    cursor_kpi = conn.cursor()
+    filtro, params = _filtro_periodo(inicio, fim)
+    filtro_resumo, params_resumo = _filtro_periodo(inicio, fim, "dia")
+
+    # 1. Única varredura de 'vendas': agrupa por produto x forma de pagamento
+    #    e só depois junta os nomes (poucas linhas), somando por nome em Python.
+    linhas = executar(cursor_kpi, f"""
+    SELECT
+        p.nome,
+        c.nome_categoria,
+        fp.descricao,
+        g.receita,
+        g.itens
+    FROM (
+        SELECT
+            produto_id,
+            formas_pagamento_id,
+            SUM(valor_total_item) AS receita,
+            SUM(quantidade) AS itens
+        FROM vendas
+        WHERE {filtro}
+        GROUP BY produto_id, formas_pagamento_id
+    ) g
+    LEFT JOIN produtos p ON p.id = g.produto_id
+    LEFT JOIN categorias c ON c.id = p.categoria_id
+    LEFT JOIN formas_pagamento fp ON fp.id = g.formas_pagamento_id;
+    """, params)
+
+    receita_total = 0
+    quantidade = 0
+    por_produto, por_categoria, por_pagamento = {}, {}, {}
+    for produto, categoria, pagamento, receita, itens in linhas:
+        receita_total += receita or 0
+        quantidade += itens or 0
+        # Mesma regra dos JOINs das funções de ranking: só conta o que tem nome
+        if produto is not None:
+            por_produto[produto] = por_produto.get(produto, 0) + receita
+        if categoria is not None:
+            por_categoria[categoria] = por_categoria.get(categoria, 0) + receita
+        if pagamento is not None:
+            por_pagamento[pagamento] = por_pagamento.get(pagamento, 0) + receita
+
+    # 2. Transações (cabeçalhos em 'transacoes', mesma regra de calcular_ticket_medio) e total de clientes
+    receita_com_transacao, num_transacoes = get_totais_transacoes(cursor_kpi, inicio, fim)
+    if inicio is None and fim is None:
+        num_clientes = executar(cursor_kpi, "SELECT COUNT(*) FROM clientes;").fetchone()[0]
+    else:
+        # Com período, "clientes" são os que compraram nele (mesma regra de total_clientes)
+        num_clientes = executar(cursor_kpi, f"""
+        SELECT COUNT(DISTINCT cliente_id) FROM vendas WHERE {filtro};
+        """, params).fetchone()[0]
+
+    # 3. Dia da semana (coluna inteira dia_semana) e hora de pico a partir do resumo por dia/hora
+    linhas = executar(cursor_kpi, f"""
+    SELECT dia_semana, hora, SUM(receita)
+    FROM vendas_resumo_hora
+    WHERE {filtro_resumo}
+    GROUP BY dia_semana, hora;
+    """, params_resumo)
+    por_dia, por_hora = {}, {}
+    for dia_semana, hora, receita in linhas:
+        nome_dia = DIAS_SEMANA[dia_semana]
+        rotulo_hora = f"{hora:02d}h"
+        por_dia[nome_dia] = por_dia.get(nome_dia, 0) + receita
+        por_hora[rotulo_hora] = por_hora.get(rotulo_hora, 0) + receita
+
+    return KpiSnapshot(
+        receita_total=receita_total,
+        quantidade_vendas=quantidade,
+        ticket_medio=receita_com_transacao / num_transacoes if num_transacoes else 0,
+        total_clientes=num_clientes or 0,
+        produto_campeao=_campeao(por_produto),
+        categoria_campea=_campeao(por_categoria),
+        pagamento_preferido=_campeao(por_pagamento),
+        dia_pico=_campeao(por_dia),
+        hora_pico=_campeao(por_hora),
+    )
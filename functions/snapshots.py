@@ -0,0 +1,258 @@
+import argparse
+import os
+import pickle
+import threading
+import time
+import zlib
+from datetime import date, datetime
+
+from functions import lojas as cadastro_lojas
+from functions import setup
+from functions.cache import token_dados
+
+# 📸 Snapshots das páginas, pré-calculados por um processo à parte
+# Cada sessão do Streamlit calculava os números da sua página dentro da própria execução do
+# script. Com o trabalhador deste módulo rodando ao lado do dashboard:
+#
+#     python -m functions.snapshots --banco acai.db --intervalo 60
+#
+# a cada 'intervalo' segundos ele confere a versão dos dados (cache.token_dados, de cada banco)
+# e a data de hoje. Só quando uma das duas mudou, ele executa todas as chamadas das páginas
+# (functions/paginas.py) para os períodos predefinidos, com e sem modo aproximado, e grava os
+# resultados (KPIs, DataFrames dos gráficos, ...) num snapshot versionado, em pickle comprimido:
+#
+#     snapshots/snapshot.<versão>.pkl.z
+#
+# O arquivo é gravado com outro nome e renomeado no fim: quem lê nunca vê um snapshot pela
+# metade. Ficam os MANTER mais recentes. Com cadastro de lojas (lojas.json), entram cada loja
+# e "Todas as lojas".
+#
+# O dashboard chama usar_snapshots(): carregador.carregar() passa a devolver direto do snapshot
+# mais recente as chamadas que estiverem nele (o arquivo é lido uma vez por versão, por
+# processo), e só consulta o banco para as demais (ex.: período personalizado). Enquanto os
+# dados não mudam, o trabalhador só atualiza a data de modificação do último snapshot; um
+# snapshot sem atualização há mais de IDADE_MAXIMA segundos (trabalhador parado) é ignorado.
+#
+# Os snapshots são arquivos pickle: a pasta só deve ser gravável pelo próprio trabalhador.
+
+PASTA_SNAPSHOTS = "snapshots"
+PREFIXO = "snapshot."
+EXTENSAO = ".pkl.z"
+INTERVALO_SEGUNDOS = 60
+IDADE_MAXIMA = 600
+MANTER = 3
+
+_pasta = None
+_atual = (None, None)  # (caminho, conteúdo) do último snapshot lido
+_lock = threading.Lock()
+_AUSENTE = object()
+
+
+# --- LEITURA (dashboard) ---------------------------------------------------------------------
+
+def usar_snapshots(pasta=PASTA_SNAPSHOTS):
+    """
+    Liga (pasta) ou desliga (None) a leitura de snapshots em carregador.carregar().
+    Pode ser chamada a cada execução do script: com a mesma pasta, não faz nada.
+    """
+    global _pasta, _atual
+    with _lock:
+        if pasta != _pasta:
+            _pasta = pasta
+            _atual = (None, None)
+
+
+def _mais_recente(pasta):
+    """Caminho do snapshot mais recente da pasta (a versão é um carimbo de tempo), ou None."""
+    try:
+        nomes = [n for n in os.listdir(pasta) if n.startswith(PREFIXO) and n.endswith(EXTENSAO)]
+    except FileNotFoundError:
+        return None
+    return os.path.join(pasta, max(nomes)) if nomes else None
+
+
+def _ler(caminho):
+    with open(caminho, "rb") as arquivo:
+        return pickle.loads(zlib.decompress(arquivo.read()))
+
+
+def snapshot_atual():
+    """Conteúdo do snapshot mais recente e ainda atualizado, ou None (sem pasta, vazio ou velho)."""
+    global _atual
+    with _lock:
+        if _pasta is None:
+            return None
+        caminho = _mais_recente(_pasta)
+        if caminho is None:
+            return None
+        try:
+            if time.time() - os.stat(caminho).st_mtime > IDADE_MAXIMA:
+                return None
+            if _atual[0] != caminho:
+                _atual = (caminho, _ler(caminho))
+        except FileNotFoundError:
+            # Apagado pelo trabalhador entre a listagem e a leitura: fica para a próxima página
+            return None
+        return _atual[1]
+
+
+def gerado_em():
+    """Quando foi gerado o snapshot em uso (datetime), ou None."""
+    snapshot = snapshot_atual()
+    return snapshot["gerado_em"] if snapshot else None
+
+
+def selecao(lojas=None):
+    """Identificação dos bancos de uma consulta: os das lojas ou, sem elas, o padrão do setup.py."""
+    if lojas:
+        return tuple(os.path.abspath(loja.banco) for loja in lojas)
+    return (os.path.abspath(setup.init_db().caminho),)
+
+
+def _chave(bancos, chamada):
+    funcao = chamada.funcao
+    return bancos, f"{funcao.__module__}.{funcao.__qualname__}", chamada.argumentos
+
+
+def buscar(chamadas, lojas=None):
+    """
+    {chamada: resultado} das chamadas (carregador.Chamada) que estão no snapshot em uso.
+    DataFrames são devolvidos como cópia, como no cache.
+    """
+    snapshot = snapshot_atual()
+    if snapshot is None:
+        return {}
+    bancos = selecao(lojas)
+    resultados = snapshot["resultados"]
+    encontrados = {}
+    for c in chamadas:
+        valor = resultados.get(_chave(bancos, c), _AUSENTE)
+        if valor is not _AUSENTE:
+            encontrados[c] = valor.copy() if hasattr(valor, "copy") else valor
+    return encontrados
+
+
+# --- GERAÇÃO (trabalhador) -------------------------------------------------------------------
+
+def selecoes(cadastro):
+    """Listas de lojas a pré-calcular: None (banco padrão), ou cada loja e todas juntas."""
+    if not cadastro:
+        return [None]
+    grupos = [[loja] for loja in cadastro]
+    if len(cadastro) > 1:
+        grupos.append(cadastro)
+    return grupos
+
+
+def impressao_dados(cadastro):
+    """O que, se mudar, pede um snapshot novo: a data de hoje e a versão dos dados de cada banco."""
+    if cadastro:
+        tokens = [token_dados(cadastro_lojas.conexao_leitura(loja.banco)) for loja in cadastro]
+    else:
+        tokens = [token_dados(setup.get_connection())]
+    return date.today().isoformat(), tuple(tokens)
+
+
+def chamadas_predefinidas(hoje=None):
+    """
+    Todas as chamadas (sem repetição) das páginas e da primeira página de cada lista completa,
+    nos períodos predefinidos e nos dois modos.
+    """
+    from functions import paginas  # paginas importa carregador, que importa este módulo
+    unicas = {}
+    for dias in paginas.PERIODOS.values():
+        if dias == "personalizado":
+            continue
+        periodo = paginas.periodo_predefinido(dias, hoje)
+        for pagina in paginas.PAGINAS:
+            for modo_aproximado in (False, True):
+                for picos in (False, True):
+                    for c in paginas.chamadas_pagina(pagina, periodo, modo_aproximado, picos).values():
+                        unicas[c] = None
+        for modo_aproximado in (False, True):
+            for nome in paginas.LISTAS:
+                unicas[paginas.pagina_lista(nome, periodo, modo_aproximado)] = None
+    return list(unicas)
+
+
+def gerar_snapshot(cadastro, impressao):
+    """Executa as chamadas predefinidas de todas as seleções de lojas e monta o snapshot."""
+    from functions import carregador
+    inicio = time.perf_counter()
+    chamadas = chamadas_predefinidas()
+    resultados = {}
+    for lojas in selecoes(cadastro):
+        bancos = selecao(lojas)
+        valores = carregador.carregar({c: c for c in chamadas}, lojas=lojas)
+        for c, valor in valores.items():
+            resultados[_chave(bancos, c)] = valor
+    return {
+        "gerado_em": datetime.now(),
+        "impressao": impressao,
+        "segundos": time.perf_counter() - inicio,
+        "resultados": resultados,
+    }
+
+
+def gravar(pasta, snapshot, manter=MANTER):
+    """Grava o snapshot como uma versão nova (de uma vez) e apaga as mais antigas. Retorna o caminho."""
+    os.makedirs(pasta, exist_ok=True)
+    versao = snapshot["gerado_em"].strftime("%Y%m%dT%H%M%S%f")
+    caminho = os.path.join(pasta, f"{PREFIXO}{versao}{EXTENSAO}")
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)))
+    os.replace(temporario, caminho)
+    nomes = sorted(n for n in os.listdir(pasta) if n.startswith(PREFIXO) and n.endswith(EXTENSAO))
+    for antigo in nomes[:-manter]:
+        try:
+            os.remove(os.path.join(pasta, antigo))
+        except OSError as e:
+            print(f"Erro ao apagar snapshot antigo {antigo}: {e}")
+    return caminho
+
+
+def impressao_gravada(pasta):
+    """Impressão dos dados do snapshot mais recente da pasta, ou None se não houver nenhum."""
+    ultimo = _mais_recente(pasta)
+    return _ler(ultimo)["impressao"] if ultimo is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-calcula as páginas do dashboard em snapshots versionados.")
+    parser.add_argument("--banco", default=setup.CAMINHO_BANCO, help="Caminho do arquivo SQLite (padrão: acai.db)")
+    parser.add_argument("--lojas", default=cadastro_lojas.ARQUIVO_LOJAS,
+                        help="Cadastro de lojas; se existir, substitui --banco (padrão: lojas.json)")
+    parser.add_argument("--pasta", default=PASTA_SNAPSHOTS, help="Pasta dos snapshots (padrão: snapshots)")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SEGUNDOS,
+                        help="Segundos entre verificações de dados novos")
+    parser.add_argument("--manter", type=int, default=MANTER, help="Quantos snapshots manter")
+    parser.add_argument("--uma-vez", action="store_true", help="Faz um ciclo só e sai")
+    args = parser.parse_args(argv)
+
+    cadastro = cadastro_lojas.carregar_lojas(args.lojas)
+    if not cadastro:
+        setup.init_db(args.banco)
+    gravada = impressao_gravada(args.pasta)
+    while True:
+        try:
+            impressao = impressao_dados(cadastro)
+            ultimo = _mais_recente(args.pasta)
+            if impressao == gravada and ultimo is not None:
+                # Nada mudou: só avisa ao dashboard que o último snapshot continua valendo
+                os.utime(ultimo)
+            else:
+                snapshot = gerar_snapshot(cadastro, impressao)
+                caminho = gravar(args.pasta, snapshot, args.manter)
+                gravada = impressao
+                print(f"{snapshot['gerado_em']:%d/%m/%Y %H:%M:%S}: {caminho} "
+                      f"({len(snapshot['resultados'])} resultados em {snapshot['segundos']:.1f}s)")
+        except Exception as e:
+            print(f"Erro ao gerar o snapshot: {e}")
+        if args.uma_vez:
+            break
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    main()
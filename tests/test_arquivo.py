@@ -0,0 +1,60 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from functions import ao_vivo
+from functions import arquivo
+from functions import conexao
+from functions import migracoes
+from functions import setup
+from functions.cache import invalidar_cache
+
+pytest.importorskip("pyarrow")
+
+BANCO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "acai.db")
+
+
+@pytest.fixture
+def banco_arquivado(tmp_path):
+    """Cópia do acai.db com jan-mar/2024 no arquivo. Retorna (caminho, receita, itens) do histórico inteiro."""
+    caminho = str(tmp_path / "acai.db")
+    shutil.copy(BANCO, caminho)
+    conn = sqlite3.connect(caminho)
+    migracoes.aplicar_migracoes(conn)
+    receita, itens = conn.execute("SELECT SUM(valor_total_item), SUM(quantidade) FROM vendas;").fetchone()
+    arquivo.arquivar(conn, ate="2024-03")
+    assert arquivo.meses_arquivados(conn) == {202401, 202402, 202403}
+    conn.close()
+    return caminho, receita, itens
+
+
+def test_motor_e_ao_vivo_nao_contam_o_arquivo_duas_vezes(banco_arquivado):
+    caminho, receita, itens = banco_arquivado
+    gerenciador = conexao.GerenciadorConexoes(caminho)
+    try:
+        conn = gerenciador.conexao_leitura()
+        invalidar_cache()
+        # Consulta com período no nível "linhas": a VIEW TEMP 'vendas' fica carregada na conexão
+        setup.total_clientes(conn, "2024-01-01", "2024-06-30")
+        assert conn.execute("SELECT 1 FROM sqlite_temp_master WHERE name = 'vendas';").fetchone()
+
+        assert setup.calcular_valor_total_vendas(conn) == pytest.approx(receita)
+        assert setup.calcular_quantidade_vendas(conn) == itens
+
+        setup.usar_motor_colunar()
+        try:
+            invalidar_cache()
+            assert setup.calcular_valor_total_vendas(conn) == pytest.approx(receita)
+            assert setup.calcular_quantidade_vendas(conn) == itens
+        finally:
+            setup.usar_motor_colunar(False)
+            invalidar_cache()
+
+        agregados = ao_vivo.AgregadosAoVivo()
+        agregados.atualizar(conn)
+        assert agregados.calcular_valor_total_vendas() == pytest.approx(receita)
+        assert agregados.calcular_quantidade_vendas() == itens
+    finally:
+        gerenciador.fechar()